@@ -0,0 +1,53 @@
+# 基准测试共用的确定性合成数据集，不依赖项目内模块，读取配置之前即可导入
+# benchmarks/bench_dataset.py
+import datetime
+import decimal
+from typing import List, Optional
+
+_BASE_TIME = datetime.datetime(2024, 1, 1)
+
+
+class BenchDataset:
+    """
+    由表数量与每表行数确定的合成数据集：表 bench_t00 起编号，列宽随表号变化，单元格值由行号直接计算。
+    同一组参数总是生成同样的结构与数据，假连接器、SQLite 替身与 MySQL 导出脚本共用这一定义。
+    """
+
+    def __init__(self, tables: int = 40, rows_per_table: int = 20000):
+        self.table_names = [f"bench_t{index:02d}" for index in range(tables)]
+        self.rows_per_table = rows_per_table
+
+    def columns(self, table: str) -> List[dict]:
+        index = self.table_names.index(table)
+        columns = [
+            {"name": "id", "type": "int", "sql": "INTEGER PRIMARY KEY", "key": "PRI"},
+            {"name": "name", "type": "varchar(64)", "sql": "VARCHAR(64) NOT NULL", "key": ""},
+            {"name": "amount", "type": "decimal(12,2)", "sql": "DECIMAL(12,2)", "key": ""},
+            {"name": "created_at", "type": "datetime", "sql": "DATETIME", "key": "MUL"},
+            {"name": "parent_id", "type": "int", "sql": "INTEGER", "key": "MUL"},
+            {"name": "note", "type": "text", "sql": "TEXT", "key": ""},
+        ]
+        for extra in range(index % 10):
+            columns.append({"name": f"attr_{extra}", "type": "varchar(32)", "sql": "VARCHAR(32)", "key": ""})
+        return columns
+
+    def column_names(self, table: str) -> tuple:
+        return tuple(column["name"] for column in self.columns(table))
+
+    def rows(self, table: str, limit: Optional[int] = None, offset: int = 0) -> List[tuple]:
+        extras = len(self.columns(table)) - 6
+        end = self.rows_per_table if limit is None else min(self.rows_per_table, offset + limit)
+        rows = []
+        for number in range(offset + 1, end + 1):
+            row = (
+                number,
+                f"name-{number:06d}",
+                decimal.Decimal(number * 37 % 100000) / 100,
+                _BASE_TIME + datetime.timedelta(minutes=number),
+                number // 10 or None,
+                "note " * (number % 20),
+            )
+            if extras:
+                row += tuple(f"value-{number % 97}-{extra}" for extra in range(extras))
+            rows.append(row)
+        return rows
@@ -0,0 +1,111 @@
+# 列搜索基准：在合成的大规模列目录上比较三元组索引与逐行 LIKE 扫描的耗时
+# benchmarks/column_search_bench.py
+#
+# 用法：python benchmarks/column_search_bench.py [--columns 200000] [--repeat 20]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.column_index import ColumnIndex, like_matcher  # noqa: E402
+
+_WORDS = (
+    "customer order invoice payment account user tenant product item price amount status created updated "
+    "deleted address city country region email phone name code type category note total tax discount"
+).split()
+_SYLLABLES = "ka lo mi ne ru sa te vi po da ge hu ri zo fe".split()
+# (关键字, 模式)；模式为 None 时与 searchColumns 默认行为一致
+QUERIES = (
+    ("customer_id", None),
+    ("inv", None),
+    ("id", "substring"),
+    ("payment", "substring"),
+    ("addr", "prefix"),
+    ("custmer", "fuzzy"),
+    ("ammount", "fuzzy"),
+)
+
+
+def build_catalog(columns: int, seed: int = 7) -> list:
+    """
+    按表名、列序生成 searchColumns 形状的列元数据：约每 40 列一张表，三成的列带注释。
+    词汇由常见业务词与随机拼出的领域词组成，按幂律分布取词，列名在各表之间大量重复，接近真实目录。
+    """
+    rng = random.Random(seed)
+    vocabulary = _WORDS + sorted(
+        {"".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(3000)}
+    )
+    # 幂律分布，前几个常用词的占比接近真实目录（不让单个词出现在近半数列中）
+    weights = [1 / (rank + 10) for rank in range(len(vocabulary))]
+
+    def words(count: int) -> list:
+        return rng.choices(vocabulary, weights=weights, k=count)
+
+    rows = []
+    table = 0
+    while len(rows) < columns:
+        table_name = f"{'_'.join(words(2))}_{table}"
+        names = ["id"] + [
+            "_".join(words(rng.randint(1, 2))) + ("_id" if rng.random() < 0.15 else "")
+            for _ in range(rng.randint(10, 70))
+        ]
+        for column_name in dict.fromkeys(names):
+            rows.append(
+                {
+                    "table_name": table_name,
+                    "column_name": column_name,
+                    "column_type": "varchar(64)",
+                    "is_nullable": "YES",
+                    "column_default": None,
+                    "column_comment": " ".join(words(4)) if rng.random() < 0.3 else "",
+                }
+            )
+        table += 1
+    return rows[:columns]
+
+
+def scan(rows: list, keyword: str) -> list:
+    """逐行执行 LIKE 匹配，相当于 information_schema.COLUMNS 上的全量扫描（不含网络与服务端开销）。"""
+    matches = like_matcher(keyword)
+    return [row for row in rows if matches(row["column_name"]) or matches(row["column_comment"])]
+
+
+def timed(call, repeat: int) -> tuple:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, len(result)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the trigram column index with a linear LIKE scan.")
+    parser.add_argument("--columns", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = build_catalog(args.columns)
+    started = time.perf_counter()
+    index = ColumnIndex(rows)
+    print(f"built index over {len(rows)} columns in {(time.perf_counter() - started) * 1000:.0f} ms: {index.stats()}")
+    print(f"{'keyword':<14}{'mode':<11}{'index ms':>10}{'hits':>8}{'scan ms':>10}{'hits':>8}")
+    for keyword, mode in QUERIES:
+        if mode is None:
+            index_ms, index_hits = timed(lambda: index.like(keyword), args.repeat)
+            if index.like(keyword) != scan(rows, keyword):
+                print(f"FAIL: index and scan disagree for {keyword!r}")
+                return 1
+        else:
+            index_ms, index_hits = timed(lambda: index.search(keyword, mode=mode), args.repeat)
+        scan_ms, scan_hits = timed(lambda: scan(rows, keyword), max(args.repeat // 5, 1))
+        print(f"{keyword:<14}{mode or 'like':<11}{index_ms:>10.2f}{index_hits:>8}{scan_ms:>10.2f}{scan_hits:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# 基准测试用的确定性假连接器：不依赖数据库，每次运行返回完全相同的元数据与结果行
+# benchmarks/fake_connector.py
+import os
+import re
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_dataset import BenchDataset  # noqa: E402
+from db_connectors.results import ResultBudget, check_format  # noqa: E402
+from db_connectors.sql_text import is_read_only_sql  # noqa: E402
+from tools.column_index import like_matcher  # noqa: E402
+
+_FROM_TABLE = re.compile(r"\bFROM\s+[`\"]?(\w+)[`\"]?", re.IGNORECASE)
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+))?\s*$", re.IGNORECASE)
+
+
+class FakeConnector:
+    """
+    实现工具层调用的连接器接口，直接从 BenchDataset 生成结果；latency_ms 为每次调用模拟的数据库耗时（sleep 释放 GIL）。
+    只支持基准负载用到的 SELECT * FROM <表> [LIMIT n] 形式查询，不支持流式游标。
+    """
+
+    def __init__(self, dataset: BenchDataset, latency_ms: float = 0.0):
+        self.dataset = dataset
+        self.latency = latency_ms / 1000
+
+    def _wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _table(self, table_name: str) -> str:
+        if table_name not in self.dataset.table_names:
+            raise ValueError(f"Unknown table '{table_name}'.")
+        return table_name
+
+    def connect(self):
+        pass
+
+    def get_schema_watermark(self):
+        return (len(self.dataset.table_names), self.dataset.rows_per_table)
+
+    def expire_structure_fingerprints(self):
+        pass
+
+    def get_table_versions(self):
+        return {table: "fake" for table in self.dataset.table_names}
+
+    def get_pool_stats(self):
+        return {"fake": True, "latencyMs": self.latency * 1000}
+
+    def get_server_status(self):
+        self._wait()
+        return {"version": "fake", "tables": len(self.dataset.table_names)}
+
+    def list_tables(self):
+        self._wait()
+        return list(self.dataset.table_names)
+
+    def list_databases(self):
+        self._wait()
+        return ["bench"]
+
+    def list_views(self, snippet_length: int = 160, prefix: Optional[str] = None, limit=None, offset: int = 0):
+        self._wait()
+        return []
+
+    def get_table_schema(self, table_name: str):
+        self._wait()
+        return [
+            {
+                "Field": column["name"],
+                "Type": column["type"],
+                "Null": "NO" if column["key"] == "PRI" else "YES",
+                "Key": column["key"],
+                "Default": None,
+                "Extra": "",
+            }
+            for column in self.dataset.columns(self._table(table_name))
+        ]
+
+    def get_table_stats(self, result_format: str = "rows"):
+        self._wait()
+        return [
+            {"table_name": table, "table_rows": self.dataset.rows_per_table, "data_length": 0, "index_length": 0}
+            for table in self.dataset.table_names
+        ]
+
+    def get_index_info(self, table_name: str):
+        self._wait()
+        return [
+            {
+                "index_name": "PRIMARY" if column["key"] == "PRI" else f"idx_{column['name']}",
+                "column_name": column["name"],
+                "non_unique": column["key"] != "PRI",
+                "seq_in_index": 1,
+            }
+            for column in self.dataset.columns(self._table(table_name))
+            if column["key"]
+        ]
+
+    def find_foreign_keys(self, table_name: Optional[str] = None):
+        self._wait()
+        tables = [self._table(table_name)] if table_name else self.dataset.table_names
+        return [
+            {
+                "table_name": table,
+                "column_name": "parent_id",
+                "referenced_table_name": table,
+                "referenced_column_name": "id",
+            }
+            for table in tables
+        ]
+
+    def get_triggers(self, table_name: Optional[str] = None):
+        self._wait()
+        return []
+
+    def list_procedures(self, include_functions: bool = True):
+        self._wait()
+        return []
+
+    def search_columns(self, keyword: str):
+        self._wait()
+        matches = like_matcher(keyword)
+        return [
+            {
+                "table_name": table,
+                "column_name": column["name"],
+                "column_type": column["type"],
+                "column_comment": "",
+            }
+            for table in self.dataset.table_names
+            for column in self.dataset.columns(table)
+            if matches(column["name"])
+        ]
+
+    def describe_column(self, table_name: str, column_name: str):
+        self._wait()
+        for column in self.dataset.columns(self._table(table_name)):
+            if column["name"] == column_name:
+                return {"column_name": column_name, "column_type": column["type"], "column_key": column["key"]}
+        return {}
+
+    def is_read_only_query(self, sql: str) -> bool:
+        return is_read_only_sql(sql)
+
+    def run_query(
+        self,
+        sql: str,
+        params=None,
+        page_size: Optional[int] = None,
+        budget: Optional[ResultBudget] = None,
+        result_format: str = "rows",
+    ):
+        if not self.is_read_only_query(sql):
+            raise ValueError("Only read-only SQL statements are allowed.")
+        if page_size is not None:
+            raise ValueError("The fake connector does not support streaming.")
+        check_format(result_format)
+        budget = budget or ResultBudget.from_request()
+        limited_sql, limit_injected = budget.limit_sql(sql)
+        match = _FROM_TABLE.search(limited_sql)
+        if match is None:
+            self._wait()
+            row = {"value": 1} if result_format == "rows" else (1,)
+            return budget.apply(("value",), [row], result_format=result_format)
+
+        table = self._table(match.group(1))
+        limit, offset = None, 0
+        limit_match = _LIMIT.search(limited_sql.strip().rstrip(";"))
+        if limit_match:
+            if limit_match.group(2):
+                offset, limit = int(limit_match.group(1)), int(limit_match.group(2))
+            else:
+                limit = int(limit_match.group(1))
+        self._wait()
+        columns = self.dataset.column_names(table)
+        rows = self.dataset.rows(table, limit, offset)
+        if result_format == "rows":
+            rows = [dict(zip(columns, row)) for row in rows]
+        return budget.apply(columns, rows, limit_injected=limit_injected, result_format=result_format)
+
+    def sample_rows(self, table_name: str, limit: int = 5, budget=None, result_format: str = "rows", **sampling):
+        # 基准负载只关心调用开销，抽样参数被忽略，始终返回前 limit 行
+        return self.run_query(
+            f"SELECT * FROM {self._table(table_name)} LIMIT {int(limit)}",
+            budget=budget,
+            result_format=result_format,
+        )
+
+    def explain_query(self, sql: str, params=None):
+        if not self.is_read_only_query(sql):
+            raise ValueError("Only read-only SQL statements can be explained.")
+        self._wait()
+        match = _FROM_TABLE.search(sql)
+        return [
+            {
+                "id": 1,
+                "select_type": "SIMPLE",
+                "table": match.group(1) if match else None,
+                "type": "ALL",
+                "rows": self.dataset.rows_per_table,
+            }
+        ]
+
+    def close(self):
+        pass
@@ -0,0 +1,21 @@
+# 基准测试入口：把假连接器注入工具层后启动 stdio 服务，其余代码路径与 server.py 完全一致
+# benchmarks/fake_server.py
+#
+# 由 stdio_bench.py 以子进程方式启动；数据集大小与模拟延迟通过环境变量传入
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools.schema_tools as schema_tools  # noqa: E402
+from benchmarks.bench_dataset import BenchDataset  # noqa: E402
+from benchmarks.fake_connector import FakeConnector  # noqa: E402
+from mcp_protocol.server_base import start_server  # noqa: E402
+
+if __name__ == "__main__":
+    dataset = BenchDataset(
+        tables=int(os.getenv("BENCH_TABLES", 40)),
+        rows_per_table=int(os.getenv("BENCH_ROWS_PER_TABLE", 20000)),
+    )
+    schema_tools._connector = FakeConnector(dataset, latency_ms=float(os.getenv("BENCH_FAKE_LATENCY_MS", 0)))
+    start_server()
@@ -0,0 +1,105 @@
+# 只读 SQL 判定基准：对比原前缀检查、词法分析（未命中缓存）与 LRU 命中时的单条语句耗时
+# benchmarks/readonly_classifier_bench.py
+#
+# 用法：python benchmarks/readonly_classifier_bench.py [--repeat 200]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_connectors.sql_text import _classify, is_read_only_sql  # noqa: E402
+
+
+def legacy_is_read_only(sql: str) -> bool:
+    """改造前 MySQLConnector.is_read_only_query 的前缀检查，作为基线。"""
+    stripped = sql.strip()
+    if not stripped:
+        return False
+    if ";" in stripped[:-1]:
+        return False
+    upper_sql = stripped.lstrip("(").upper()
+    for prefix in ("SELECT", "SHOW", "DESCRIBE", "EXPLAIN", "WITH"):
+        if upper_sql.startswith(prefix):
+            if prefix == "WITH":
+                return "SELECT" in upper_sql
+            return True
+    return False
+
+
+def build_statements() -> dict:
+    """生成一条常见查询，以及几类大语句：宽 SELECT、长 IN 列表、多层 CTE 与含大量字符串字面量的语句。"""
+    typical = (
+        "SELECT o.id, o.amount, c.name FROM orders AS o JOIN customers AS c ON c.id = o.customer_id "
+        "WHERE o.created_at >= '2024-01-01' AND c.region = 'EU' ORDER BY o.amount DESC LIMIT 50"
+    )
+    wide = "SELECT " + ", ".join(f"t.column_{i} AS alias_{i}" for i in range(2000)) + " FROM wide_table AS t"
+    in_list = "SELECT id, name FROM customers WHERE id IN (" + ", ".join(str(i) for i in range(20000)) + ")"
+    ctes = "WITH " + ", ".join(
+        f"cte_{i} AS (SELECT id, SUM(amount) AS total FROM orders_{i} GROUP BY id)" for i in range(300)
+    ) + " SELECT * FROM " + " JOIN ".join(f"cte_{i} USING (id)" for i in range(300))
+    literals = (
+        "SELECT * FROM notes WHERE body IN ("
+        + ", ".join(f"'note; with -- tricky /* text */ {i}'" for i in range(5000))
+        + ") -- trailing comment"
+    )
+    return {
+        "typical query": typical,
+        "wide select": wide,
+        "large IN list": in_list,
+        "300 CTEs": ctes,
+        "string literals": literals,
+    }
+
+
+# 判定必须保持的结论：可执行注释（MySQL 的 /*! */ 与 MariaDB 的 /*M! */）中的写操作会被执行，必须拒绝
+EXPECTED_VERDICTS = (
+    ("SELECT 1 /*! INTO OUTFILE '/tmp/x' */", False),
+    ("SELECT 1 /*!50100 INTO OUTFILE '/tmp/x' */", False),
+    ("SELECT 1 /*M! INTO OUTFILE '/tmp/x' */", False),
+    ("SELECT 1 /*M!100000 INTO OUTFILE '/tmp/x' */", False),
+    ("SELECT 1 /*M!100000 , 2 */", True),
+    ("SELECT /*+ MAX_EXECUTION_TIME(1000) */ 1", True),
+    ("SELECT 1 /* M! INTO OUTFILE '/tmp/x' */", True),
+)
+
+
+def check_verdicts() -> list:
+    """返回与 EXPECTED_VERDICTS 不符的语句。"""
+    return [sql for sql, expected in EXPECTED_VERDICTS if _classify(sql) != expected]
+
+
+def per_call_us(func, sql: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(sql)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    mismatched = check_verdicts()
+    if mismatched:
+        for sql in mismatched:
+            print(f"unexpected verdict: {sql}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'statement':<18}{'size':>10}{'legacy':>14}{'tokenizer':>14}{'cached':>12}  verdict")
+    # 超过 4 KiB 的语句以摘要为缓存键，命中时的耗时主要是计算摘要
+    for label, sql in build_statements().items():
+        legacy = per_call_us(legacy_is_read_only, sql, args.repeat)
+        uncached = per_call_us(_classify, sql, max(args.repeat // 10, 1))
+        is_read_only_sql(sql)  # 预热缓存
+        cached = per_call_us(is_read_only_sql, sql, args.repeat)
+        print(
+            f"{label:<18}{len(sql) / 1024:>8.1f}KB{legacy:>12.1f}us{uncached:>12.1f}us{cached:>10.2f}us"
+            f"  {legacy_is_read_only(sql)} -> {_classify(sql)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
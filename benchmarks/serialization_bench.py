@@ -0,0 +1,100 @@
+# 响应序列化基准：对比 tinyrpc serialize() + decode() + 文本写出的旧路径与新序列化器
+# benchmarks/serialization_bench.py
+#
+# 用法：python benchmarks/serialization_bench.py [--rows 50000] [--repeat 5]
+import argparse
+import datetime
+import decimal
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tinyrpc.protocols.jsonrpc import JSONRPCProtocol  # noqa: E402
+
+from mcp_protocol.serialization import JSONSerializer, orjson  # noqa: E402
+
+
+def build_rows(count: int, typed: bool) -> list:
+    """构造模拟 runQuery 结果行；typed 为 True 时包含 Decimal / datetime / bytes / set 等 MySQL 类型。"""
+    base = datetime.datetime(2024, 1, 1, 8, 30)
+    rows = []
+    for index in range(count):
+        row = {
+            "id": index,
+            "name": f"customer-{index}",
+            "email": f"user{index}@example.com",
+            "score": index * 0.5,
+            "active": index % 2 == 0,
+            "note": None,
+        }
+        if typed:
+            row.update(
+                {
+                    "balance": decimal.Decimal(index) / 100,
+                    "created_at": base + datetime.timedelta(minutes=index),
+                    "birthday": datetime.date(1990, 1, 1) + datetime.timedelta(days=index % 365),
+                    "avatar": bytes([index % 256]) * 16,
+                    "tags": {"a", "b"},
+                }
+            )
+        rows.append(row)
+    return rows
+
+
+def legacy_path(response) -> int:
+    """旧路径：serialize() -> decode() -> 文本流写出（再次编码）。"""
+    stream = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+    stream.write(response.serialize().decode("utf-8") + "\n")
+    stream.flush()
+    return stream.buffer.tell()
+
+
+def serializer_path(serializer: JSONSerializer, response) -> int:
+    stream = io.BytesIO()
+    stream.write(serializer.dumps_response(response))
+    stream.write(b"\n")
+    return stream.tell()
+
+
+def bench(label: str, func, repeat: int) -> None:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = func()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"{label:<32} best {best * 1000:9.1f} ms   {size / 1024 / 1024:7.2f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    protocol = JSONRPCProtocol()
+    request = protocol.parse_request('{"jsonrpc": "2.0", "id": 1, "method": "runQuery", "params": []}')
+    stdlib = JSONSerializer(backend="json")
+    fast = JSONSerializer(backend="orjson") if orjson is not None else None
+
+    print(f"rows={args.rows} repeat={args.repeat} orjson={'yes' if fast else 'no'}")
+    print("-- plain rows (types the legacy path can encode)")
+    plain = request.respond({"columns": [], "rows": build_rows(args.rows, typed=False)})
+    bench("legacy serialize+decode", lambda: legacy_path(plain), args.repeat)
+    bench("stdlib serializer", lambda: serializer_path(stdlib, plain), args.repeat)
+    if fast:
+        bench("orjson serializer", lambda: serializer_path(fast, plain), args.repeat)
+
+    print("-- typed rows (Decimal / datetime / bytes / set; legacy path raises TypeError)")
+    typed = request.respond({"columns": [], "rows": build_rows(args.rows, typed=True)})
+    bench("stdlib serializer", lambda: serializer_path(stdlib, typed), args.repeat)
+    if fast:
+        bench("orjson serializer", lambda: serializer_path(fast, typed), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
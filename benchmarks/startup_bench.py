@@ -0,0 +1,95 @@
+# 启动耗时基准：测量从启动 server.py 到首个 ping 返回的时间，并检查此时数据库驱动尚未导入
+# benchmarks/startup_bench.py
+#
+# 用法：python benchmarks/startup_bench.py [--runs 10] [--target-ms 150]
+# 超过目标耗时或 ping 返回前已加载 mysql.connector 时退出码为 1，可直接用于 CI 检查
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PING = b'{"jsonrpc": "2.0", "id": 1, "method": "ping"}\n'
+# ping 不应触发的重量级模块
+DEFERRED_MODULES = ("mysql.connector", "tools.schema_tools", "tools.query_tools", "cProfile")
+
+
+def run_once(env: dict) -> tuple:
+    """
+    启动服务并发送 ping，返回 (首个响应耗时秒, 服务模块导入耗时秒, ping 返回前已导入的延迟模块)。
+    -X importtime 的输出按导入顺序写到 stderr，收到响应后立即关闭 stdin，之后不会再有新的导入。
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "server.py"],
+        cwd=ROOT,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    process.stdin.write(PING)
+    process.stdin.flush()
+    response = process.stdout.readline()
+    elapsed = time.perf_counter() - started
+    process.stdin.close()
+    stderr = process.stderr.read().decode(errors="replace")
+    process.wait()
+    if b'"pong"' not in response:
+        raise RuntimeError(f"Unexpected ping response {response!r}:\n{stderr}")
+
+    import_time = 0.0
+    loaded = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue  # 表头行
+        if name == "mcp_protocol.server_base":
+            import_time = int(cumulative) / 1e6
+        if name in DEFERRED_MODULES:
+            loaded.add(name)
+    return elapsed, import_time, sorted(loaded)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure time from server start to the first ping response.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=150.0, help="median time-to-first-ping budget")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # 预热会在后台导入驱动，测量冷启动路径时关闭
+    env["MCP_PREWARM"] = "false"
+    # settings 在导入时解析 DB_PORT，.env 中为占位符时补一个合法值；ping 不会连接数据库
+    if not env.get("DB_PORT", "").isdigit():
+        env["DB_PORT"] = "3306"
+
+    first_ping, imports, violations = [], [], set()
+    for _ in range(args.runs):
+        elapsed, import_time, loaded = run_once(env)
+        first_ping.append(elapsed)
+        imports.append(import_time)
+        violations.update(loaded)
+
+    median = statistics.median(first_ping) * 1000
+    print(f"time to first ping : median {median:.1f} ms, min {min(first_ping) * 1000:.1f} ms ({args.runs} runs)")
+    print(f"server_base import : median {statistics.median(imports) * 1000:.1f} ms")
+    failed = False
+    if violations:
+        print(f"FAIL: loaded before ping answered: {', '.join(sorted(violations))}")
+        failed = True
+    if median > args.target_ms:
+        print(f"FAIL: median {median:.1f} ms exceeds the {args.target_ms:.0f} ms target")
+        failed = True
+    if not failed:
+        print(f"OK: within the {args.target_ms:.0f} ms target; deferred modules were not loaded")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
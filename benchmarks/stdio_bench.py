@@ -0,0 +1,422 @@
+# 端到端基准：以子进程方式启动 stdio 服务，通过管道回放 JSON-RPC 负载，统计吞吐、延迟分位数、峰值 RSS 与输出字节数
+# benchmarks/stdio_bench.py
+#
+# 用法：
+#   python benchmarks/stdio_bench.py                                  # 假连接器上运行全部内置负载
+#   python benchmarks/stdio_bench.py --workload mixed --output run.json
+#   python benchmarks/stdio_bench.py --compare baseline.json run.json  # 对比两次运行，发现回退时退出码为 1
+#   python benchmarks/stdio_bench.py --target sqlite                  # 在临时生成的 SQLite 替身库上运行
+#   python benchmarks/stdio_bench.py --target mysql                   # 使用 .env / 环境变量中的 MySQL 配置
+#   python benchmarks/stdio_bench.py --dump-sql bench.sql             # 导出同一数据集，供导入 MySQL
+#   python benchmarks/stdio_bench.py --save-workload mixed.jsonl --workload mixed
+#   python benchmarks/stdio_bench.py --workload recorded.jsonl        # 回放录制的请求（每行一个 JSON-RPC 请求）
+import argparse
+import datetime
+import decimal
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_dataset import BenchDataset  # noqa: E402
+
+# 对比时各指标的方向：1 表示越大越好，-1 表示越小越好
+COMPARED_METRICS = {
+    "requestsPerSecond": 1,
+    "p50Ms": -1,
+    "p95Ms": -1,
+    "p99Ms": -1,
+    "peakRssMiB": -1,
+    "bytesWritten": -1,
+}
+
+
+def metadata_workload(dataset: BenchDataset, count: int) -> List[Tuple[str, dict]]:
+    """元数据类调用轮流访问各表，命中元数据缓存的比例与真实巡检场景相近。"""
+    rng = random.Random(1)
+    calls = []
+    for index in range(count):
+        table = rng.choice(dataset.table_names)
+        kind = index % 8
+        if kind == 0:
+            calls.append(("listTables", {}))
+        elif kind == 1:
+            calls.append(("getTableSchema", {"table_name": table}))
+        elif kind == 2:
+            calls.append(("getIndexInfo", {"table_name": table}))
+        elif kind == 3:
+            calls.append(("findForeignKeys", {"tableName": table}))
+        elif kind == 4:
+            calls.append(("describeColumn", {"tableName": table, "columnName": "amount"}))
+        elif kind == 5:
+            calls.append(("searchColumns", {"keyword": rng.choice(["attr", "name", "id", "created"])}))
+        elif kind == 6:
+            calls.append(("listViews", {"limit": 50}))
+        else:
+            calls.append(("getTableStats", {}))
+    return calls
+
+
+def large_result_workload(dataset: BenchDataset, count: int) -> List[Tuple[str, dict]]:
+    """整表读取，轮换三种结果编码，主要压测行转换与序列化。"""
+    formats = ("rows", "arrays", "columnar")
+    return [
+        (
+            "runQuery",
+            {
+                "sql": f"SELECT * FROM {dataset.table_names[index % len(dataset.table_names)]}",
+                "format": formats[index % len(formats)],
+            },
+        )
+        for index in range(count)
+    ]
+
+
+def mixed_workload(dataset: BenchDataset, count: int) -> List[Tuple[str, dict]]:
+    """按固定种子混合元数据、小查询、抽样与中等结果查询，用于并发场景。"""
+    rng = random.Random(7)
+    metadata = metadata_workload(dataset, count)
+    calls = []
+    for index in range(count):
+        table = rng.choice(dataset.table_names)
+        roll = rng.random()
+        if roll < 0.6:
+            calls.append(metadata[index])
+        elif roll < 0.85:
+            calls.append(("runQuery", {"sql": f"SELECT * FROM {table} LIMIT {rng.randint(1, 50)}"}))
+        elif roll < 0.95:
+            calls.append(("sampleRows", {"tableName": table, "limit": 20}))
+        else:
+            calls.append(("runQuery", {"sql": f"SELECT * FROM {table} LIMIT 5000", "format": "arrays"}))
+    return calls
+
+
+# 名称 -> (生成函数, 默认请求数, 默认客户端并发窗口)
+WORKLOADS = {
+    "metadata": (metadata_workload, 4000, 8),
+    "large": (large_result_workload, 60, 2),
+    "mixed": (mixed_workload, 4000, 16),
+}
+
+
+def to_requests(calls: List[Tuple[str, dict]]) -> List[dict]:
+    return [
+        {"jsonrpc": "2.0", "id": index, "method": method, "params": params}
+        for index, (method, params) in enumerate(calls, start=1)
+    ]
+
+
+def load_recorded(path: str) -> List[dict]:
+    """读取录制的负载，重新编号 id，避免与录制时的编号或通知类请求冲突。"""
+    requests = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                request = json.loads(line)
+                request["id"] = len(requests) + 1
+                requests.append(request)
+    return requests
+
+
+def build_sqlite(dataset: BenchDataset, path: str) -> None:
+    """生成与假连接器数据一致的 SQLite 替身库。"""
+    connection = sqlite3.connect(path)
+    try:
+        for table in dataset.table_names:
+            columns = dataset.columns(table)
+            definition = ", ".join(f"{column['name']} {column['sql']}" for column in columns)
+            connection.execute(f"CREATE TABLE {table} ({definition})")
+            connection.execute(f"CREATE INDEX idx_{table}_created_at ON {table} (created_at)")
+            placeholders = ", ".join("?" for _ in columns)
+            connection.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})",
+                ([_sqlite_value(value) for value in row] for row in dataset.rows(table)),
+            )
+        connection.execute("ANALYZE")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _sqlite_value(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def _sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return f"'{value.isoformat(sep=' ')}'"
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def dump_sql(dataset: BenchDataset, path: str, batch_size: int = 500) -> None:
+    """导出 MySQL 可执行的建表与插入语句。"""
+    with open(path, "w", encoding="utf-8") as handle:
+        for table in dataset.table_names:
+            columns = dataset.columns(table)
+            definition = ", ".join(
+                f"`{column['name']}` {column['sql'].replace('INTEGER PRIMARY KEY', 'INT PRIMARY KEY')}"
+                for column in columns
+            )
+            handle.write(f"DROP TABLE IF EXISTS `{table}`;\n")
+            handle.write(f"CREATE TABLE `{table}` ({definition}, KEY `idx_created_at` (`created_at`));\n")
+            rows = dataset.rows(table)
+            for start in range(0, len(rows), batch_size):
+                values = ",\n".join(
+                    "(" + ", ".join(_sql_literal(value) for value in row) + ")"
+                    for row in rows[start:start + batch_size]
+                )
+                handle.write(f"INSERT INTO `{table}` VALUES\n{values};\n")
+
+
+def _peak_rss_kib(pid: int) -> Optional[int]:
+    """读取子进程的峰值常驻内存（Linux 的 VmHWM），不可用时返回 None。"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(q * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def run_workload(command: List[str], env: Dict[str, str], requests: List[dict], concurrency: int) -> dict:
+    """
+    启动服务进程并回放请求：客户端最多保持 concurrency 个未完成请求，按 id 匹配响应计算延迟。
+    计时从服务就绪（预热 ping 返回）后开始，不含进程启动时间。
+    """
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        command, cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr
+    )
+    try:
+        process.stdin.write(b'{"jsonrpc": "2.0", "id": 0, "method": "ping"}\n')
+        process.stdin.flush()
+        if not process.stdout.readline():
+            stderr.seek(0)
+            raise RuntimeError(f"Server exited during startup:\n{stderr.read().decode(errors='replace')}")
+
+        window = threading.Semaphore(concurrency)
+        sent_at: Dict[int, float] = {}
+        latencies: List[float] = []
+        state = {"errors": 0, "bytes": 0}
+        done = threading.Event()
+
+        def read_responses() -> None:
+            for line in process.stdout:
+                received = time.perf_counter()
+                state["bytes"] += len(line)
+                message = json.loads(line)
+                latencies.append(received - sent_at.pop(message.get("id")))
+                if "error" in message:
+                    state["errors"] += 1
+                window.release()
+                if len(latencies) == len(requests):
+                    break
+            done.set()
+
+        reader = threading.Thread(target=read_responses, daemon=True)
+        reader.start()
+        started = time.perf_counter()
+        for request in requests:
+            window.acquire()
+            line = (json.dumps(request, separators=(",", ":")) + "\n").encode("utf-8")
+            sent_at[request["id"]] = time.perf_counter()
+            process.stdin.write(line)
+            process.stdin.flush()
+        done.wait()
+        elapsed = time.perf_counter() - started
+        peak_rss = _peak_rss_kib(process.pid)
+    finally:
+        process.stdin.close()
+        process.wait()
+        stderr.close()
+    if peak_rss is None:
+        # 非 Linux 平台退回到已回收子进程的最大 RSS（macOS 单位为字节，其余为 KiB）
+        peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if platform.system() == "Darwin":
+            peak_rss //= 1024
+
+    latencies.sort()
+    return {
+        "requests": len(requests),
+        "concurrency": concurrency,
+        "errors": state["errors"],
+        "elapsedSeconds": round(elapsed, 3),
+        "requestsPerSecond": round(len(requests) / elapsed, 1) if elapsed else 0.0,
+        "p50Ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95Ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99Ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "maxMs": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "peakRssMiB": round(peak_rss / 1024, 1),
+        "bytesWritten": state["bytes"],
+    }
+
+
+def server_command(args, dataset: BenchDataset) -> Tuple[List[str], Dict[str, str], Optional[str]]:
+    """返回 (启动命令, 环境变量, 需要清理的临时文件)。"""
+    env = dict(os.environ)
+    # 大结果负载需要放开全局行数与字节上限；请求参数只能收紧这两个上限
+    env.setdefault("MCP_MAX_ROWS", str(dataset.rows_per_table))
+    env.setdefault("MCP_MAX_RESULT_BYTES", "0")
+    env["PYTHONUNBUFFERED"] = "1"
+    if args.target == "mysql":
+        return [sys.executable, "server.py"], env, None
+
+    # 假连接器与 SQLite 替身不读取 MySQL 配置，但 settings 会解析 DB_PORT
+    if not env.get("DB_PORT", "").isdigit():
+        env["DB_PORT"] = "3306"
+    if args.target == "sqlite":
+        path = args.sqlite_path
+        cleanup = None
+        if not path:
+            handle, path = tempfile.mkstemp(suffix=".db", prefix="mcp-bench-")
+            os.close(handle)
+            os.unlink(path)
+            build_sqlite(dataset, path)
+            cleanup = path
+        env.update({"DB_TYPE": "sqlite", "DB_PATH": path})
+        return [sys.executable, "server.py"], env, cleanup
+
+    env.update(
+        {
+            "BENCH_TABLES": str(len(dataset.table_names)),
+            "BENCH_ROWS_PER_TABLE": str(dataset.rows_per_table),
+            "BENCH_FAKE_LATENCY_MS": str(args.fake_latency_ms),
+        }
+    )
+    return [sys.executable, os.path.join("benchmarks", "fake_server.py")], env, None
+
+
+def compare_runs(baseline: dict, current: dict, threshold: float) -> bool:
+    """逐个负载对比指标，变差幅度超过 threshold% 的标记为回退，返回是否存在回退。"""
+    regressed = False
+    for key in ("target", "dataset"):
+        if baseline.get(key) != current.get(key):
+            print(f"[WARN] {key} differs: {baseline.get(key)} -> {current.get(key)}; results are not comparable.")
+    print(f"{'workload':<12}{'metric':<20}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, current_metrics in current["workloads"].items():
+        base_metrics = baseline["workloads"].get(name)
+        if base_metrics is None:
+            print(f"{name:<12}(not in baseline)")
+            continue
+        for metric, direction in COMPARED_METRICS.items():
+            before, after = base_metrics.get(metric), current_metrics.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            flag = ""
+            if change * direction < -threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            elif change * direction > threshold:
+                flag = "  improved"
+            print(f"{name:<12}{metric:<20}{before:>14}{after:>14}{change:>+9.1f}%{flag}")
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay JSON-RPC workloads against the stdio server.")
+    parser.add_argument("--target", choices=("fake", "sqlite", "mysql"), default="fake")
+    parser.add_argument("--workload", default="all", help="metadata / large / mixed / all, or a recorded .jsonl file")
+    parser.add_argument("--requests", type=int, help="override the request count of built-in workloads")
+    parser.add_argument("--concurrency", type=int, help="override the client-side in-flight window")
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--rows-per-table", type=int, default=20000)
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0, help="simulated DB time per fake call")
+    parser.add_argument("--sqlite-path", help="existing SQLite stand-in (generated in a temp file by default)")
+    parser.add_argument("--output", help="write results as JSON for later comparison")
+    parser.add_argument("--save-workload", help="write the generated requests as JSONL instead of running")
+    parser.add_argument("--dump-sql", help="write the benchmark dataset as MySQL DDL/INSERTs and exit")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        with open(args.compare[1], encoding="utf-8") as handle:
+            current = json.load(handle)
+        return 1 if compare_runs(baseline, current, args.threshold) else 0
+
+    dataset = BenchDataset(tables=args.tables, rows_per_table=args.rows_per_table)
+    if args.dump_sql:
+        dump_sql(dataset, args.dump_sql)
+        print(f"Wrote {len(dataset.table_names)} tables to {args.dump_sql}")
+        return 0
+
+    if os.path.isfile(args.workload):
+        plans = {os.path.basename(args.workload): (load_recorded(args.workload), args.concurrency or 8)}
+    else:
+        names = list(WORKLOADS) if args.workload == "all" else [args.workload]
+        plans = {}
+        for name in names:
+            if name not in WORKLOADS:
+                parser.error(f"unknown workload '{name}'")
+            generate, count, concurrency = WORKLOADS[name]
+            plans[name] = (to_requests(generate(dataset, args.requests or count)), args.concurrency or concurrency)
+
+    if args.save_workload:
+        with open(args.save_workload, "w", encoding="utf-8") as handle:
+            for requests, _ in plans.values():
+                for request in requests:
+                    handle.write(json.dumps(request) + "\n")
+        print(f"Wrote {sum(len(requests) for requests, _ in plans.values())} requests to {args.save_workload}")
+        return 0
+
+    command, env, cleanup = server_command(args, dataset)
+    results = {
+        "target": args.target,
+        "python": platform.python_version(),
+        "dataset": {"tables": args.tables, "rowsPerTable": args.rows_per_table},
+        "workloads": {},
+    }
+    try:
+        print(f"{'workload':<12}{'reqs':>7}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+              f"{'p99 ms':>10}{'RSS MiB':>9}{'MiB out':>9}{'errors':>8}")
+        for name, (requests, concurrency) in plans.items():
+            result = run_workload(command, env, requests, concurrency)
+            results["workloads"][name] = result
+            print(
+                f"{name:<12}{result['requests']:>7}{concurrency:>6}{result['requestsPerSecond']:>10}"
+                f"{result['p50Ms']:>10}{result['p95Ms']:>10}{result['p99Ms']:>10}{result['peakRssMiB']:>9}"
+                f"{result['bytesWritten'] / 1024 / 1024:>9.1f}{result['errors']:>8}"
+            )
+    finally:
+        if cleanup:
+            os.unlink(cleanup)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
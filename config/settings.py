@@ -10,5 +10,142 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT", 3306)),
     "user": os.getenv("DB_USER", "root"),
     "password": os.getenv("DB_PASS", ""),
-    "database": os.getenv("DB_NAME", "")
+    "database": os.getenv("DB_NAME", ""),
+    # 连接池参数：超时与生命周期单位均为秒
+    "pool_min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+    "pool_max_size": int(os.getenv("DB_POOL_MAX_SIZE", 8)),
+    "pool_checkout_timeout": float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", 10)),
+    "pool_max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+    "pool_reset_on_return": os.getenv("DB_POOL_RESET_ON_RETURN", "true").lower() in ("1", "true", "yes"),
+    # 空闲连接保活间隔与建连失败后的指数退避区间（秒）
+    "keepalive_interval": float(os.getenv("DB_KEEPALIVE_INTERVAL", 300)),
+    "reconnect_backoff_base": float(os.getenv("DB_RECONNECT_BACKOFF_BASE", 0.5)),
+    "reconnect_backoff_max": float(os.getenv("DB_RECONNECT_BACKOFF_MAX", 30)),
+    # 带参数查询改用二进制协议预处理语句（默认关闭），以及每条连接缓存的语句句柄数
+    "prepared_statements": os.getenv("DB_PREPARED_STATEMENTS", "false").lower() in ("1", "true", "yes"),
+    "prepared_cache_size": int(os.getenv("DB_PREPARED_CACHE_SIZE", 64)),
+    # MySQL：逐表结构指纹（列、索引、外键、触发器）作为水位线与快照表版本的兜底信号，按此间隔（秒）重新计算，0 表示不计算
+    "structure_digest_interval": float(os.getenv("DB_STRUCTURE_DIGEST_INTERVAL", 600)),
+    # SQLite（DB_TYPE=sqlite）：数据库文件路径（默认取 DB_NAME）、是否以 immutable 方式只读打开、
+    # mmap 映射字节数与页缓存大小（KiB）
+    "sqlite_path": os.getenv("DB_PATH", os.getenv("DB_NAME", "")),
+    "sqlite_immutable": os.getenv("DB_SQLITE_IMMUTABLE", "true").lower() in ("1", "true", "yes"),
+    "sqlite_mmap_size": int(os.getenv("DB_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "sqlite_cache_size_kib": int(os.getenv("DB_SQLITE_CACHE_SIZE_KIB", 64 * 1024)),
+}
+
+# MCP 服务运行参数：MCP_MAX_WORKERS <= 1 时退回逐条串行处理
+SERVER_CONFIG = {
+    "max_workers": int(os.getenv("MCP_MAX_WORKERS", 8)),
+    "max_pending": int(os.getenv("MCP_MAX_PENDING", 64)),
+    # 批量请求：单批最多包含的调用数，以及所有批内调用共享的并发上限（<= 1 时批内串行执行）
+    "max_batch_size": int(os.getenv("MCP_MAX_BATCH_SIZE", 100)),
+    "batch_concurrency": int(os.getenv("MCP_BATCH_CONCURRENCY", 8)),
+    # 只读 SQL 判定结果的 LRU 缓存条目数
+    "read_only_cache_size": int(os.getenv("MCP_READONLY_CACHE_SIZE", 2048)),
+    # 启动后在后台导入工具模块与数据库驱动并预先建立连接，与客户端握手并行进行
+    "prewarm": os.getenv("MCP_PREWARM", "false").lower() in ("1", "true", "yes"),
+}
+
+# 指标导出：设置 MCP_METRICS_TEXTFILE 后每隔 interval 秒写出 Prometheus 文本格式文件，供 node_exporter 采集
+METRICS_CONFIG = {
+    "textfile_path": os.getenv("MCP_METRICS_TEXTFILE", ""),
+    "textfile_interval": float(os.getenv("MCP_METRICS_TEXTFILE_INTERVAL", 15)),
+}
+
+# 请求级剖析：按百分比抽样（0 表示关闭），模式为 cpu / memory / both；设置 MCP_PROFILE_DIR 时写出完整剖析文件
+PROFILE_CONFIG = {
+    "sample_percent": float(os.getenv("MCP_PROFILE_SAMPLE_PERCENT", 0)),
+    "mode": os.getenv("MCP_PROFILE_MODE", "cpu").lower(),
+    "top_n": int(os.getenv("MCP_PROFILE_TOP_N", 20)),
+    "output_dir": os.getenv("MCP_PROFILE_DIR", ""),
+    "allow_request": os.getenv("MCP_PROFILE_ALLOW_REQUEST", "true").lower() in ("1", "true", "yes"),
+}
+
+# 响应序列化：backend 为 auto / orjson / json，二进制列按 base64 或 hex 编码
+SERIALIZER_CONFIG = {
+    "backend": os.getenv("MCP_JSON_BACKEND", "auto").lower(),
+    "bytes_encoding": os.getenv("MCP_BYTES_ENCODING", "base64").lower(),
+}
+
+# 元数据缓存：各工具 TTL（秒）可通过 MCP_CACHE_TTL_<工具名> 单独覆盖，TTL 为 0 表示不缓存该工具
+_CACHE_DEFAULT_TTL = float(os.getenv("MCP_CACHE_TTL", 300))
+CACHE_CONFIG = {
+    "enabled": os.getenv("MCP_METADATA_CACHE", "true").lower() in ("1", "true", "yes"),
+    "max_entries": int(os.getenv("MCP_METADATA_CACHE_SIZE", 1024)),
+    "default_ttl": _CACHE_DEFAULT_TTL,
+    "watermark_interval": float(os.getenv("MCP_METADATA_WATERMARK_INTERVAL", 5)),
+    "tool_ttls": {
+        "listTables": float(os.getenv("MCP_CACHE_TTL_LIST_TABLES", _CACHE_DEFAULT_TTL)),
+        "getTableSchema": float(os.getenv("MCP_CACHE_TTL_GET_TABLE_SCHEMA", _CACHE_DEFAULT_TTL)),
+        "getIndexInfo": float(os.getenv("MCP_CACHE_TTL_GET_INDEX_INFO", _CACHE_DEFAULT_TTL)),
+        "findForeignKeys": float(os.getenv("MCP_CACHE_TTL_FIND_FOREIGN_KEYS", _CACHE_DEFAULT_TTL)),
+        "getTriggers": float(os.getenv("MCP_CACHE_TTL_GET_TRIGGERS", _CACHE_DEFAULT_TTL)),
+        "listProcedures": float(os.getenv("MCP_CACHE_TTL_LIST_PROCEDURES", _CACHE_DEFAULT_TTL)),
+        # searchColumns 的列索引：构建需要扫描全部列，库结构变化已由水位线触发重建，默认保留更久
+        "columnIndex": float(os.getenv("MCP_CACHE_TTL_COLUMN_INDEX", 3600)),
+    },
+    # searchColumns 使用进程内三元组索引（需要开启元数据缓存或快照），关闭时每次查询 information_schema
+    "column_index": os.getenv("MCP_COLUMN_INDEX", "true").lower() in ("1", "true", "yes"),
+}
+
+# 流式查询：每页默认/最大行数、同时打开的游标数与空闲游标回收时间（秒）
+STREAM_CONFIG = {
+    "default_page_size": int(os.getenv("MCP_STREAM_PAGE_SIZE", 500)),
+    "max_page_size": int(os.getenv("MCP_STREAM_MAX_PAGE_SIZE", 5000)),
+    "max_open": int(os.getenv("MCP_STREAM_MAX_OPEN", 4)),
+    "idle_timeout": float(os.getenv("MCP_STREAM_IDLE_TIMEOUT", 60)),
+}
+
+# 结果预算（全局上限，单次请求只能收紧）：最大行数、最大总字节数、单元格最大字节数，0 表示不限制
+RESULT_LIMITS = {
+    "max_rows": int(os.getenv("MCP_MAX_ROWS", 1000)),
+    "max_bytes": int(os.getenv("MCP_MAX_RESULT_BYTES", 4 * 1024 * 1024)),
+    "max_cell_bytes": int(os.getenv("MCP_MAX_CELL_BYTES", 64 * 1024)),
+}
+
+# sampleRows 抽样：默认策略（auto / first / pk_range / block / reservoir）、蓄水池抽样最多扫描的行数（单次请求只能收紧）
+# 与区块抽样每块的行数
+SAMPLE_CONFIG = {
+    "default_strategy": os.getenv("MCP_SAMPLE_STRATEGY", "auto").lower(),
+    "scan_limit": int(os.getenv("MCP_SAMPLE_SCAN_LIMIT", 10000)),
+    "block_size": int(os.getenv("MCP_SAMPLE_BLOCK_SIZE", 10)),
+}
+
+# 执行超时（秒，0 表示不限制）：单次调用的 timeout 只能收紧该值；SELECT 额外注入 MAX_EXECUTION_TIME 提示，
+# 看门狗在截止时间后再等待 kill_grace 秒仍未结束时，另开连接执行 KILL QUERY
+QUERY_TIMEOUT_CONFIG = {
+    "default_timeout": float(os.getenv("MCP_QUERY_TIMEOUT", 30)),
+    "kill_grace": float(os.getenv("MCP_QUERY_KILL_GRACE", 1)),
+    "server_hint": os.getenv("MCP_QUERY_TIMEOUT_HINT", "true").lower() in ("1", "true", "yes"),
+}
+
+# 多库并行调用（compareSchemasToBaseline 等）：并发上限（单次调用只能收紧，且不超过连接池上限）与单次最多涉及的库数
+FANOUT_CONFIG = {
+    "parallelism": int(os.getenv("MCP_FANOUT_PARALLELISM", 4)),
+    "max_schemas": int(os.getenv("MCP_FANOUT_MAX_SCHEMAS", 1000)),
+}
+
+# getTableStats 精确/索引计数：每张表的时间预算（秒，0 表示只受请求超时约束，单次调用只能收紧）、
+# 计数结果缓存的有效期（秒）与条目数；并发上限沿用 MCP_FANOUT_PARALLELISM
+ROW_COUNT_CONFIG = {
+    "budget": float(os.getenv("MCP_ROW_COUNT_BUDGET", 5)),
+    "ttl": float(os.getenv("MCP_ROW_COUNT_TTL", 600)),
+    "max_entries": int(os.getenv("MCP_ROW_COUNT_CACHE_SIZE", 4096)),
+}
+
+# 库结构快照（路径为空时关闭）：元数据持久化到本地 SQLite 文件，启动时直接加载，后台每 refresh_interval 秒增量刷新；
+# offline 为只读离线模式，不连接数据库，只由快照回答元数据工具
+SNAPSHOT_CONFIG = {
+    "path": os.getenv("MCP_SNAPSHOT_PATH", ""),
+    "refresh_interval": float(os.getenv("MCP_SNAPSHOT_REFRESH_INTERVAL", 60)),
+    "offline": os.getenv("MCP_OFFLINE", "false").lower() in ("1", "true", "yes"),
+}
+
+# 只读查询结果缓存（默认关闭）：总字节预算、最大条目数与默认 TTL（秒）
+QUERY_CACHE_CONFIG = {
+    "enabled": os.getenv("MCP_QUERY_CACHE", "false").lower() in ("1", "true", "yes"),
+    "max_bytes": int(os.getenv("MCP_QUERY_CACHE_BYTES", 64 * 1024 * 1024)),
+    "max_entries": int(os.getenv("MCP_QUERY_CACHE_ENTRIES", 4096)),
+    "default_ttl": float(os.getenv("MCP_QUERY_CACHE_TTL", 60)),
 }
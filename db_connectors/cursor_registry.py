@@ -0,0 +1,176 @@
+# 流式查询游标登记表
+# db_connectors/cursor_registry.py
+import secrets
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from db_connectors.execution import record_statement
+from db_connectors.results import ResultBudget, shape_rows
+
+
+class StreamingCursor:
+    """
+    一个未读完的服务端结果集：持有借出的连接与非缓冲游标，按页调用 fetchmany 拉取。
+    预读一行用于判断是否还有更多数据，内存占用始终不超过一页。
+    """
+
+    def __init__(
+        self,
+        cursor: Any,
+        columns,
+        lookahead: List[Any],
+        release: Callable[[bool], None],
+        budget: Optional[ResultBudget] = None,
+        result_format: str = "rows",
+        connection: Any = None,
+    ):
+        self.cursor = cursor
+        # 游标所在的驱动连接，超时或取消翻页时据此中止读取
+        self.connection = connection
+        self.columns = columns
+        self.budget = budget
+        self.result_format = result_format
+        self.rows_fetched = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.lock = threading.Lock()
+        self._lookahead = lookahead
+        self._release = release
+        self._exhausted = False
+        self._closed = False
+
+    def fetch(self, page_size: int) -> dict:
+        """返回下一页数据，读完后自动关闭游标并归还连接。"""
+        with self.lock:
+            if self._closed:
+                raise ValueError("Cursor is already closed.")
+            rows = self._lookahead
+            self._lookahead = []
+            if not self._exhausted and len(rows) <= page_size:
+                try:
+                    started = time.perf_counter()
+                    fetched = self.cursor.fetchmany(page_size + 1 - len(rows))
+                    record_statement(0.0, time.perf_counter() - started, len(fetched))
+                    rows.extend(fetched)
+                except Exception:
+                    self._close_locked()
+                    raise
+            if len(rows) > page_size:
+                self._lookahead = rows[page_size:]
+                rows = rows[:page_size]
+            else:
+                self._exhausted = True
+            self.rows_fetched += len(rows)
+            self.last_used = time.monotonic()
+            has_more = bool(self._lookahead)
+            if not has_more:
+                self._close_locked()
+            # 页大小已限定行数，流式模式下只对超长单元格做截断
+            truncated_cells = None
+            if self.budget is not None and self.budget.max_cell_bytes:
+                truncated_cells = self.budget.truncate_cells(self.columns, rows)
+            page = shape_rows(self.columns, rows, self.result_format)
+            page["hasMore"] = has_more
+            if truncated_cells is not None:
+                page["truncated"] = bool(truncated_cells)
+                if truncated_cells:
+                    page["truncatedCells"] = truncated_cells
+            return page
+
+    def close(self) -> None:
+        with self.lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        # 结果集未读完时无法在不消费剩余行的情况下关闭游标，直接丢弃连接让服务端中止发送
+        discard = not self._exhausted
+        if not discard:
+            try:
+                self.cursor.close()
+            except Exception:
+                discard = True
+        self._release(discard)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class CursorRegistry:
+    """
+    以不透明 token 登记打开的流式游标；后台线程回收空闲超过 idle_timeout 的游标，避免连接被长期占用。
+    """
+
+    def __init__(self, idle_timeout: float = 60.0, max_open: int = 4):
+        self.idle_timeout = idle_timeout
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, StreamingCursor] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self.reaped = 0
+
+    def has_capacity(self) -> bool:
+        with self._lock:
+            return len(self._cursors) < self.max_open
+
+    def register(self, cursor: StreamingCursor) -> str:
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            if len(self._cursors) >= self.max_open:
+                raise RuntimeError(
+                    f"Too many open cursors (limit {self.max_open}); close or drain existing cursors first."
+                )
+            self._cursors[token] = cursor
+            if self._reaper is None and self.idle_timeout > 0:
+                self._reaper = threading.Thread(target=self._reap_loop, name="cursor-reaper", daemon=True)
+                self._reaper.start()
+        return token
+
+    def get(self, token: str) -> StreamingCursor:
+        with self._lock:
+            cursor = self._cursors.get(token)
+        if cursor is None:
+            raise ValueError("Unknown or expired cursor.")
+        return cursor
+
+    def discard(self, token: str) -> bool:
+        """从登记表移除并关闭游标，返回是否存在该游标。"""
+        with self._lock:
+            cursor = self._cursors.pop(token, None)
+        if cursor is None:
+            return False
+        cursor.close()
+        return True
+
+    def forget(self, token: str) -> None:
+        """移除已自动关闭（读完）的游标。"""
+        with self._lock:
+            self._cursors.pop(token, None)
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+    def _reap_loop(self) -> None:
+        interval = max(self.idle_timeout / 2, 1.0)
+        while True:
+            time.sleep(interval)
+            threshold = time.monotonic() - self.idle_timeout
+            with self._lock:
+                expired = [
+                    token for token, cursor in self._cursors.items()
+                    if cursor.last_used <= threshold and not cursor.lock.locked()
+                ]
+                cursors = [self._cursors.pop(token) for token in expired]
+            for cursor in cursors:
+                try:
+                    cursor.close()
+                except Exception as exc:
+                    print(f"[WARN] Failed to close idle cursor: {exc}", file=sys.stderr)
+            if cursors:
+                self.reaped += len(cursors)
+                print(f"[INFO] Reaped {len(cursors)} idle cursor(s).", file=sys.stderr)
@@ -0,0 +1,260 @@
+# 请求级执行控制：超时、按 JSON-RPC id 取消、到期后中止数据库语句的看门狗线程，以及数据库耗时统计
+# db_connectors/execution.py
+import heapq
+import itertools
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import QUERY_TIMEOUT_CONFIG
+
+
+class QueryInterruptedError(Exception):
+    """
+    语句因超时或取消被中止。jsonrpc_error_code 与 data 会被 tinyrpc 写入错误响应，客户端可据此区分原因。
+    """
+
+    jsonrpc_error_code = -32001
+    reason = "interrupted"
+
+    def __init__(self, message: str, request_id: Any, timeout: Optional[float], elapsed: float):
+        super().__init__(message)
+        self.data = {
+            "reason": self.reason,
+            "requestId": request_id,
+            "timeoutSeconds": timeout,
+            "elapsedMs": round(elapsed * 1000, 1),
+        }
+
+
+class QueryTimeoutError(QueryInterruptedError):
+    jsonrpc_error_code = -32001
+    reason = "timeout"
+
+
+class QueryCancelledError(QueryInterruptedError):
+    jsonrpc_error_code = -32002
+    reason = "cancelled"
+
+
+class _Watchdog:
+    """
+    单个后台线程按到期时间顺序触发回调；撤销的条目惰性跳过，不必在堆中查找删除。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap: List[list] = []
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, due: float, callback: Callable[[], None]) -> list:
+        entry = [due, next(self._sequence), callback]
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-watchdog", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return entry
+
+    def unschedule(self, entry: list) -> None:
+        with self._cond:
+            entry[2] = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                callback = heapq.heappop(self._heap)[2]
+            try:
+                callback()
+            except Exception as exc:
+                print(f"[WARN] Query watchdog callback failed: {exc}", file=sys.stderr)
+
+
+_watchdog = _Watchdog()
+
+
+class ExecutionContext:
+    """
+    一次请求的执行状态：截止时间、取消原因，以及当前正在执行的语句的中止回调。
+    中止回调在持锁状态下调用，语句结束时需先获得同一把锁，保证中止请求不会落到连接上的下一条语句。
+    """
+
+    def __init__(self, request_id: Any = None, timeout: Optional[float] = None):
+        self.request_id = request_id
+        self.started_at = time.monotonic()
+        self.timeout: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._interrupt: Optional[Callable[[], None]] = None
+        # 本请求在数据库上执行语句与读取结果的累计耗时（秒）及读取的行数，供指标统计
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.rows_fetched = 0
+        self.tighten(timeout)
+
+    def tighten(self, timeout: Optional[float]) -> None:
+        """以请求开始时间为起点设置超时；已有更短的超时时保持不变。"""
+        if not timeout or timeout <= 0:
+            return
+        if self.timeout is None or timeout < self.timeout:
+            self.timeout = timeout
+            self.deadline = self.started_at + timeout
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def check(self) -> None:
+        """已取消或已超时则抛出对应异常。"""
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.reason = "timeout"
+        if self.reason is not None:
+            raise self.error()
+
+    def error(self) -> QueryInterruptedError:
+        """构造与中止原因对应的异常；原因未知（如服务端 MAX_EXECUTION_TIME 先行触发）时视为超时。"""
+        if self.reason == "cancelled":
+            return QueryCancelledError(
+                f"Request {self.request_id!r} was cancelled.", self.request_id, self.timeout, self.elapsed()
+            )
+        return QueryTimeoutError(
+            f"Query exceeded the {self.timeout}s execution timeout.", self.request_id, self.timeout, self.elapsed()
+        )
+
+    @contextmanager
+    def statement(self, interrupt: Callable[[], None], grace: float = 0.0):
+        """
+        登记正在执行的语句：超过截止时间 grace 秒后或收到取消请求时调用 interrupt 中止它。
+        """
+        self.check()
+        with self._lock:
+            self._interrupt = interrupt
+        entry = None
+        if self.deadline is not None:
+            entry = _watchdog.schedule(self.deadline + grace, lambda: self._stop("timeout"))
+        try:
+            yield
+        finally:
+            if entry is not None:
+                _watchdog.unschedule(entry)
+            with self._lock:
+                self._interrupt = None
+
+    def cancel(self) -> None:
+        self._stop("cancelled")
+
+    def _stop(self, reason: str) -> None:
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+            if self._interrupt is not None:
+                try:
+                    self._interrupt()
+                except Exception as exc:
+                    print(
+                        f"[WARN] Failed to interrupt statement for request {self.request_id!r}: {exc}",
+                        file=sys.stderr,
+                    )
+
+
+_local = threading.local()
+
+
+def record_statement(execute_time: float, fetch_time: float, rows: int) -> None:
+    """把一条语句的执行耗时、取数耗时与行数累加到当前请求上。"""
+    context = getattr(_local, "context", None)
+    if context is not None:
+        context.execute_time += execute_time
+        context.fetch_time += fetch_time
+        context.rows_fetched += rows
+
+
+def current_execution() -> Optional[ExecutionContext]:
+    """返回当前线程正在处理的请求的执行上下文，不在请求中时返回 None。"""
+    return getattr(_local, "context", None)
+
+
+@contextmanager
+def _activate(context: ExecutionContext):
+    previous = getattr(_local, "context", None)
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+class InFlightRequests:
+    """
+    按 JSON-RPC id 登记正在执行的请求，供 cancelRequest 查找；每个请求默认受全局超时约束。
+    """
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        self._requests: Dict[Any, List[ExecutionContext]] = {}
+        self.cancelled = 0
+
+    @contextmanager
+    def track(self, request_id: Any):
+        context = ExecutionContext(request_id, self.default_timeout)
+        # 通知类请求没有 id，无法被取消，但同样受超时约束
+        if request_id is None:
+            with _activate(context):
+                yield context
+            return
+        with self._lock:
+            self._requests.setdefault(request_id, []).append(context)
+        try:
+            with _activate(context):
+                yield context
+        finally:
+            with self._lock:
+                contexts = self._requests.get(request_id)
+                if contexts is not None:
+                    contexts.remove(context)
+                    if not contexts:
+                        del self._requests[request_id]
+
+    def cancel(self, request_id: Any) -> int:
+        """取消 id 匹配的所有在途请求，返回取消的数量。"""
+        with self._lock:
+            contexts = list(self._requests.get(request_id, ()))
+        for context in contexts:
+            context.cancel()
+        with self._lock:
+            self.cancelled += len(contexts)
+        return len(contexts)
+
+
+in_flight = InFlightRequests(QUERY_TIMEOUT_CONFIG["default_timeout"] or None)
+
+
+@contextmanager
+def execution_timeout(timeout: Optional[float]):
+    """
+    单次调用指定的超时只能收紧全局超时；不在请求中（如直接调用工具函数）时创建临时上下文。
+    """
+    if timeout is not None and timeout <= 0:
+        raise ValueError("timeout must be a positive number of seconds.")
+    context = current_execution()
+    if context is not None:
+        context.tighten(timeout)
+        yield context
+        return
+    with _activate(ExecutionContext(None, in_flight.default_timeout)) as context:
+        context.tighten(timeout)
+        yield context
@@ -1,155 +1,498 @@
 # MySQL connector adapter
 # db_connectors/mysql_connector.py
+import hashlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
 from typing import Optional
 
 import mysql.connector
-from mysql.connector import Error
-from config.settings import DB_CONFIG
+from mysql.connector import Error, InterfaceError, OperationalError
+from config.settings import DB_CONFIG, QUERY_TIMEOUT_CONFIG, STREAM_CONFIG
+from db_connectors.cursor_registry import CursorRegistry, StreamingCursor
+from db_connectors.execution import current_execution, record_statement
+from db_connectors.pool import ConnectionPool, ReconnectBackoff
+from db_connectors.prepared import PreparedStatementCache, PreparedStatementStats
+from db_connectors.results import ResultBudget, check_format, shape_rows
+from db_connectors.sampling import TableSampler
+from db_connectors.schema_diff import compare_by_fingerprint, empty_definition
+from db_connectors.sql_text import add_select_hint, definition_snippet, is_read_only_sql
+
+# 表示连接已失效的错误码：服务端断开、连接丢失、交互超时、服务端关闭
+_DISCONNECT_ERRNOS = {1053, 2006, 2013, 2055, 4031}
+# ER_UNSUPPORTED_PS：该语句不支持预处理协议
+_UNSUPPORTED_PS_ERRNO = 1295
+# 可用于主键区间抽样的整数类型
+_INTEGER_TYPES = ("tinyint", "smallint", "mediumint", "int", "bigint")
+# 语句被 KILL QUERY 中止（ER_QUERY_INTERRUPTED）或超过 MAX_EXECUTION_TIME（ER_QUERY_TIMEOUT），连接本身仍可复用
+_INTERRUPTED_ERRNOS = {1317, 3024}
+
+def _is_disconnect_error(exc: Error) -> bool:
+    """判断驱动异常是否由连接断开引起（此类错误换一条连接重试即可恢复）。"""
+    if exc.errno in _DISCONNECT_ERRNOS:
+        return True
+    return "Connection not available" in str(exc)
 
 
 class MySQLConnector:
     def __init__(self):
-        self.connection = None
-
-    def connect(self):
+        self._backoff = ReconnectBackoff(
+            base_delay=DB_CONFIG["reconnect_backoff_base"],
+            max_delay=DB_CONFIG["reconnect_backoff_max"],
+        )
+        # 预处理语句句柄保存在服务端会话中，COM_RESET_CONNECTION 会将其全部释放，
+        # 因此启用预处理模式时不在归还连接时重置会话
+        self._prepared = DB_CONFIG["prepared_statements"]
+        self._prepared_stats = PreparedStatementStats()
+        # 每次操作从连接池借出独立连接，使并发请求可以并行访问数据库；
+        # 借出时不做 ping 探活，断线由 _query 乐观重试处理，空闲连接由后台线程保活
+        self._pool = ConnectionPool(
+            self._create_connection,
+            min_size=DB_CONFIG["pool_min_size"],
+            max_size=DB_CONFIG["pool_max_size"],
+            checkout_timeout=DB_CONFIG["pool_checkout_timeout"],
+            max_lifetime=DB_CONFIG["pool_max_lifetime"],
+            reset_on_return=DB_CONFIG["pool_reset_on_return"] and not self._prepared,
+            reset=lambda connection: connection.reset_session(),
+        )
+        # 流式查询打开的游标，每个游标独占一条连接直至读完、关闭或空闲超时
+        self._cursors = CursorRegistry(
+            idle_timeout=STREAM_CONFIG["idle_timeout"],
+            max_open=STREAM_CONFIG["max_open"],
+        )
+        self._pool.start_keepalive(
+            DB_CONFIG["keepalive_interval"],
+            lambda connection: connection.ping(reconnect=False),
+        )
+        # 执行 KILL QUERY 的控制连接，不占用连接池名额，避免池饱和时无法中止失控语句
+        self._control = None
+        self._control_lock = threading.Lock()
+        # 兜底用的逐表结构指纹：(下次重新计算的时刻, 指纹, 全库摘要)，按 structure_digest_interval 缓存
+        self._structure = None
+        self._structure_lock = threading.Lock()
+
+    def _create_connection(self):
         """
-        建立与 MySQL 的连接；如果已有活跃连接则直接返回，避免重复握手。
+        使用配置中给定的连接信息建立一条新的驱动连接，供连接池调用。
+        连续失败时按指数退避拒绝新的建连请求，避免数据库故障期间形成重连风暴。
         """
-        if self.connection and self.connection.is_connected():
-            return
-
+        self._backoff.check()
         try:
-            # 使用配置中给定的连接信息初始化驱动连接
-            self.connection = mysql.connector.connect(
+            connection = mysql.connector.connect(
                 host=DB_CONFIG["host"],
                 port=DB_CONFIG["port"],
                 user=DB_CONFIG["user"],
                 password=DB_CONFIG["password"],
                 database=DB_CONFIG["database"],
             )
-            if self.connection and self.connection.is_connected():
-                print(f"[INFO] Connected to MySQL {DB_CONFIG['database']} successfully.")
         except Error as e:
-            print(f"[ERROR] MySQL connection failed: {e}")
-            self.connection = None
+            delay = self._backoff.record_failure()
+            print(f"[ERROR] MySQL connection failed: {e} (next attempt in {delay:.1f}s)", file=sys.stderr)
             raise
+        self._backoff.record_success()
+        # stdout 用于 JSON-RPC 通信，日志统一写到 stderr
+        print(f"[INFO] Connected to MySQL {DB_CONFIG['database']} successfully.", file=sys.stderr)
+        return connection
 
-    def ensure_connection(self):
+    def connect(self):
         """
-        确保当前存在一个有效的数据库连接，若断开则尝试重新连接。
+        预先建立连接池的最小连接数，避免首个请求承担握手开销。
         """
-        if not self.connection or not self.connection.is_connected():
-            self.connect()
+        self._pool.fill()
 
-    def list_tables(self):
+    @contextmanager
+    def _checkout(self):
         """
-        返回当前选定数据库下的所有数据表名称列表。
+        从连接池借出一条连接，退出时归还；连接层异常时丢弃该连接，避免坏连接回到池中。
         """
-        self.ensure_connection()
-        cursor = self.connection.cursor()
+        pooled = self._pool.acquire()
+        discard = False
         try:
-            cursor.execute("SHOW TABLES;")
-            tables = [row[0] for row in cursor.fetchall()]
-            return tables
+            yield pooled
+        except (InterfaceError, OperationalError):
+            discard = True
+            raise
         finally:
-            cursor.close()
+            self._pool.release(pooled, discard=discard)
+
+    def _kill_query(self, connection_id: int) -> None:
+        """在控制连接上中止指定连接正在执行的语句；控制连接失效时重建一次。"""
+        with self._control_lock:
+            for attempt in range(2):
+                try:
+                    if self._control is None:
+                        self._control = self._create_connection()
+                    cursor = self._control.cursor()
+                    try:
+                        cursor.execute(f"KILL QUERY {int(connection_id)}")
+                    finally:
+                        cursor.close()
+                    break
+                except (InterfaceError, OperationalError):
+                    self._control = None
+                    if attempt:
+                        raise
+        print(f"[INFO] Sent KILL QUERY to MySQL connection {connection_id}.", file=sys.stderr)
+
+    @contextmanager
+    def _interruptible(self, connection):
+        """
+        在当前请求的执行上下文中运行语句：超时或被取消时通过 KILL QUERY 中止，并转换为结构化的超时/取消异常。
+        """
+        execution = current_execution()
+        if execution is None:
+            yield
+            return
+        connection_id = connection.connection_id
+        try:
+            with execution.statement(
+                lambda: self._kill_query(connection_id), grace=QUERY_TIMEOUT_CONFIG["kill_grace"]
+            ):
+                yield
+        except Error as exc:
+            if exc.errno not in _INTERRUPTED_ERRNOS and execution.reason is None:
+                raise
+            raise execution.error() from exc
+
+    @staticmethod
+    def _time_limited(sql: str) -> str:
+        """为 SELECT 注入 MAX_EXECUTION_TIME 提示，让服务端在超时后自行中止语句。"""
+        execution = current_execution()
+        if execution is None or execution.timeout is None or not QUERY_TIMEOUT_CONFIG["server_hint"]:
+            return sql
+        # 使用请求的超时而非剩余时间，语句文本保持稳定，不影响预处理语句复用
+        return add_select_hint(sql, f"MAX_EXECUTION_TIME({int(execution.timeout * 1000)})")
+
+    def _statements(self, pooled) -> PreparedStatementCache:
+        """返回借出连接上的预处理语句缓存，首次使用时创建。"""
+        if pooled.statements is None:
+            raw = pooled.raw
+            pooled.statements = PreparedStatementCache(
+                lambda: raw.cursor(prepared=True),
+                max_size=DB_CONFIG["prepared_cache_size"],
+                stats=self._prepared_stats,
+                unsupported=lambda exc: getattr(exc, "errno", None) == _UNSUPPORTED_PS_ERRNO,
+            )
+        return pooled.statements
+
+    def _execute(self, sql: str, params=None, dictionary: bool = False, max_rows: Optional[int] = None):
+        if max_rows is not None:
+            return self._execute_capped(sql, params, dictionary, max_rows)
+        # 只有位置参数的查询走预处理协议：无参数语句复用不到执行计划，命名参数驱动不支持
+        use_prepared = self._prepared and isinstance(params, (list, tuple)) and len(params) > 0
+        with self._checkout() as pooled, self._interruptible(pooled.raw):
+            if use_prepared:
+                result = self._statements(pooled).execute(sql, tuple(params))
+                if result is not None:
+                    columns, rows = result
+                    if dictionary:
+                        rows = [dict(zip(columns, row)) for row in rows]
+                    return columns, rows
+            cursor = pooled.raw.cursor(dictionary=dictionary)
+            try:
+                started = time.perf_counter()
+                cursor.execute(sql, params or ())
+                executed = time.perf_counter()
+                rows = cursor.fetchall()
+                record_statement(executed - started, time.perf_counter() - executed, len(rows))
+                return cursor.column_names, rows
+            finally:
+                cursor.close()
 
-    def list_databases(self):
+    def _execute_capped(self, sql: str, params, dictionary: bool, max_rows: int):
         """
-        列出当前 MySQL 会话用户可访问的所有数据库名称，便于跨库巡检。
+        用非缓冲游标执行查询并只读取前 max_rows 行；结果集未读完时丢弃该连接让服务端中止发送，
+        剩余行既不载入内存也不在网络上读完。
         """
-        self.ensure_connection()
-        cursor = self.connection.cursor()
+        pooled = self._pool.acquire()
+        discard = True
         try:
-            cursor.execute("SHOW DATABASES;")
-            databases = [row[0] for row in cursor.fetchall()]
-            return databases
+            with self._interruptible(pooled.raw):
+                cursor = pooled.raw.cursor(dictionary=dictionary, buffered=False)
+                started = time.perf_counter()
+                cursor.execute(sql, params or ())
+                executed = time.perf_counter()
+                rows = cursor.fetchmany(max_rows)
+                record_statement(executed - started, time.perf_counter() - executed, len(rows))
+                columns = cursor.column_names
+                # 不足 max_rows 行说明已读到结果末尾，连接可以归还复用
+                if len(rows) < max_rows:
+                    cursor.close()
+                    discard = False
+                return columns, rows
         finally:
-            cursor.close()
+            self._pool.release(pooled, discard=discard)
 
-    def list_views(self, snippet_length: int = 160):
+    def _query(self, sql: str, params=None, dictionary: bool = False, max_rows: Optional[int] = None):
         """
-        枚举当前数据库中的视图名称，并截取视图定义的摘要信息。
+        执行单条只读语句并返回 (列名, 结果行)；指定 max_rows 时只读取前 max_rows 行。
+        不预先探活，直接执行；若遇到连接断开类错误，丢弃失效连接后换一条连接重试一次。
         """
-        self.ensure_connection()
-        cursor = self.connection.cursor()
         try:
-            cursor.execute("SHOW FULL TABLES WHERE TABLE_TYPE = 'VIEW';")
-            view_names = [row[0] for row in cursor.fetchall()]
-        finally:
-            cursor.close()
+            return self._execute(sql, params, dictionary, max_rows)
+        except (InterfaceError, OperationalError) as exc:
+            if not _is_disconnect_error(exc):
+                raise
+            # 一条连接失效通常意味着服务端重启或网络中断，其余空闲连接大概率同样失效
+            purged = self._pool.purge_idle()
+            print(
+                f"[WARN] MySQL connection lost ({exc}); discarded {purged} idle connection(s), retrying once.",
+                file=sys.stderr,
+            )
+        return self._execute(sql, params, dictionary, max_rows)
 
-        views = []
-        for view_name in view_names:
-            # 针对每个视图查询 CREATE 语句，以获取定义内容
-            cursor = self.connection.cursor()
+    def _stream(self, sql: str, params, dictionary: bool, consume):
+        """
+        在借出的连接上用非缓冲游标执行查询，把 (列名, 行迭代器) 交给 consume 逐批读取，结果集不在内存中整体缓存。
+        返回 consume 的结果；consume 未读完的行会被丢弃，连接随后归还连接池。
+        """
+        with self._checkout() as pooled, self._interruptible(pooled.raw):
+            cursor = pooled.raw.cursor(dictionary=dictionary, buffered=False)
             try:
-                cursor.execute(f"SHOW CREATE VIEW `{view_name}`;")
-                row = cursor.fetchone()
+                started = time.perf_counter()
+                cursor.execute(sql, params or ())
+                executed = time.perf_counter()
+                fetched = 0
+
+                def rows():
+                    nonlocal fetched
+                    while True:
+                        batch = cursor.fetchmany(1000)
+                        if not batch:
+                            return
+                        fetched += len(batch)
+                        yield from batch
+
+                iterator = rows()
+                result = consume(cursor.column_names, iterator)
+                for _ in iterator:
+                    pass
+                record_statement(executed - started, time.perf_counter() - executed, fetched)
+                return result
             finally:
                 cursor.close()
 
-            definition = ""
-            if row:
-                # SHOW CREATE VIEW 默认返回 (View, Create View, character_set_client, collation_connection)
-                definition = row[1] if len(row) > 1 else ""
-
-            # 将换行压缩为空格并截断为摘要
-            snippet = " ".join(definition.split())
-            if snippet_length and len(snippet) > snippet_length:
-                ellipsis = "..." if snippet_length > 3 else ""
-                trim_length = snippet_length - len(ellipsis)
-                snippet = snippet[:trim_length] + ellipsis
+    def get_pool_stats(self):
+        """
+        返回连接池的容量、借出等待时间与饱和度，便于调整池大小；附带预处理语句的 prepare / execute 计数。
+        """
+        stats = self._pool.stats()
+        stats["preparedStatements"] = self._prepared_stats.snapshot(
+            self._prepared, DB_CONFIG["prepared_cache_size"]
+        )
+        return stats
 
-            views.append(
-                {
-                    "name": view_name,
-                    "definitionSnippet": snippet,
-                }
+    def list_tables(self, schema: Optional[str] = None):
+        """
+        返回当前选定数据库（或 schema 指定的库）下的所有数据表名称列表。
+        """
+        if schema:
+            _, rows = self._query(
+                "SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME",
+                (schema,),
             )
+        else:
+            _, rows = self._query("SHOW TABLES;")
+        return [row[0] for row in rows]
+
+    def list_databases(self):
+        """
+        列出当前 MySQL 会话用户可访问的所有数据库名称，便于跨库巡检。
+        """
+        _, rows = self._query("SHOW DATABASES;")
+        return [row[0] for row in rows]
+
+    def list_views(
+        self,
+        snippet_length: int = 160,
+        prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ):
+        """
+        枚举当前数据库中的视图名称，并截取视图定义的摘要信息。
+        一次查询 information_schema.VIEWS 取回全部定义，可按名称前缀（区分大小写）过滤并用 limit/offset 分页。
+        """
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+        if offset < 0:
+            raise ValueError("offset must not be negative.")
 
-        return views
+        sql = """
+            SELECT TABLE_NAME, VIEW_DEFINITION
+            FROM information_schema.VIEWS
+            WHERE TABLE_SCHEMA = %s
+        """
+        params = [DB_CONFIG["database"]]
+        if prefix:
+            # 转义 LIKE 通配符，前缀按字面匹配；按二进制比较区分大小写，与 SQLite 连接器及快照一致
+            # （information_schema 的排序规则随 lower_case_table_names 变化，直接 LIKE 时结果因服务器而异）
+            escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            sql += " AND TABLE_NAME LIKE CAST(%s AS BINARY)"
+            params.append(escaped + "%")
+        sql += " ORDER BY TABLE_NAME"
+        if limit is not None or offset:
+            # MySQL 的 OFFSET 必须配合 LIMIT 使用，未指定 limit 时取无符号 BIGINT 上限
+            sql += " LIMIT %s OFFSET %s"
+            params.extend([limit if limit is not None else 18446744073709551615, offset])
+        _, rows = self._query(sql, tuple(params))
+
+        return [
+            {"name": view_name, "definitionSnippet": definition_snippet(definition, snippet_length)}
+            for view_name, definition in rows
+        ]
 
     def get_table_schema(self, table_name):
         """
         返回指定数据表的字段元数据（字段名、类型、默认值等）。
         """
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(f"DESCRIBE `{table_name}`;")
-            schema = cursor.fetchall()
-            return schema
-        finally:
-            cursor.close()
+        _, schema = self._query(f"DESCRIBE `{table_name}`;", dictionary=True)
+        return schema
 
-    def get_table_stats(self):
+    def get_schema_watermark(self):
         """
-        汇总当前数据库下每张表的行数、空间占用等统计信息。
+        返回当前库结构的变更水位，供元数据缓存判断是否失效。每次检查只读取廉价的聚合值：
+        表/例程/触发器数量与最近创建、修改时间，以及索引列（STATISTICS）的行数；
+        不改变这些值的 DDL（如 INSTANT 方式增删列、修改列类型）由按 structure_digest_interval 缓存的结构指纹兜底。
         """
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(
-                """
-                SELECT
-                    TABLE_NAME AS table_name,
-                    ENGINE AS engine,
-                    TABLE_ROWS AS table_rows,
-                    DATA_LENGTH AS data_length,
-                    INDEX_LENGTH AS index_length,
-                    DATA_FREE AS data_free,
-                    CREATE_TIME AS create_time,
-                    UPDATE_TIME AS update_time
-                FROM information_schema.TABLES
+        _, rows = self._query(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s) AS table_count,
+                (SELECT MAX(CREATE_TIME) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s) AS table_created,
+                (SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s) AS index_column_count,
+                (SELECT COUNT(*) FROM information_schema.ROUTINES WHERE ROUTINE_SCHEMA = %s) AS routine_count,
+                (SELECT MAX(LAST_ALTERED) FROM information_schema.ROUTINES WHERE ROUTINE_SCHEMA = %s) AS routine_altered,
+                (SELECT COUNT(*) FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = %s) AS trigger_count,
+                (SELECT MAX(CREATED) FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = %s) AS trigger_created
+            """,
+            (DB_CONFIG["database"],) * 7,
+        )
+        _, digest = self._structure_fingerprints()
+        return (tuple(rows[0]) if rows else ()) + (digest,)
+
+    def _structure_fingerprints(self):
+        """
+        返回 (逐表结构指纹, 全库摘要)：指纹即 get_table_fingerprints 的结果，最多每 structure_digest_interval 秒
+        重新计算一次；指纹需要聚合全部列与索引定义，开销较大，只作为兜底信号。间隔为 0 时返回 ({}, None)。
+        """
+        interval = DB_CONFIG["structure_digest_interval"]
+        if interval <= 0:
+            return {}, None
+        with self._structure_lock:
+            if self._structure is None or time.monotonic() >= self._structure[0]:
+                fingerprints = self.get_table_fingerprints(DB_CONFIG["database"])
+                digest = hashlib.md5(repr(sorted(fingerprints.items())).encode("utf-8")).hexdigest()
+                self._structure = (time.monotonic() + interval, fingerprints, digest)
+            return self._structure[1], self._structure[2]
+
+    def expire_structure_fingerprints(self) -> None:
+        """令结构指纹在下一次水位检查或表版本查询时重新计算，用于显式失效缓存或刷新快照。"""
+        with self._structure_lock:
+            self._structure = None
+
+    def get_table_versions(self):
+        """
+        返回 {表名: 版本串}，供库结构快照判断哪些表需要重新采集；覆盖的对象与 SHOW TABLES 一致（含视图）。
+        版本由廉价的逐表聚合组成：CREATE_TIME、UPDATE_TIME、索引列数与触发器的数量、最近创建时间，
+        再附上按 structure_digest_interval 缓存的结构指纹，兜底捕获 INSTANT 方式增删列等不改变上述值的 DDL。
+        """
+        fingerprints, _ = self._structure_fingerprints()
+        _, rows = self._query(
+            """
+            SELECT
+                t.TABLE_NAME,
+                CONCAT_WS('|', IFNULL(t.CREATE_TIME, ''), IFNULL(t.UPDATE_TIME, ''), IFNULL(st.index_columns, 0),
+                          IFNULL(tr.trigger_count, 0), IFNULL(tr.trigger_created, ''))
+            FROM information_schema.TABLES AS t
+            LEFT JOIN (
+                SELECT TABLE_NAME, COUNT(*) AS index_columns
+                FROM information_schema.STATISTICS
                 WHERE TABLE_SCHEMA = %s
-                ORDER BY TABLE_NAME;
-                """,
-                (DB_CONFIG["database"],),
-            )
-            return cursor.fetchall()
-        finally:
-            cursor.close()
+                GROUP BY TABLE_NAME
+            ) AS st ON st.TABLE_NAME = t.TABLE_NAME
+            LEFT JOIN (
+                SELECT EVENT_OBJECT_TABLE, COUNT(*) AS trigger_count, MAX(CREATED) AS trigger_created
+                FROM information_schema.TRIGGERS
+                WHERE TRIGGER_SCHEMA = %s
+                GROUP BY EVENT_OBJECT_TABLE
+            ) AS tr ON tr.EVENT_OBJECT_TABLE = t.TABLE_NAME
+            WHERE t.TABLE_SCHEMA = %s
+            """,
+            (DB_CONFIG["database"],) * 3,
+        )
+        return {table: f"{version}|{fingerprints.get(table, '')}" for table, version in rows}
+
+    def get_table_stats(self, result_format: str = "rows", schema: Optional[str] = None):
+        """
+        汇总当前数据库（或 schema 指定的库）下每张表的行数、空间占用等统计信息。
+        result_format 为 rows 时返回字典列表，arrays / columnar 时返回按对应编码组织的结果。
+        """
+        check_format(result_format)
+        columns, rows = self._query(
+            """
+            SELECT
+                TABLE_NAME AS table_name,
+                ENGINE AS engine,
+                TABLE_ROWS AS table_rows,
+                DATA_LENGTH AS data_length,
+                INDEX_LENGTH AS index_length,
+                DATA_FREE AS data_free,
+                CREATE_TIME AS create_time,
+                UPDATE_TIME AS update_time
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = %s
+            ORDER BY TABLE_NAME;
+            """,
+            (schema or DB_CONFIG["database"],),
+            dictionary=result_format == "rows",
+        )
+        if result_format == "rows":
+            return rows
+        return shape_rows(columns, rows, result_format)
+
+    def get_count_indexes(self) -> dict:
+        """
+        返回 {表名: 二级索引名}：每张表估计条目最窄的 B-Tree 二级索引，供 COUNT(*) 扫描代替聚簇索引。
+        宽度按索引列的字节长度估算（字符串按 CHARACTER_OCTET_LENGTH 与前缀长度，其它类型按 8 字节）。
+        """
+        _, rows = self._query(
+            """
+            SELECT
+                s.TABLE_NAME,
+                s.INDEX_NAME,
+                SUM(COALESCE(
+                    c.CHARACTER_OCTET_LENGTH * IFNULL(s.SUB_PART, c.CHARACTER_MAXIMUM_LENGTH)
+                        / NULLIF(c.CHARACTER_MAXIMUM_LENGTH, 0),
+                    8
+                )) AS width
+            FROM information_schema.STATISTICS AS s
+            JOIN information_schema.COLUMNS AS c
+                ON c.TABLE_SCHEMA = s.TABLE_SCHEMA AND c.TABLE_NAME = s.TABLE_NAME AND c.COLUMN_NAME = s.COLUMN_NAME
+            WHERE s.TABLE_SCHEMA = %s AND s.INDEX_NAME <> 'PRIMARY' AND s.INDEX_TYPE = 'BTREE'
+            GROUP BY s.TABLE_NAME, s.INDEX_NAME
+            ORDER BY s.TABLE_NAME, width, s.INDEX_NAME
+            """,
+            (DB_CONFIG["database"],),
+        )
+        indexes = {}
+        for table, index, _ in rows:
+            indexes.setdefault(table, index)
+        return indexes
+
+    def count_rows(self, table_name: str, index: Optional[str] = None) -> int:
+        """
+        精确统计表的行数，index 指定时以 FORCE INDEX 扫描该二级索引。
+        在请求的执行上下文中运行时注入 MAX_EXECUTION_TIME，超时后由服务端或看门狗中止。
+        """
+        if not table_name or not table_name.strip():
+            raise ValueError("table_name is required for counting rows.")
+        sql = f"SELECT COUNT(*) FROM `{table_name.replace('`', '``')}`"
+        if index:
+            sql += f" FORCE INDEX (`{index.replace('`', '``')}`)"
+        _, rows = self._query(self._time_limited(sql))
+        return int(rows[0][0])
 
     def get_index_info(self, table_name: str):
         """
@@ -158,13 +501,7 @@ class MySQLConnector:
         if not table_name:
             raise ValueError("table_name is required for index inspection.")
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(f"SHOW INDEX FROM `{table_name}`;")
-            rows = cursor.fetchall()
-        finally:
-            cursor.close()
+        _, rows = self._query(f"SHOW INDEX FROM `{table_name}`;", dictionary=True)
 
         indexes = []
         for row in rows:
@@ -185,42 +522,36 @@ class MySQLConnector:
             )
         return indexes
 
-    def find_foreign_keys(self, table_name: Optional[str] = None):
+    def find_foreign_keys(self, table_name: Optional[str] = None, schema: Optional[str] = None):
         """
-        列出当前库中外键约束，可按表名筛选以查看具体关联关系。
+        列出当前库（或 schema 指定的库）中外键约束，可按表名筛选以查看具体关联关系。
         """
         if table_name is not None and not table_name.strip():
             raise ValueError("table_name must not be blank when provided.")
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            sql = """
-                SELECT
-                    kcu.CONSTRAINT_NAME AS constraint_name,
-                    kcu.TABLE_NAME AS table_name,
-                    kcu.COLUMN_NAME AS column_name,
-                    kcu.REFERENCED_TABLE_NAME AS referenced_table,
-                    kcu.REFERENCED_COLUMN_NAME AS referenced_column,
-                    rc.UPDATE_RULE AS update_rule,
-                    rc.DELETE_RULE AS delete_rule
-                FROM information_schema.KEY_COLUMN_USAGE AS kcu
-                JOIN information_schema.REFERENTIAL_CONSTRAINTS AS rc
-                  ON kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
-                 AND kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
-                WHERE kcu.CONSTRAINT_SCHEMA = %s
-                  AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
-            """
-            params = [DB_CONFIG["database"]]
-            if table_name:
-                sql += " AND kcu.TABLE_NAME = %s"
-                params.append(table_name)
-            sql += " ORDER BY kcu.TABLE_NAME, kcu.CONSTRAINT_NAME, kcu.ORDINAL_POSITION"
-
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
-        finally:
-            cursor.close()
+        sql = """
+            SELECT
+                kcu.CONSTRAINT_NAME AS constraint_name,
+                kcu.TABLE_NAME AS table_name,
+                kcu.COLUMN_NAME AS column_name,
+                kcu.REFERENCED_TABLE_NAME AS referenced_table,
+                kcu.REFERENCED_COLUMN_NAME AS referenced_column,
+                rc.UPDATE_RULE AS update_rule,
+                rc.DELETE_RULE AS delete_rule
+            FROM information_schema.KEY_COLUMN_USAGE AS kcu
+            JOIN information_schema.REFERENTIAL_CONSTRAINTS AS rc
+              ON kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
+             AND kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
+            WHERE kcu.CONSTRAINT_SCHEMA = %s
+              AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
+        """
+        params = [schema or DB_CONFIG["database"]]
+        if table_name:
+            sql += " AND kcu.TABLE_NAME = %s"
+            params.append(table_name)
+        sql += " ORDER BY kcu.TABLE_NAME, kcu.CONSTRAINT_NAME, kcu.ORDINAL_POSITION"
+
+        _, rows = self._query(sql, params, dictionary=True)
 
         foreign_keys = []
         for row in rows:
@@ -244,34 +575,42 @@ class MySQLConnector:
         if table_name is not None and not table_name.strip():
             raise ValueError("table_name must not be blank when provided.")
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            sql = """
-                SELECT
-                    TRIGGER_NAME AS trigger_name,
-                    EVENT_MANIPULATION AS event_manipulation,
-                    EVENT_OBJECT_TABLE AS event_table,
-                    ACTION_TIMING AS action_timing,
-                    ACTION_STATEMENT AS action_statement,
-                    CREATED AS created_at
-                FROM information_schema.TRIGGERS
-                WHERE TRIGGER_SCHEMA = %s
-            """
-            params = [DB_CONFIG["database"]]
-            if table_name:
-                sql += " AND EVENT_OBJECT_TABLE = %s"
-                params.append(table_name)
-            sql += " ORDER BY EVENT_OBJECT_TABLE, TRIGGER_NAME"
-
-            cursor.execute(sql, params)
-            return cursor.fetchall()
-        finally:
-            cursor.close()
-
-    def sample_rows(self, table_name: str, limit: int = 5):
+        sql = """
+            SELECT
+                TRIGGER_NAME AS trigger_name,
+                EVENT_MANIPULATION AS event_manipulation,
+                EVENT_OBJECT_TABLE AS event_table,
+                ACTION_TIMING AS action_timing,
+                ACTION_STATEMENT AS action_statement,
+                CREATED AS created_at
+            FROM information_schema.TRIGGERS
+            WHERE TRIGGER_SCHEMA = %s
+        """
+        params = [DB_CONFIG["database"]]
+        if table_name:
+            sql += " AND EVENT_OBJECT_TABLE = %s"
+            params.append(table_name)
+        sql += " ORDER BY EVENT_OBJECT_TABLE, TRIGGER_NAME"
+
+        _, rows = self._query(sql, params, dictionary=True)
+        return rows
+
+    def sample_rows(
+        self,
+        table_name: str,
+        limit: int = 5,
+        budget: Optional[ResultBudget] = None,
+        result_format: str = "rows",
+        strategy: Optional[str] = None,
+        seed: Optional[int] = None,
+        scan_limit: Optional[int] = None,
+        block_size: Optional[int] = None,
+    ):
         """
-        抽样返回指定表的若干行数据，默认限制 5 行。
+        抽样返回指定表的若干行数据，默认限制 5 行；行数与字节数受结果预算约束。
+        strategy 为 first（物理顺序上的前若干行）、pk_range / block（在整数主键区间上随机定位单行 / 连续区块）、
+        reservoir（有界流式扫描上的蓄水池抽样）或 auto（默认，按 TABLE_ROWS 估计与主键选择）；
+        都不使用 ORDER BY RAND()。结果的 sampling 字段给出所用策略、种子与开销。
         """
         if not table_name or not table_name.strip():
             raise ValueError("table_name is required for sampling rows.")
@@ -279,51 +618,96 @@ class MySQLConnector:
             raise ValueError("Invalid characters in table_name.")
         if limit <= 0:
             raise ValueError("limit must be a positive integer.")
+        check_format(result_format)
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            query = f"SELECT * FROM `{table_name}` LIMIT %s"
-            cursor.execute(query, (limit,))
-            rows = cursor.fetchall()
-            return {
-                "columns": cursor.column_names,
-                "rows": rows,
-            }
-        finally:
-            cursor.close()
+        budget = budget or ResultBudget.from_request()
+        fetch_limit = min(limit, budget.max_rows + 1) if budget.max_rows else limit
+        # 仅 rows 编码需要逐行字典，其余编码直接使用元组游标
+        dictionary = result_format == "rows"
+        table = f"`{table_name}`"
+
+        def column(key: str) -> str:
+            return "`" + key.replace("`", "``") + "`"
+
+        def first(size: int):
+            return self._query(f"SELECT * FROM {table} LIMIT %s", (size,), dictionary=dictionary)
+
+        def scan(size: int, consume):
+            return self._stream(f"SELECT * FROM {table} LIMIT %s", (size,), dictionary, consume)
+
+        def profile():
+            # COLUMN_KEY = 'PRI' 的列只有一个且为整数类型时才能按键区间定位
+            _, rows = self._query(
+                """
+                SELECT t.TABLE_ROWS, c.COLUMN_NAME, c.DATA_TYPE
+                FROM information_schema.TABLES AS t
+                LEFT JOIN information_schema.COLUMNS AS c
+                    ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME AND c.COLUMN_KEY = 'PRI'
+                WHERE t.TABLE_SCHEMA = %s AND t.TABLE_NAME = %s
+                """,
+                (DB_CONFIG["database"], table_name),
+            )
+            if not rows:
+                return None, None
+            estimated, key, data_type = rows[0]
+            usable = len(rows) == 1 and key is not None and str(data_type).lower() in _INTEGER_TYPES
+            return (int(estimated) if estimated is not None else None), (key if usable else None)
+
+        def bounds(key: str):
+            _, rows = self._query(f"SELECT MIN({column(key)}), MAX({column(key)}) FROM {table}")
+            low, high = rows[0]
+            return None if low is None else (int(low), int(high))
+
+        def seek(key: str, starts: list, run: int):
+            # 每个起点一次索引定位，合并为一条语句以减少往返
+            name = column(key)
+            probe = f"(SELECT {name} FROM {table} WHERE {name} >= %s ORDER BY {name} LIMIT {int(run)})"
+            _, rows = self._query(" UNION ALL ".join([probe] * len(starts)), tuple(starts))
+            return [row[0] for row in rows]
+
+        def fetch(key: str, keys: list):
+            placeholders = ", ".join(["%s"] * len(keys))
+            return self._query(
+                f"SELECT * FROM {table} WHERE {column(key)} IN ({placeholders}) ORDER BY {column(key)}",
+                tuple(keys),
+                dictionary=dictionary,
+            )
+
+        sampler = TableSampler(first, scan, profile, bounds, seek, fetch)
+        columns, rows, report = sampler.sample(
+            strategy, fetch_limit, seed=seed, scan_limit=scan_limit, block_size=block_size
+        )
+        result = budget.apply(columns, rows, limit_injected=fetch_limit < limit, result_format=result_format)
+        result["sampling"] = report
+        return result
 
-    def search_columns(self, keyword: str):
+    def search_columns(self, keyword: str, schema: Optional[str] = None):
         """
-        通过关键字搜索列名或列注释，帮助快速定位字段。
+        通过关键字搜索列名或列注释，帮助快速定位字段；schema 为空时搜索当前库。
         """
         if not keyword or not keyword.strip():
             raise ValueError("keyword must not be empty for column search.")
 
         like_pattern = f"%{keyword.strip()}%"
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(
-                """
-                SELECT
-                    TABLE_NAME AS table_name,
-                    COLUMN_NAME AS column_name,
-                    COLUMN_TYPE AS column_type,
-                    IS_NULLABLE AS is_nullable,
-                    COLUMN_DEFAULT AS column_default,
-                    COLUMN_COMMENT AS column_comment
-                FROM information_schema.COLUMNS
-                WHERE TABLE_SCHEMA = %s
-                  AND (COLUMN_NAME LIKE %s OR COLUMN_COMMENT LIKE %s)
-                ORDER BY TABLE_NAME, ORDINAL_POSITION
-                """,
-                (DB_CONFIG["database"], like_pattern, like_pattern),
-            )
-            return cursor.fetchall()
-        finally:
-            cursor.close()
+        _, rows = self._query(
+            """
+            SELECT
+                TABLE_NAME AS table_name,
+                COLUMN_NAME AS column_name,
+                COLUMN_TYPE AS column_type,
+                IS_NULLABLE AS is_nullable,
+                COLUMN_DEFAULT AS column_default,
+                COLUMN_COMMENT AS column_comment
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s
+              AND (COLUMN_NAME LIKE %s OR COLUMN_COMMENT LIKE %s)
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """,
+            (schema or DB_CONFIG["database"], like_pattern, like_pattern),
+            dictionary=True,
+        )
+        return rows
 
     def describe_column(self, table_name: str, column_name: str):
         """
@@ -334,33 +718,29 @@ class MySQLConnector:
         if not column_name or not column_name.strip():
             raise ValueError("column_name is required for column description.")
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(
-                """
-                SELECT
-                    TABLE_NAME AS table_name,
-                    COLUMN_NAME AS column_name,
-                    COLUMN_TYPE AS column_type,
-                    IS_NULLABLE AS is_nullable,
-                    COLUMN_DEFAULT AS column_default,
-                    COLUMN_KEY AS column_key,
-                    EXTRA AS extra,
-                    COLUMN_COMMENT AS column_comment,
-                    CHARACTER_MAXIMUM_LENGTH AS char_length,
-                    NUMERIC_PRECISION AS numeric_precision,
-                    NUMERIC_SCALE AS numeric_scale
-                FROM information_schema.COLUMNS
-                WHERE TABLE_SCHEMA = %s
-                  AND TABLE_NAME = %s
-                  AND COLUMN_NAME = %s
-                """,
-                (DB_CONFIG["database"], table_name, column_name),
-            )
-            return cursor.fetchone() or {}
-        finally:
-            cursor.close()
+        _, rows = self._query(
+            """
+            SELECT
+                TABLE_NAME AS table_name,
+                COLUMN_NAME AS column_name,
+                COLUMN_TYPE AS column_type,
+                IS_NULLABLE AS is_nullable,
+                COLUMN_DEFAULT AS column_default,
+                COLUMN_KEY AS column_key,
+                EXTRA AS extra,
+                COLUMN_COMMENT AS column_comment,
+                CHARACTER_MAXIMUM_LENGTH AS char_length,
+                NUMERIC_PRECISION AS numeric_precision,
+                NUMERIC_SCALE AS numeric_scale
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s
+              AND TABLE_NAME = %s
+              AND COLUMN_NAME = %s
+            """,
+            (DB_CONFIG["database"], table_name, column_name),
+            dictionary=True,
+        )
+        return rows[0] if rows else {}
 
     def explain_query(self, sql: str, params=None):
         """
@@ -369,51 +749,40 @@ class MySQLConnector:
         if not self.is_read_only_query(sql):
             raise ValueError("Only read-only SQL statements can be explained.")
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            explain_sql = f"EXPLAIN {sql}"
-            cursor.execute(explain_sql, params or ())
-            return cursor.fetchall()
-        finally:
-            cursor.close()
+        explain_sql = f"EXPLAIN {sql}"
+        _, rows = self._query(explain_sql, params, dictionary=True)
+        return rows
 
     def list_procedures(self, include_functions: bool = True):
         """
         罗列当前数据库下的存储过程（以及可选的函数）名称及时间信息。
         """
-        self.ensure_connection()
         routine_types = ("PROCEDURE", "FUNCTION") if include_functions else ("PROCEDURE",)
         placeholders = ", ".join(["%s"] * len(routine_types))
 
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(
-                f"""
-                SELECT
-                    ROUTINE_NAME AS routine_name,
-                    ROUTINE_TYPE AS routine_type,
-                    CREATED AS created_at,
-                    LAST_ALTERED AS last_altered
-                FROM information_schema.ROUTINES
-                WHERE ROUTINE_SCHEMA = %s
-                  AND ROUTINE_TYPE IN ({placeholders})
-                ORDER BY ROUTINE_TYPE, ROUTINE_NAME
-                """,
-                (DB_CONFIG["database"], *routine_types),
-            )
-            return cursor.fetchall()
-        finally:
-            cursor.close()
+        _, rows = self._query(
+            f"""
+            SELECT
+                ROUTINE_NAME AS routine_name,
+                ROUTINE_TYPE AS routine_type,
+                CREATED AS created_at,
+                LAST_ALTERED AS last_altered
+            FROM information_schema.ROUTINES
+            WHERE ROUTINE_SCHEMA = %s
+              AND ROUTINE_TYPE IN ({placeholders})
+            ORDER BY ROUTINE_TYPE, ROUTINE_NAME
+            """,
+            (DB_CONFIG["database"], *routine_types),
+            dictionary=True,
+        )
+        return rows
 
     def list_users(self):
         """
         汇总实例用户列表及账号状态（需具备 mysql.user 查询权限）。
         """
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
         try:
-            cursor.execute(
+            _, rows = self._query(
                 """
                 SELECT
                     User AS user,
@@ -423,141 +792,187 @@ class MySQLConnector:
                     IFNULL(password_expired, 'N') AS password_expired
                 FROM mysql.user
                 ORDER BY User, Host
-                """
+                """,
+                dictionary=True,
             )
-            return cursor.fetchall()
+            return rows
         except Error as exc:
             raise PermissionError(
                 "Failed to read mysql.user. Ensure the account has sufficient privileges."
             ) from exc
-        finally:
-            cursor.close()
 
     def get_server_status(self):
         """
         返回服务器版本、连接数、运行时长以及支持引擎等状态信息。
         """
-        self.ensure_connection()
-
-        cursor = self.connection.cursor(dictionary=True)
         status = {}
-        try:
-            cursor.execute("SELECT VERSION() AS version;")
-            row = cursor.fetchone()
-            status["version"] = row.get("version") if row else None
+        _, rows = self._query("SELECT VERSION() AS version;", dictionary=True)
+        status["version"] = rows[0].get("version") if rows else None
 
-            cursor.execute("SHOW STATUS LIKE 'Threads_connected';")
-            row = cursor.fetchone()
-            status["threadsConnected"] = row.get("Value") if row else None
+        _, rows = self._query("SHOW STATUS LIKE 'Threads_connected';", dictionary=True)
+        status["threadsConnected"] = rows[0].get("Value") if rows else None
 
-            cursor.execute("SHOW STATUS LIKE 'Uptime';")
-            row = cursor.fetchone()
-            status["uptimeSeconds"] = row.get("Value") if row else None
-        finally:
-            cursor.close()
+        _, rows = self._query("SHOW STATUS LIKE 'Uptime';", dictionary=True)
+        status["uptimeSeconds"] = rows[0].get("Value") if rows else None
 
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute("SHOW ENGINES;")
-            status["engines"] = cursor.fetchall()
-        finally:
-            cursor.close()
+        _, status["engines"] = self._query("SHOW ENGINES;", dictionary=True)
 
         return status
 
+    def get_table_fingerprints(self, schema: str, table_name: Optional[str] = None) -> dict:
+        """
+        在服务端逐表聚合结构指纹：列、索引、外键与触发器各行拼成签名后取 MD5 前 64 位做 BIT_XOR，
+        与顺序无关且不受 group_concat_max_len 截断影响；每个表只返回一行。
+        """
+        table_filter = " AND table_name = %s" if table_name else ""
+        sql = f"""
+            SELECT table_name, BIT_XOR(CAST(CONV(LEFT(MD5(signature), 16), 16, 10) AS UNSIGNED)), COUNT(*)
+            FROM (
+                SELECT TABLE_NAME AS table_name,
+                       CONCAT_WS('|', 'c', COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE,
+                                 IFNULL(CONCAT('=', COLUMN_DEFAULT), ''), COLUMN_KEY, EXTRA) AS signature
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = %s
+                UNION ALL
+                SELECT TABLE_NAME,
+                       CONCAT_WS('|', 'i', INDEX_NAME, SEQ_IN_INDEX, IFNULL(COLUMN_NAME, ''), NON_UNIQUE,
+                                 IFNULL(SUB_PART, ''), INDEX_TYPE)
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = %s
+                UNION ALL
+                SELECT kcu.TABLE_NAME,
+                       CONCAT_WS('|', 'f', kcu.CONSTRAINT_NAME, kcu.ORDINAL_POSITION, kcu.COLUMN_NAME,
+                                 kcu.REFERENCED_TABLE_NAME, kcu.REFERENCED_COLUMN_NAME, rc.UPDATE_RULE, rc.DELETE_RULE)
+                FROM information_schema.KEY_COLUMN_USAGE AS kcu
+                JOIN information_schema.REFERENTIAL_CONSTRAINTS AS rc
+                  ON kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
+                 AND kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
+                WHERE kcu.CONSTRAINT_SCHEMA = %s
+                  AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
+                UNION ALL
+                SELECT EVENT_OBJECT_TABLE,
+                       CONCAT_WS('|', 't', TRIGGER_NAME, ACTION_TIMING, EVENT_MANIPULATION, MD5(ACTION_STATEMENT))
+                FROM information_schema.TRIGGERS
+                WHERE TRIGGER_SCHEMA = %s
+            ) AS parts
+            WHERE table_name IS NOT NULL{table_filter}
+            GROUP BY table_name
+        """
+        params = [schema] * 4 + ([table_name] if table_name else [])
+        _, rows = self._query(sql, params)
+        return {table: f"{int(digest):016x}{int(count):04x}" for table, digest, count in rows}
+
+    def load_table_definitions(self, schema: str, tables: Optional[list] = None) -> dict:
+        """
+        加载指定表（为空时为全部表）的列、索引、外键与触发器定义，表名过滤在 SQL 中完成。
+        """
+        table_filter, table_params = "", []
+        if tables:
+            table_filter = f" AND {{column}} IN ({', '.join(['%s'] * len(tables))})"
+            table_params = list(tables)
+
+        definitions = {}
+
+        def definition(table: str) -> dict:
+            if table not in definitions:
+                definitions[table] = empty_definition()
+            return definitions[table]
+
+        _, rows = self._query(
+            """
+            SELECT
+                TABLE_NAME AS table_name,
+                COLUMN_NAME AS column_name,
+                COLUMN_TYPE AS column_type,
+                IS_NULLABLE AS is_nullable,
+                COLUMN_DEFAULT AS column_default,
+                COLUMN_KEY AS column_key,
+                EXTRA AS extra,
+                ORDINAL_POSITION AS ordinal_position
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s
+            """
+            + table_filter.format(column="TABLE_NAME")
+            + " ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            [schema] + table_params,
+            dictionary=True,
+        )
+        for row in rows:
+            definition(row["table_name"])["columns"][row["column_name"]] = row
+
+        _, rows = self._query(
+            """
+            SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE, SUB_PART, INDEX_TYPE
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s
+            """
+            + table_filter.format(column="TABLE_NAME")
+            + " ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+            [schema] + table_params,
+        )
+        for table, index_name, column, non_unique, sub_part, index_type in rows:
+            definition(table)["indexes"].setdefault(index_name, []).append(
+                {"column": column, "unique": not non_unique, "subPart": sub_part, "type": index_type}
+            )
+
+        _, rows = self._query(
+            """
+            SELECT kcu.TABLE_NAME, kcu.CONSTRAINT_NAME, kcu.COLUMN_NAME, kcu.REFERENCED_TABLE_NAME,
+                   kcu.REFERENCED_COLUMN_NAME, rc.UPDATE_RULE, rc.DELETE_RULE
+            FROM information_schema.KEY_COLUMN_USAGE AS kcu
+            JOIN information_schema.REFERENTIAL_CONSTRAINTS AS rc
+              ON kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
+             AND kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
+            WHERE kcu.CONSTRAINT_SCHEMA = %s
+              AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
+            """
+            + table_filter.format(column="kcu.TABLE_NAME")
+            + " ORDER BY kcu.TABLE_NAME, kcu.CONSTRAINT_NAME, kcu.ORDINAL_POSITION",
+            [schema] + table_params,
+        )
+        for table, name, column, referenced_table, referenced_column, update_rule, delete_rule in rows:
+            definition(table)["foreignKeys"].setdefault(name, []).append(
+                {
+                    "column": column,
+                    "referencedTable": referenced_table,
+                    "referencedColumn": referenced_column,
+                    "updateRule": update_rule,
+                    "deleteRule": delete_rule,
+                }
+            )
+
+        _, rows = self._query(
+            """
+            SELECT EVENT_OBJECT_TABLE, TRIGGER_NAME, ACTION_TIMING, EVENT_MANIPULATION, ACTION_STATEMENT
+            FROM information_schema.TRIGGERS
+            WHERE TRIGGER_SCHEMA = %s
+            """
+            + table_filter.format(column="EVENT_OBJECT_TABLE")
+            + " ORDER BY EVENT_OBJECT_TABLE, TRIGGER_NAME",
+            [schema] + table_params,
+        )
+        for table, name, timing, event, statement in rows:
+            definition(table)["triggers"][name] = {"timing": timing, "event": event, "statement": statement}
+        return definitions
+
     def compare_schemas(
         self, schema_a: str, schema_b: str, table_name: Optional[str] = None
     ):
         """
-        比较两个数据库（或指定表）的字段差异，输出在各自独有的表与字段差别。
+        比较两个数据库（或指定表）的结构：先比较逐表指纹，再只对指纹不同的表加载列、索引、外键与触发器做详细比较。
         """
         if not schema_a or not schema_b:
             raise ValueError("schema_a and schema_b are required for comparison.")
         if table_name is not None and not table_name.strip():
             raise ValueError("table_name must not be blank when provided.")
 
-        self.ensure_connection()
-
-        def load_columns(schema: str) -> dict:
-            cursor_local = self.connection.cursor(dictionary=True)
-            try:
-                cursor_local.execute(
-                    """
-                    SELECT
-                        TABLE_NAME AS table_name,
-                        COLUMN_NAME AS column_name,
-                        COLUMN_TYPE AS column_type,
-                        IS_NULLABLE AS is_nullable,
-                        COLUMN_DEFAULT AS column_default,
-                        COLUMN_KEY AS column_key,
-                        EXTRA AS extra,
-                        ORDINAL_POSITION AS ordinal_position
-                    FROM information_schema.COLUMNS
-                    WHERE TABLE_SCHEMA = %s
-                    ORDER BY TABLE_NAME, ORDINAL_POSITION
-                    """,
-                    (schema,),
-                )
-                rows_local = cursor_local.fetchall()
-            finally:
-                cursor_local.close()
-
-            tables = {}
-            for row_local in rows_local:
-                table = row_local["table_name"]
-                if table_name and table != table_name:
-                    continue
-                tables.setdefault(table, {})[row_local["column_name"]] = row_local
-            return tables
-
-        columns_a = load_columns(schema_a)
-        columns_b = load_columns(schema_b)
-
-        if table_name:
-            tables_to_check = {table_name}
-        else:
-            tables_to_check = set(columns_a.keys()) | set(columns_b.keys())
-
-        only_in_a = sorted(t for t in tables_to_check if t in columns_a and t not in columns_b)
-        only_in_b = sorted(t for t in tables_to_check if t in columns_b and t not in columns_a)
-
-        diffs = {}
-        for table in sorted(tables_to_check):
-            cols_a = columns_a.get(table, {})
-            cols_b = columns_b.get(table, {})
-            if not cols_a or not cols_b:
-                continue
-
-            col_names = set(cols_a.keys()) | set(cols_b.keys())
-            table_diff = {
-                "onlyInA": sorted(name for name in col_names if name in cols_a and name not in cols_b),
-                "onlyInB": sorted(name for name in col_names if name in cols_b and name not in cols_a),
-                "mismatchedColumns": [],
-            }
-            for col in sorted(col_names):
-                if col not in cols_a or col not in cols_b:
-                    continue
-                meta_a = cols_a[col]
-                meta_b = cols_b[col]
-                comparable_fields = ("column_type", "is_nullable", "column_default", "column_key", "extra")
-                deviations = {}
-                for field in comparable_fields:
-                    val_a = meta_a.get(field)
-                    val_b = meta_b.get(field)
-                    if val_a != val_b:
-                        deviations[field] = {"schemaA": val_a, "schemaB": val_b}
-                if deviations:
-                    table_diff["mismatchedColumns"].append({"column": col, "differences": deviations})
-            if table_diff["onlyInA"] or table_diff["onlyInB"] or table_diff["mismatchedColumns"]:
-                diffs[table] = table_diff
-
-        return {
-            "schemaA": schema_a,
-            "schemaB": schema_b,
-            "onlyInA": only_in_a,
-            "onlyInB": only_in_b,
-            "tableDiffs": diffs,
-        }
+        return compare_by_fingerprint(
+            schema_a,
+            schema_b,
+            self.get_table_fingerprints(schema_a, table_name),
+            self.get_table_fingerprints(schema_b, table_name),
+            self.load_table_definitions,
+        )
 
     def generate_ddl(self, table_name: str):
         """
@@ -568,56 +983,128 @@ class MySQLConnector:
         if "`" in table_name or ";" in table_name:
             raise ValueError("Invalid characters in table_name.")
 
-        self.ensure_connection()
-        cursor = self.connection.cursor()
-        try:
-            cursor.execute(f"SHOW CREATE TABLE `{table_name}`;")
-            row = cursor.fetchone()
-            if not row:
-                return {}
-            return {"table": row[0], "createStatement": row[1]}
-        finally:
-            cursor.close()
+        _, rows = self._query(f"SHOW CREATE TABLE `{table_name}`;")
+        if not rows:
+            return {}
+        row = rows[0]
+        return {"table": row[0], "createStatement": row[1]}
 
     def is_read_only_query(self, sql: str) -> bool:
         """
         校验 SQL 是否为安全的只读语句，禁止多语句与写操作。
         """
-        stripped = sql.strip()
-        if not stripped:
-            return False
-
-        # Disallow multiple statements separated by semicolons (except trailing).
-        if ";" in stripped[:-1]:
-            return False
-
-        upper_sql = stripped.lstrip("(").upper()
-        allowed_prefixes = ("SELECT", "SHOW", "DESCRIBE", "EXPLAIN", "WITH")
-        for prefix in allowed_prefixes:
-            if upper_sql.startswith(prefix):
-                if prefix == "WITH":
-                    # Ensure the WITH clause eventually selects.
-                    return "SELECT" in upper_sql
-                return True
-        return False
-
-    def run_query(self, sql: str, params=None):
+        return is_read_only_sql(sql)
+
+    def run_query(
+        self,
+        sql: str,
+        params=None,
+        page_size: Optional[int] = None,
+        budget: Optional[ResultBudget] = None,
+        result_format: str = "rows",
+    ):
         """
         执行已校验为只读的查询，并返回列名与结果行数据。
+        结果受预算约束：SELECT 会被注入 LIMIT，超长单元格与超出字节预算的行会被截断并在结果中注明。
+        指定 page_size 时改为流式模式：只返回第一页，并附带用于 fetch_more 的游标 token。
+        result_format 为 arrays / columnar 时使用元组游标，不构造逐行字典。
         """
         if not self.is_read_only_query(sql):
             raise ValueError("Only read-only SQL statements are allowed.")
+        check_format(result_format)
+        budget = budget or ResultBudget.from_request()
+        if page_size is not None:
+            return self._open_stream(
+                sql, params, self._resolve_page_size(page_size), budget, result_format
+            )
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
+        limited_sql, limit_injected = budget.limit_sql(sql)
+        # 未能注入 LIMIT（如锁定子句、参数化 LIMIT）时只读取预算内的行再多一行，不把整个结果集载入内存
+        max_rows = budget.max_rows + 1 if budget.max_rows and not limit_injected else None
+        columns, rows = self._query(
+            self._time_limited(limited_sql), params, dictionary=result_format == "rows", max_rows=max_rows
+        )
+        return budget.apply(
+            columns, rows, limit_injected=limit_injected or max_rows is not None, result_format=result_format
+        )
+
+    @staticmethod
+    def _resolve_page_size(page_size: Optional[int]) -> int:
+        if page_size is None:
+            return STREAM_CONFIG["default_page_size"]
+        if page_size <= 0:
+            raise ValueError("page_size must be a positive integer.")
+        return min(page_size, STREAM_CONFIG["max_page_size"])
+
+    def _open_stream(
+        self,
+        sql: str,
+        params,
+        page_size: int,
+        budget: ResultBudget,
+        result_format: str = "rows",
+    ):
+        """
+        在独占连接上用非缓冲游标执行查询，返回第一页；结果未读完时登记游标供后续翻页。
+        """
+        if not self._cursors.has_capacity():
+            raise RuntimeError(
+                f"Too many open cursors (limit {self._cursors.max_open}); close or drain existing cursors first."
+            )
+
+        pooled = self._pool.acquire()
         try:
-            cursor.execute(sql, params or ())
-            return {
-                "columns": cursor.column_names,
-                "rows": cursor.fetchall(),
-            }
-        finally:
-            cursor.close()
+            cursor = pooled.raw.cursor(dictionary=result_format == "rows", buffered=False)
+            with self._interruptible(pooled.raw):
+                started = time.perf_counter()
+                cursor.execute(sql, params or ())
+                record_statement(time.perf_counter() - started, 0.0, 0)
+        except Exception:
+            self._pool.release(pooled, discard=True)
+            raise
+
+        stream = StreamingCursor(
+            cursor,
+            cursor.column_names,
+            [],
+            lambda discard: self._pool.release(pooled, discard=discard),
+            budget=budget,
+            result_format=result_format,
+            connection=pooled.raw,
+        )
+        with self._interruptible(pooled.raw):
+            page = stream.fetch(page_size)
+        token = None
+        if page["hasMore"]:
+            try:
+                token = self._cursors.register(stream)
+            except Exception:
+                stream.close()
+                raise
+        page["cursor"] = token
+        return page
+
+    def fetch_more(self, token: str, page_size: Optional[int] = None):
+        """
+        从流式游标继续读取下一页；读完后游标自动关闭，返回的 cursor 为 None。
+        """
+        stream = self._cursors.get(token)
+        try:
+            with self._interruptible(stream.connection):
+                page = stream.fetch(self._resolve_page_size(page_size))
+        except Exception:
+            self._cursors.forget(token)
+            raise
+        if not page["hasMore"]:
+            self._cursors.forget(token)
+        page["cursor"] = token if page["hasMore"] else None
+        return page
+
+    def close_cursor(self, token: str):
+        """
+        提前关闭流式游标并释放其占用的连接。
+        """
+        return {"cursor": token, "closed": self._cursors.discard(token)}
 
     def get_procedure_definition(self, procedure_name: str):
         """
@@ -626,20 +1113,20 @@ class MySQLConnector:
         if not procedure_name or "`" in procedure_name or " " in procedure_name:
             raise ValueError("Invalid procedure name.")
 
-        self.ensure_connection()
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(f"SHOW CREATE PROCEDURE `{procedure_name}`;")
-            result = cursor.fetchone()
-            if not result:
-                return {}
-            return result
-        finally:
-            cursor.close()
+        _, rows = self._query(f"SHOW CREATE PROCEDURE `{procedure_name}`;", dictionary=True)
+        if not rows:
+            return {}
+        return rows[0]
 
     def close(self):
         """
-        主动关闭数据库连接，释放底层资源句柄。
+        主动关闭连接池中的数据库连接，释放底层资源句柄。
         """
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        self._pool.close()
+        with self._control_lock:
+            if self._control is not None:
+                try:
+                    self._control.close()
+                except Error:
+                    pass
+                self._control = None
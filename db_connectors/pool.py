@@ -0,0 +1,328 @@
+# 通用数据库连接池
+# db_connectors/pool.py
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+
+class PoolTimeoutError(TimeoutError):
+    """在 checkout_timeout 内未能从连接池取得连接。"""
+
+
+class ReconnectBackoff:
+    """
+    建连失败后的指数退避：退避窗口内的建连请求直接失败，避免数据库故障时形成重连风暴。
+    """
+
+    def __init__(self, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def check(self) -> None:
+        """处于退避窗口内时抛出 ConnectionError。"""
+        with self._lock:
+            remaining = self._retry_at - time.monotonic()
+            failures = self._failures
+        if remaining > 0:
+            raise ConnectionError(
+                f"Database unavailable after {failures} failed connection attempt(s); "
+                f"next retry in {remaining:.1f}s."
+            )
+
+    def record_failure(self) -> float:
+        """记录一次建连失败并返回本次退避时长（秒），带随机抖动以错开并发重试。"""
+        with self._lock:
+            self._failures += 1
+            delay = min(self.base_delay * (2 ** (self._failures - 1)), self.max_delay)
+            delay *= random.uniform(0.5, 1.0)
+            self._retry_at = time.monotonic() + delay
+            return delay
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0.0
+
+
+class PooledConnection:
+    """
+    连接池中的一条连接及其生命周期信息。
+    """
+
+    __slots__ = ("raw", "created_at", "last_used", "statements")
+
+    def __init__(self, raw: Any):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # 绑定在该连接上的预处理语句缓存，由连接器按需创建，随连接一同丢弃
+        self.statements = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class ConnectionPool:
+    """
+    有界连接池：按需创建连接直至 max_size，超出时等待归还；连接超过 max_lifetime 后在下一次借出前重建。
+    factory 负责创建底层连接，validate / reset 分别在借出前与归还时调用，可为空。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 8,
+        checkout_timeout: float = 10.0,
+        max_lifetime: float = 3600.0,
+        reset_on_return: bool = True,
+        validate: Optional[Callable[[Any], bool]] = None,
+        reset: Optional[Callable[[Any], None]] = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self._factory = factory
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_lifetime = max_lifetime
+        self.reset_on_return = reset_on_return
+        self._validate = validate
+        self._reset = reset
+
+        self._cond = threading.Condition()
+        self._idle: "deque[PooledConnection]" = deque()
+        self._size = 0  # 已创建（空闲 + 借出）的连接数
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._keepalive_thread: Optional[threading.Thread] = None
+
+        # 统计信息，用于评估池大小是否合适
+        self._checkouts = 0
+        self._waited_checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._peak_in_use = 0
+
+    def fill(self) -> None:
+        """预先建立 min_size 个空闲连接。"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = PooledConnection(self._factory())
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created += 1
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        借出一条连接；优先复用最近归还的空闲连接，池满时最多等待 timeout 秒。
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    pooled = None
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {timeout:.1f}s waiting for a database connection "
+                        f"(pool size {self.max_size})."
+                    )
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if pooled is not None and not self._is_usable(pooled):
+                self._close_raw(pooled)
+                with self._cond:
+                    self._discarded += 1
+                pooled = None
+            if pooled is None:
+                pooled = PooledConnection(self._factory())
+                with self._cond:
+                    self._created += 1
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        wait = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            if waited:
+                self._waited_checkouts += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        pooled.last_used = time.monotonic()
+        return pooled
+
+    def release(self, pooled: PooledConnection, discard: bool = False) -> None:
+        """
+        归还连接；discard=True 或重置失败时直接关闭，空出的名额留给后续按需重建。
+        """
+        if not discard and self.reset_on_return and self._reset is not None:
+            try:
+                self._reset(pooled.raw)
+            except Exception as exc:
+                print(f"[WARN] Failed to reset pooled connection, discarding: {exc}", file=sys.stderr)
+                discard = True
+
+        if not discard and self.max_lifetime and pooled.age() > self.max_lifetime:
+            discard = True
+
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                self._idle.append(pooled)
+            self._cond.notify()
+
+        if discard or self._closed:
+            self._close_raw(pooled)
+
+    def purge_idle(self) -> int:
+        """
+        关闭全部空闲连接并返回关闭数量；检测到服务端断开（如数据库重启）时调用，
+        避免后续请求逐一踩到同样失效的连接。
+        """
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._discarded += len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_raw(pooled)
+        return len(idle)
+
+    def start_keepalive(self, interval: float, ping: Callable[[Any], None]) -> None:
+        """
+        启动后台保活线程：每隔 interval 秒对空闲超过 interval 的连接执行 ping，失败的连接直接丢弃。
+        保活只作用于空闲连接，请求路径上不再需要预先探活。
+        """
+        if interval <= 0 or self._keepalive_thread is not None:
+            return
+        self._keepalive_thread = threading.Thread(
+            target=self._keepalive_loop, args=(interval, ping), name="db-pool-keepalive", daemon=True
+        )
+        self._keepalive_thread.start()
+
+    def _keepalive_loop(self, interval: float, ping: Callable[[Any], None]) -> None:
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._closed, timeout=interval):
+                    return
+                threshold = time.monotonic() - interval
+                stale = [pooled for pooled in self._idle if pooled.last_used <= threshold]
+                for pooled in stale:
+                    self._idle.remove(pooled)
+
+            for pooled in stale:
+                try:
+                    ping(pooled.raw)
+                    alive = True
+                except Exception:
+                    alive = False
+                pooled.last_used = time.monotonic()
+                with self._cond:
+                    if alive and not self._closed:
+                        self._idle.appendleft(pooled)
+                    else:
+                        self._size -= 1
+                        self._discarded += 1
+                    self._cond.notify()
+                if not alive or self._closed:
+                    self._close_raw(pooled)
+
+    def close(self) -> None:
+        """关闭所有空闲连接，借出中的连接在归还时关闭。"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_raw(pooled)
+
+    def stats(self) -> dict:
+        """返回池容量、借出等待时间与饱和情况等统计数据。"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "minSize": self.min_size,
+                "maxSize": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "inUse": self._in_use,
+                "peakInUse": self._peak_in_use,
+                "waiting": self._waiting,
+                "saturation": self._in_use / self.max_size,
+                "checkouts": checkouts,
+                "waitedCheckouts": self._waited_checkouts,
+                "checkoutTimeouts": self._timeouts,
+                "avgCheckoutWaitMs": (self._wait_total / checkouts * 1000) if checkouts else 0.0,
+                "maxCheckoutWaitMs": self._wait_max * 1000,
+                "connectionsCreated": self._created,
+                "connectionsDiscarded": self._discarded,
+            }
+
+    def _is_usable(self, pooled: PooledConnection) -> bool:
+        if self.max_lifetime and pooled.age() > self.max_lifetime:
+            return False
+        if self._validate is None:
+            return True
+        try:
+            return bool(self._validate(pooled.raw))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_raw(pooled: PooledConnection) -> None:
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
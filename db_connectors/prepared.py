@@ -0,0 +1,116 @@
+# 服务端预处理语句缓存：每条池化连接维护一个按 SQL 文本索引的 prepared 游标 LRU
+# db_connectors/prepared.py
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from db_connectors.execution import record_statement
+
+
+class PreparedStatementStats:
+    """
+    所有连接共享的预处理语句计数：prepare 次数、execute 次数、淘汰（服务端释放）次数与回退到文本协议的次数。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.executions = 0
+        self.deallocations = 0
+        self.fallbacks = 0
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self, enabled: bool, cache_size: int) -> dict:
+        with self._lock:
+            prepares, executions = self.prepares, self.executions
+            deallocations, fallbacks = self.deallocations, self.fallbacks
+        return {
+            "enabled": enabled,
+            "cacheSizePerConnection": cache_size,
+            "prepares": prepares,
+            "executions": executions,
+            "reuseRatio": (executions - prepares) / executions if executions else 0.0,
+            "deallocations": deallocations,
+            "fallbacks": fallbacks,
+        }
+
+
+class PreparedStatementCache:
+    """
+    单条连接上的预处理语句 LRU。驱动的 prepared 游标在 SQL 文本不变时复用服务端语句句柄，
+    因此每个 SQL 保留一个游标；淘汰时关闭游标，由驱动向服务端发送 COM_STMT_CLOSE 释放语句。
+    连接同一时刻只被一个线程借出，本类不加锁。
+    """
+
+    def __init__(
+        self,
+        cursor_factory: Callable[[], Any],
+        max_size: int,
+        stats: PreparedStatementStats,
+        unsupported: Optional[Callable[[Exception], bool]] = None,
+    ):
+        self.max_size = max_size
+        self._cursor_factory = cursor_factory
+        self._stats = stats
+        self._unsupported = unsupported
+        self._cursors: "OrderedDict[str, Any]" = OrderedDict()
+        # 已确认无法预处理的语句，直接走文本协议，避免每次都向服务端试探
+        self._text_only: "OrderedDict[str, None]" = OrderedDict()
+
+    def execute(self, sql: str, params) -> Optional[Tuple[Any, list]]:
+        """
+        以二进制协议执行语句并返回 (列名, 结果行)；语句不支持预处理时返回 None，由调用方改走文本协议。
+        """
+        if sql in self._text_only:
+            self._text_only.move_to_end(sql)
+            return None
+        cursor = self._cursors.pop(sql, None)
+        prepared = cursor is None
+        if prepared:
+            cursor = self._cursor_factory()
+        try:
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            executed = time.perf_counter()
+            rows = cursor.fetchall()
+            record_statement(executed - started, time.perf_counter() - executed, len(rows))
+            columns = cursor.column_names
+        except Exception as exc:
+            self._close(cursor)
+            if self._unsupported is not None and self._unsupported(exc):
+                self._stats.count("fallbacks")
+                self._text_only[sql] = None
+                if len(self._text_only) > self.max_size:
+                    self._text_only.popitem(last=False)
+                return None
+            raise
+        if prepared:
+            self._stats.count("prepares")
+        self._stats.count("executions")
+
+        self._cursors[sql] = cursor
+        while len(self._cursors) > self.max_size:
+            _, evicted = self._cursors.popitem(last=False)
+            self._close(evicted)
+            self._stats.count("deallocations")
+        return columns, rows
+
+    def close(self) -> None:
+        while self._cursors:
+            _, cursor = self._cursors.popitem()
+            self._close(cursor)
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+    @staticmethod
+    def _close(cursor: Any) -> None:
+        try:
+            cursor.close()
+        except Exception as exc:
+            print(f"[WARN] Failed to close prepared statement: {exc}", file=sys.stderr)
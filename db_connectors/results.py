@@ -0,0 +1,206 @@
+# 查询结果的行数/字节预算与截断
+# db_connectors/results.py
+from typing import Any, List, Optional, Sequence, Tuple
+
+from config.settings import RESULT_LIMITS
+from db_connectors.sql_text import top_level_tokens
+
+# 可以在末尾追加 LIMIT 的语句起始记号
+_LIMITABLE_STARTS = frozenset({("word", "SELECT"), ("word", "WITH"), ("other", "(")})
+# 顶层出现锁定子句（FOR UPDATE / FOR SHARE / LOCK IN SHARE MODE）时追加 LIMIT 会破坏语法，此类语句只在读取端截断
+_LOCK_CLAUSES = frozenset({("FOR", "UPDATE"), ("FOR", "SHARE"), ("LOCK", "IN")})
+
+TRUNCATION_MARKER = "...[truncated]"
+
+# 结果编码：rows 为逐行字典，arrays 为列头加位置数组，columnar 为每列一个数组
+RESULT_FORMATS = ("rows", "arrays", "columnar")
+
+
+def check_format(result_format: str) -> str:
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(RESULT_FORMATS)}.")
+    return result_format
+
+
+def shape_rows(columns: Sequence[str], rows: List[Any], result_format: str = "rows") -> dict:
+    """
+    按结果编码组织列名与数据行。arrays / columnar 期望行为元组（非字典游标的原始输出），不会构造逐行字典。
+    """
+    if result_format == "rows":
+        return {"columns": columns, "rows": rows}
+    if result_format == "arrays":
+        return {"format": result_format, "columns": columns, "rows": rows}
+    values = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+    return {"format": result_format, "columns": columns, "values": values, "rowCount": len(rows)}
+
+
+def _limit_value(value: Optional[int], ceiling: int, name: str) -> int:
+    """单次请求的预算只能收紧全局上限；全局上限为 0 表示不限制。"""
+    if value is None:
+        return ceiling
+    if value <= 0:
+        raise ValueError(f"{name} must be a positive integer.")
+    return min(value, ceiling) if ceiling else value
+
+
+class ResultBudget:
+    """
+    一次查询返回结果的预算：最大行数、最大总字节数与单元格最大字节数，0 表示不限制。
+    """
+
+    __slots__ = ("max_rows", "max_bytes", "max_cell_bytes")
+
+    def __init__(self, max_rows: int = 0, max_bytes: int = 0, max_cell_bytes: int = 0):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_cell_bytes = max_cell_bytes
+
+    @classmethod
+    def from_request(
+        cls,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_cell_bytes: Optional[int] = None,
+    ) -> "ResultBudget":
+        """以全局 RESULT_LIMITS 为上限，合并单次请求指定的预算。"""
+        return cls(
+            max_rows=_limit_value(max_rows, RESULT_LIMITS["max_rows"], "maxRows"),
+            max_bytes=_limit_value(max_bytes, RESULT_LIMITS["max_bytes"], "maxBytes"),
+            max_cell_bytes=_limit_value(max_cell_bytes, RESULT_LIMITS["max_cell_bytes"], "maxCellBytes"),
+        )
+
+    def limit_sql(self, sql: str) -> Tuple[str, bool]:
+        """
+        为未带 LIMIT（或 LIMIT 超出预算）的 SELECT 注入 LIMIT max_rows + 1，多取的一行用于判断是否截断。
+        返回 (改写后的 SQL, 是否改写)；无法安全改写的语句原样返回，由连接器只读取前 max_rows + 1 行。
+        判断基于词法记号，前导注释与字符串中的 LIMIT 等字样不影响结果。
+        """
+        if not self.max_rows:
+            return sql, False
+        # 去掉末尾的注释与分号（如 "SELECT 1; -- note"），含多条语句时不做改写
+        outline = top_level_tokens(sql)
+        if outline is None:
+            return sql, False
+        statement, tokens = outline
+        if not tokens or tokens[0][:2] not in _LIMITABLE_STARTS:
+            return sql, False
+        words = [text for kind, text, _, _ in tokens if kind == "word"]
+        if any(pair in _LOCK_CLAUSES for pair in zip(words, words[1:])):
+            return sql, False
+
+        fetch_limit = self.max_rows + 1
+        limits = [index for index, token in enumerate(tokens) if token[:2] == ("word", "LIMIT")]
+        if not limits:
+            # 末尾注释已去掉，换行追加只为保持改写后的语句易读
+            return f"{statement}\nLIMIT {fetch_limit}", True
+
+        # 只改写位于末尾的数字分页子句：LIMIT n、LIMIT o, n 或 LIMIT n OFFSET o；
+        # 参数化的 LIMIT %s 等无法判断取值，不做改写
+        tail = tokens[limits[-1] + 1 :]
+        shape = [kind if kind != "word" else text for kind, text, _, _ in tail]
+        if shape == ["number"] or shape == ["number", "OFFSET", "number"]:
+            count = tail[0]
+        elif shape == ["number", "other", "number"] and tail[1][1] == ",":
+            count = tail[2]
+        else:
+            return sql, False
+        if not count[1].isdigit() or int(count[1]) <= fetch_limit:
+            return sql, False
+        return statement[: count[2]] + str(fetch_limit) + statement[count[3] :], True
+
+    def apply(
+        self,
+        columns: Sequence[str],
+        rows: List[Any],
+        limit_injected: bool = False,
+        result_format: str = "rows",
+    ) -> dict:
+        """
+        按预算截断结果：先按行数丢弃多余行，再截断超长单元格，最后按总字节数截断，返回带截断说明的结果。
+        """
+        rows_omitted = 0
+        if self.max_rows and len(rows) > self.max_rows:
+            rows_omitted = len(rows) - self.max_rows
+            rows = rows[: self.max_rows]
+
+        truncated_cells = self.truncate_cells(columns, rows) if self.max_cell_bytes else []
+
+        if self.max_bytes:
+            total = 0
+            for index, row in enumerate(rows):
+                total += estimate_row_bytes(row)
+                if total > self.max_bytes:
+                    rows_omitted += len(rows) - index
+                    rows = rows[:index]
+                    truncated_cells = [cell for cell in truncated_cells if cell["row"] < index]
+                    break
+
+        result = shape_rows(columns, rows, result_format)
+        result["truncated"] = bool(rows_omitted or truncated_cells)
+        result["rowsOmitted"] = rows_omitted
+        if limit_injected and rows_omitted:
+            # 注入 LIMIT 或只读取前 max_rows + 1 行时只多取一行，实际被省略的行数至少为 rowsOmitted
+            result["rowsOmittedExact"] = False
+        if truncated_cells:
+            result["truncatedCells"] = truncated_cells
+        return result
+
+    def truncate_cells(self, columns: Sequence[str], rows: List[Any]) -> List[dict]:
+        """
+        原地截断超过 max_cell_bytes 的字符串/二进制单元格（元组行会被替换为列表），返回被截断单元格的原始大小。
+        """
+        limit = self.max_cell_bytes
+        # 字符数不超过 limit / 4 的字符串 UTF-8 编码后必然不超限，无需逐个编码
+        safe_chars = limit // 4
+        reports = []
+        for row_index, row in enumerate(rows):
+            if isinstance(row, dict):
+                cells = row.items()
+            else:
+                cells = zip(columns, row)
+            replacements = None
+            for position, (column, value) in enumerate(cells):
+                if isinstance(value, str):
+                    if len(value) <= safe_chars:
+                        continue
+                    encoded = value.encode("utf-8")
+                    if len(encoded) <= limit:
+                        continue
+                    size = len(encoded)
+                    value = encoded[:limit].decode("utf-8", errors="ignore") + TRUNCATION_MARKER
+                elif isinstance(value, (bytes, bytearray)):
+                    if len(value) <= limit:
+                        continue
+                    size = len(value)
+                    value = bytes(value[:limit])
+                else:
+                    continue
+                reports.append({"row": row_index, "column": column, "originalBytes": size})
+                if replacements is None:
+                    replacements = {}
+                replacements[column if isinstance(row, dict) else position] = value
+            if replacements:
+                if isinstance(row, dict):
+                    row.update(replacements)
+                else:
+                    row = list(row)
+                    for position, value in replacements.items():
+                        row[position] = value
+                    rows[row_index] = row
+        return reports
+
+
+def estimate_row_bytes(row: Any) -> int:
+    """粗略估算一行序列化为 JSON 后的字节数（字符串按字符数计），用于总字节预算。"""
+    values = row.values() if isinstance(row, dict) else row
+    size = 2
+    for value in values:
+        if value is None:
+            size += 5
+        elif isinstance(value, (str, bytes, bytearray)):
+            size += len(value) + 3
+        else:
+            size += len(str(value)) + 1
+    if isinstance(row, dict):
+        size += sum(len(key) + 4 for key in row)
+    return size
@@ -0,0 +1,216 @@
+# sampleRows 的抽样策略：整数主键区间随机定位、区块抽样与有界流式扫描上的蓄水池抽样，各连接器提供取数函数后共用
+# db_connectors/sampling.py
+import itertools
+import math
+import random
+import time
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from config.settings import SAMPLE_CONFIG
+
+# first 为物理顺序上的前若干行（旧行为）；auto 按估计行数与主键在 reservoir 与 pk_range 之间选择
+SAMPLE_STRATEGIES = ("auto", "first", "pk_range", "block", "reservoir")
+# 单条定位语句合并的随机起点数（UNION ALL 子查询数，SQLite 复合查询默认最多 500 项）与按键取行时单条 IN 列表的键数
+SEEK_BATCH = 200
+FETCH_BATCH = 500
+# 随机起点落在同一段空洞中会定位到重复的行，补抽的最大轮数
+_MAX_ROUNDS = 4
+
+
+def check_strategy(strategy: str) -> str:
+    if strategy not in SAMPLE_STRATEGIES:
+        raise ValueError(f"strategy must be one of {', '.join(SAMPLE_STRATEGIES)}.")
+    return strategy
+
+
+def resolve_seed(seed: Optional[int]) -> int:
+    """未指定种子时随机生成一个并随结果返回，调用方可凭它在数据不变时复现同一次抽样。"""
+    return random.randrange(2**31) if seed is None else int(seed)
+
+
+def reservoir_sample(rows: Iterable, size: int, rng: random.Random) -> Tuple[list, int]:
+    """
+    蓄水池抽样（Algorithm R）：只保留 size 行，对已读过的每一行等概率。返回 (按读取顺序排列的样本, 读取行数)。
+    """
+    reservoir: List[Tuple[int, object]] = []
+    scanned = 0
+    for scanned, row in enumerate(rows, 1):
+        if len(reservoir) < size:
+            reservoir.append((scanned, row))
+        else:
+            slot = rng.randrange(scanned)
+            if slot < size:
+                reservoir[slot] = (scanned, row)
+    reservoir.sort(key=lambda item: item[0])
+    return [row for _, row in reservoir], scanned
+
+
+def _limit_value(value: Optional[int], default: int, name: str) -> int:
+    if value is None:
+        return default
+    if value <= 0:
+        raise ValueError(f"{name} must be a positive integer.")
+    return value
+
+
+class TableSampler:
+    """
+    单张表的抽样流程。取数由连接器提供的函数完成，每次调用只执行一条语句：
+    first(n) -> (列名, 行)：物理顺序上的前 n 行；
+    scan(limit, consume)：流式读取前 limit 行，返回 consume(列名, 行迭代器) 的结果，不整体缓存结果集；
+    profile() -> (估计行数, 整数主键列)：无法得知时为 None；
+    bounds(key) -> (最小键, 最大键)，空表为 None；
+    seek(key, starts, run) -> [键]：对每个起点取不小于它的前 run 个键；
+    fetch(key, keys) -> (列名, 行)：按键取整行，按键升序排列。
+    """
+
+    def __init__(
+        self,
+        first: Callable[[int], Tuple[Sequence[str], list]],
+        scan: Callable[[int, Callable], object],
+        profile: Callable[[], Tuple[Optional[int], Optional[str]]],
+        bounds: Callable[[str], Optional[Tuple[int, int]]],
+        seek: Callable[[str, List[int], int], List[int]],
+        fetch: Callable[[str, List[int]], Tuple[Sequence[str], list]],
+    ):
+        self._first = first
+        self._scan = scan
+        self._profile = profile
+        self._bounds = bounds
+        self._seek = seek
+        self._fetch = fetch
+        self.statements = 0
+        self.rows_read = 0
+
+    def sample(
+        self,
+        strategy: Optional[str],
+        size: int,
+        seed: Optional[int] = None,
+        scan_limit: Optional[int] = None,
+        block_size: Optional[int] = None,
+    ) -> Tuple[Sequence[str], list, dict]:
+        """
+        按策略抽取最多 size 行，返回 (列名, 行, 抽样说明)。说明中给出实际使用的策略、种子、
+        执行的语句数、读取的行数与耗时，以及各策略特有的开销（定位次数、扫描行数与是否覆盖整表）。
+        scan_limit 只能收紧 MCP_SAMPLE_SCAN_LIMIT。
+        """
+        requested = check_strategy(strategy or SAMPLE_CONFIG["default_strategy"])
+        scan_limit = _limit_value(scan_limit, SAMPLE_CONFIG["scan_limit"], "scanLimit")
+        scan_limit = min(scan_limit, SAMPLE_CONFIG["scan_limit"])
+        block_size = _limit_value(block_size, SAMPLE_CONFIG["block_size"], "blockSize")
+        started = time.perf_counter()
+        report = {"requestedStrategy": requested}
+
+        strategy = requested
+        if strategy == "first":
+            columns, rows = self._read(self._first(size))
+            report["seed"] = None
+        else:
+            seed = resolve_seed(seed)
+            rng = random.Random(seed)
+            report["seed"] = seed
+            estimated = key = bounds = None
+            if strategy != "reservoir":
+                estimated, key = self._profile()
+                self.statements += 1
+            if strategy == "auto":
+                if key is not None and estimated is None:
+                    # 行数未知时以键的跨度作为上界估计
+                    bounds = self._load_bounds(key)
+                    estimated = bounds[1] - bounds[0] + 1 if bounds else 0
+                # 小表整表扫描即可得到严格均匀的样本；大表有整数主键时按键定位，避免扫描
+                fits = estimated is not None and estimated <= scan_limit
+                strategy = "reservoir" if key is None or fits else "pk_range"
+            if estimated is not None:
+                report["estimatedRows"] = estimated
+
+            if strategy == "reservoir":
+                columns, rows, scanned, complete = self._reservoir(size, scan_limit, rng)
+                report.update(rowsScanned=scanned, scanLimit=scan_limit, complete=complete)
+            else:
+                if key is None:
+                    raise ValueError(
+                        f"{strategy} sampling needs a single-column integer primary key; use reservoir instead."
+                    )
+                if bounds is None:
+                    bounds = self._load_bounds(key)
+                run = 1 if strategy == "pk_range" else block_size
+                keys, probes = self._sample_keys(key, bounds, size, run, rng) if bounds else ([], 0)
+                columns, rows = self._fetch_rows(key, keys)
+                report.update(keyColumn=key, probes=probes)
+                if strategy == "block":
+                    report["blockSize"] = block_size
+
+        report.update(
+            strategy=strategy,
+            statements=self.statements,
+            rowsRead=self.rows_read,
+            elapsedMs=round((time.perf_counter() - started) * 1000, 3),
+        )
+        return columns, rows, report
+
+    def _read(self, result: Tuple[Sequence[str], list]) -> Tuple[Sequence[str], list]:
+        self.statements += 1
+        self.rows_read += len(result[1])
+        return result
+
+    def _load_bounds(self, key: str) -> Optional[Tuple[int, int]]:
+        self.statements += 1
+        return self._bounds(key)
+
+    def _reservoir(self, size: int, scan_limit: int, rng: random.Random) -> tuple:
+        """在前 scan_limit 行上做蓄水池抽样；多读一行用于判断是否已覆盖整表。"""
+
+        def consume(columns, rows):
+            rows = iter(rows)
+            sample, scanned = reservoir_sample(itertools.islice(rows, scan_limit), size, rng)
+            complete = next(rows, None) is None
+            return columns, sample, scanned, complete
+
+        columns, sample, scanned, complete = self._scan(scan_limit + 1, consume)
+        self.statements += 1
+        self.rows_read += scanned + (0 if complete else 1)
+        return columns, sample, scanned, complete
+
+    def _sample_keys(
+        self, key: str, bounds: Tuple[int, int], size: int, run: int, rng: random.Random
+    ) -> Tuple[List[int], int]:
+        """
+        在 [最小键, 最大键] 上均匀抽取随机起点，每个起点取其后 run 个键（run 为 1 时即逐行定位）。
+        起点落在空洞中会命中其后第一行，空洞之后的行被选中的概率偏高；命中重复时补抽，最多 _MAX_ROUNDS 轮。
+        返回 (升序且不超过 size 个的键, 定位次数)。
+        """
+        low, high = bounds
+        chosen: set = set()
+        probes = 0
+        for _ in range(_MAX_ROUNDS):
+            missing = size - len(chosen)
+            if missing <= 0:
+                break
+            starts = sorted({rng.randint(low, high) for _ in range(math.ceil(missing / run))})
+            probes += len(starts)
+            found: set = set()
+            for offset in range(0, len(starts), SEEK_BATCH):
+                keys = self._seek(key, starts[offset : offset + SEEK_BATCH], run)
+                self.statements += 1
+                self.rows_read += len(keys)
+                found.update(keys)
+            if found <= chosen:
+                # 键空间已取尽（表的行数不足 size）
+                break
+            chosen |= found
+        keys = sorted(chosen)
+        if len(keys) > size:
+            keys = sorted(rng.sample(keys, size))
+        return keys, probes
+
+    def _fetch_rows(self, key: str, keys: List[int]) -> Tuple[Sequence[str], list]:
+        if not keys:
+            return self._read(self._first(0))
+        columns: Sequence[str] = ()
+        rows: list = []
+        for offset in range(0, len(keys), FETCH_BATCH):
+            columns, batch = self._read(self._fetch(key, keys[offset : offset + FETCH_BATCH]))
+            rows.extend(batch)
+        return columns, rows
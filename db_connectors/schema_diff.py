@@ -0,0 +1,130 @@
+# 库结构对比：逐表结构指纹与差异计算，各连接器加载元数据后共用
+# db_connectors/schema_diff.py
+import hashlib
+import json
+from typing import Callable, Dict, List, Optional
+
+# 参与比较的字段属性（连接器加载的列元数据需使用这些键名）
+COMPARABLE_FIELDS = ("column_type", "is_nullable", "column_default", "column_key", "extra")
+# 列之外参与指纹与比较的对象类别：{类别: {对象名: 定义}}，定义为可直接比较相等的 JSON 值
+OBJECT_KINDS = ("indexes", "foreignKeys", "triggers")
+
+# load_definitions(schema, tables) -> {表名: {"columns": {列名: 列元数据}, "indexes": {...}, ...}}
+DefinitionLoader = Callable[[str, Optional[List[str]]], Dict[str, dict]]
+
+
+def empty_definition() -> dict:
+    return {"columns": {}, **{kind: {} for kind in OBJECT_KINDS}}
+
+
+def fingerprint_definitions(definitions: Dict[str, dict]) -> Dict[str, str]:
+    """
+    逐表计算结构指纹：只取参与比较的属性，规范化为 JSON 后取 SHA-1，列与对象的顺序不影响结果。
+    供无法在 SQL 中聚合哈希的连接器使用；同一连接器产生的指纹之间才可比较。
+    """
+    fingerprints = {}
+    for table, definition in definitions.items():
+        canonical = {
+            "columns": {
+                name: [meta.get(field) for field in COMPARABLE_FIELDS]
+                for name, meta in definition["columns"].items()
+            },
+            **{kind: definition.get(kind, {}) for kind in OBJECT_KINDS},
+        }
+        payload = json.dumps(canonical, sort_keys=True, default=str, separators=(",", ":"))
+        fingerprints[table] = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20]
+    return fingerprints
+
+
+def _diff_columns(cols_a: Dict[str, dict], cols_b: Dict[str, dict]) -> dict:
+    col_names = set(cols_a.keys()) | set(cols_b.keys())
+    table_diff = {
+        "onlyInA": sorted(name for name in col_names if name in cols_a and name not in cols_b),
+        "onlyInB": sorted(name for name in col_names if name in cols_b and name not in cols_a),
+        "mismatchedColumns": [],
+    }
+    for col in sorted(col_names):
+        if col not in cols_a or col not in cols_b:
+            continue
+        meta_a = cols_a[col]
+        meta_b = cols_b[col]
+        deviations = {}
+        for field in COMPARABLE_FIELDS:
+            val_a = meta_a.get(field)
+            val_b = meta_b.get(field)
+            if val_a != val_b:
+                deviations[field] = {"schemaA": val_a, "schemaB": val_b}
+        if deviations:
+            table_diff["mismatchedColumns"].append({"column": col, "differences": deviations})
+    return table_diff
+
+
+def _diff_objects(objects_a: dict, objects_b: dict) -> Optional[dict]:
+    """比较同一类别的命名对象（索引、外键、触发器），无差异时返回 None。"""
+    names = set(objects_a) | set(objects_b)
+    only_in_a = sorted(name for name in names if name not in objects_b)
+    only_in_b = sorted(name for name in names if name not in objects_a)
+    mismatched = [
+        {"name": name, "schemaA": objects_a[name], "schemaB": objects_b[name]}
+        for name in sorted(names)
+        if name in objects_a and name in objects_b and objects_a[name] != objects_b[name]
+    ]
+    if not (only_in_a or only_in_b or mismatched):
+        return None
+    return {"onlyInA": only_in_a, "onlyInB": only_in_b, "mismatched": mismatched}
+
+
+def diff_table_definitions(definition_a: dict, definition_b: dict) -> Optional[dict]:
+    """
+    比较同名表在两个库中的定义：列差异的键名与旧版 compareSchemas 保持一致，
+    索引、外键、触发器存在差异时才附加对应键；完全一致时返回 None。
+    """
+    table_diff = _diff_columns(definition_a["columns"], definition_b["columns"])
+    changed = bool(table_diff["onlyInA"] or table_diff["onlyInB"] or table_diff["mismatchedColumns"])
+    for kind in OBJECT_KINDS:
+        object_diff = _diff_objects(definition_a.get(kind, {}), definition_b.get(kind, {}))
+        if object_diff is not None:
+            table_diff[kind] = object_diff
+            changed = True
+    return table_diff if changed else None
+
+
+def compare_by_fingerprint(
+    schema_a: str,
+    schema_b: str,
+    fingerprints_a: Dict[str, str],
+    fingerprints_b: Dict[str, str],
+    load_definitions: DefinitionLoader,
+) -> dict:
+    """
+    先比较逐表指纹，只为指纹不同的表加载完整定义并计算差异；结构一致的表不再读取列、索引等元数据。
+    """
+    only_in_a = sorted(set(fingerprints_a) - set(fingerprints_b))
+    only_in_b = sorted(set(fingerprints_b) - set(fingerprints_a))
+    changed = sorted(
+        table
+        for table in set(fingerprints_a) & set(fingerprints_b)
+        if fingerprints_a[table] != fingerprints_b[table]
+    )
+
+    diffs = {}
+    if changed:
+        definitions_a = load_definitions(schema_a, changed)
+        definitions_b = load_definitions(schema_b, changed)
+        for table in changed:
+            table_diff = diff_table_definitions(
+                definitions_a.get(table, empty_definition()),
+                definitions_b.get(table, empty_definition()),
+            )
+            if table_diff is not None:
+                diffs[table] = table_diff
+
+    return {
+        "schemaA": schema_a,
+        "schemaB": schema_b,
+        "onlyInA": only_in_a,
+        "onlyInB": only_in_b,
+        "identicalTables": len(set(fingerprints_a) & set(fingerprints_b)) - len(changed),
+        "tableDiffs": diffs,
+    }
+
@@ -0,0 +1,368 @@
+# SQL 文本处理：规范化语句文本、识别非确定性函数、只读校验、优化器提示注入与定义摘要
+# db_connectors/sql_text.py
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from config.settings import SERVER_CONFIG
+
+# 依次匹配：字符串字面量、反引号标识符、可执行注释（含 MariaDB 的 /*M! */）/优化器提示、普通注释、单词、数字、空白，其余为单个字符
+_TOKEN = re.compile(
+    r"""
+    (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    |(?P<quoted>`(?:[^`]|``)*`)
+    |(?P<hint>/\*(?:[!+]|M!).*?\*/)
+    |(?P<comment>/\*.*?\*/|--[ \t][^\n]*|\#[^\n]*)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+    |(?P<space>\s+)
+    |(?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# 规范化时统一为大写的关键字；其余标识符保持原样（MySQL 表名在部分平台区分大小写）
+KEYWORDS = frozenset(
+    """
+    ALL AND ANY AS ASC BETWEEN BY CASE CROSS DESC DESCRIBE DISTINCT ELSE END EXISTS EXPLAIN
+    FALSE FOR FROM FULL GROUP HAVING IN INNER INTERVAL IS JOIN LEFT LIKE LIMIT NATURAL NOT NULL
+    OFFSET ON OR ORDER OUTER OVER PARTITION RECURSIVE REGEXP RIGHT ROLLUP SELECT SHOW STRAIGHT_JOIN
+    THEN TRUE UNION USING WHEN WHERE WINDOW WITH XOR
+    """.split()
+)
+
+# 结果随时间、会话或随机数变化的函数，包含它们的语句不应被缓存
+_NON_DETERMINISTIC = re.compile(
+    r"\b(?:NOW|SYSDATE|CURDATE|CURTIME|UTC_DATE|UTC_TIME|UTC_TIMESTAMP|UNIX_TIMESTAMP|RAND|UUID|"
+    r"UUID_SHORT|CONNECTION_ID|LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT|USER|SESSION_USER|SYSTEM_USER|"
+    r"SLEEP|GET_LOCK|IS_FREE_LOCK|IS_USED_LOCK|RELEASE_LOCK|BENCHMARK)\s*\("
+    r"|\b(?:CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|CURRENT_USER|LOCALTIME|LOCALTIMESTAMP)\b",
+    re.IGNORECASE,
+)
+
+
+def is_deterministic(sql: str) -> bool:
+    """语句中不含时间、随机数、会话相关函数及用户变量时视为结果可缓存。"""
+    return "@" not in sql and _NON_DETERMINISTIC.search(sql) is None
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    返回用于比较/缓存键的规范化语句：去掉普通注释与末尾分号，折叠空白，关键字转为大写。
+    字符串字面量、引号标识符与可执行注释（/*! */、/*M! */、/*+ */）保持原样。
+    """
+    parts = []
+    pending_space = False
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("space", "comment"):
+            pending_space = True
+            continue
+        # 运算符、数字等其它字符原样保留
+        token = match.group()
+        if kind == "word":
+            upper = token.upper()
+            if upper in KEYWORDS:
+                token = upper
+        if pending_space and parts:
+            parts.append(" ")
+        pending_space = False
+        parts.append(token)
+
+    normalized = "".join(parts)
+    return normalized.rstrip(";").rstrip()
+
+
+def strip_statement_end(sql: str):
+    """
+    去掉语句末尾的空白、普通注释与分号，返回语句主体；字符串与注释中的分号不受影响。
+    主体中仍含有语句分隔符（即包含多条语句）时返回 None。
+    """
+    end = 0
+    separator_before = False
+    pending_separator = False
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("space", "comment"):
+            continue
+        if kind == "other" and match.group() == ";":
+            pending_separator = True
+            continue
+        separator_before = separator_before or pending_separator
+        end = match.end()
+    if separator_before:
+        return None
+    return sql[:end].strip()
+
+
+def top_level_tokens(sql: str):
+    """
+    返回 (语句主体, 顶层记号)：语句主体为 strip_statement_end 的结果，顶层记号为括号外的
+    (类别, 文本, 起点, 终点) 列表，单词转为大写，位置相对于语句主体。空白与普通注释被跳过，
+    字符串、引号标识符与注释中的内容不会被误认为关键字；括号本身保留。含多条语句时返回 None。
+    """
+    statement = strip_statement_end(sql)
+    if statement is None:
+        return None
+    tokens = []
+    depth = 0
+    for match in _TOKEN.finditer(statement):
+        kind = match.lastgroup
+        if kind in ("space", "comment"):
+            continue
+        text = match.group()
+        if kind == "other" and text == ")":
+            depth = max(depth - 1, 0)
+        if depth == 0:
+            tokens.append((kind, text.upper() if kind == "word" else text, match.start(), match.end()))
+        if kind == "other" and text == "(":
+            depth += 1
+    return statement, tokens
+
+
+# 只读语句允许的起始关键字；EXPLAIN / DESCRIBE 只生成计划，EXPLAIN ANALYZE 会真正执行，需继续校验其后的语句
+_READ_ONLY_STARTS = frozenset({"SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH"})
+# CTE 定义体与 EXPLAIN ANALYZE 目标语句允许的起始关键字
+_QUERY_STARTS = frozenset({"SELECT", "WITH", "VALUES", "TABLE"})
+# EXPLAIN ANALYZE 之后允许的第一个记号
+_ANALYZE_TARGET_STARTS = frozenset({("word", "SELECT"), ("word", "WITH"), ("other", "(")})
+# 可执行注释 /*!50100 ... */ 的内容会被 MySQL 执行，MariaDB 还会执行 /*M!100000 ... */，需要展开后一并校验
+_EXECUTABLE_COMMENT = re.compile(r"/\*M?!\d{0,6}(.*?)\*/", re.DOTALL)
+_UNTERMINATED = frozenset({"'", '"', "`"})
+
+# 判定只关心关键字、括号、逗号、分号与引号；空白、数字与其它运算符合并为一段跳过，减少逐记号开销
+_CLASSIFY_TOKEN = re.compile(
+    r"""
+    (?P<skip>[^\w'"`(),;/\#-]+|\d+|/(?!\*)|-(?!-[ \t]))
+    |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<string>'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'|"[^"\\]*(?:(?:\\.|"")[^"\\]*)*")
+    |(?P<quoted>`[^`]*(?:``[^`]*)*`)
+    |(?P<hint>/\*(?:[!+]|M!).*?\*/)
+    |(?P<comment>/\*.*?\*/|--[ \t][^\n]*|\#[^\n]*)
+    |(?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def _significant_tokens(sql: str):
+    """
+    返回去掉空白与注释后的 (类别, 文本) 列表，单词统一为大写；字符串与引号标识符整体作为一个记号。
+    存在未闭合的引号时返回 None。
+    """
+    tokens = []
+    for match in _CLASSIFY_TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("skip", "comment"):
+            continue
+        text = match.group()
+        if kind == "hint":
+            executable = _EXECUTABLE_COMMENT.fullmatch(text)
+            if executable is None:
+                continue  # 优化器提示 /*+ */ 不影响语句类型
+            inner = _significant_tokens(executable.group(1))
+            if inner is None:
+                return None
+            tokens.extend(inner)
+            continue
+        if kind == "word":
+            text = text.upper()
+        elif kind == "other" and text in _UNTERMINATED:
+            return None
+        tokens.append((kind, text))
+    return tokens
+
+
+def _skip_parenthesized(tokens, index: int) -> int:
+    """tokens[index] 为左括号，返回与之匹配的右括号之后的位置；括号不配对时返回 -1。"""
+    depth = 0
+    for position in range(index, len(tokens)):
+        kind, text = tokens[position]
+        if kind != "other":
+            continue
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+            if depth == 0:
+                return position + 1
+    return -1
+
+
+def _is_read_only_tokens(tokens, starts=_READ_ONLY_STARTS) -> bool:
+    index = 0
+    # 允许 (SELECT ...) UNION (SELECT ...) 形式的前导括号
+    while index < len(tokens) and tokens[index] == ("other", "("):
+        index += 1
+    if index >= len(tokens) or tokens[index][0] != "word" or tokens[index][1] not in starts:
+        return False
+    keyword = tokens[index][1]
+
+    if keyword in ("EXPLAIN", "DESCRIBE", "DESC"):
+        if index + 1 < len(tokens) and tokens[index + 1] == ("word", "ANALYZE"):
+            # EXPLAIN ANALYZE [FORMAT = TREE] <语句> 会执行目标语句：只跳过可选的 FORMAT 子句，
+            # 紧随其后的必须是查询本身，不能在后文中寻找子查询（等号属于跳过的字符，FORMAT 之后直接是格式名）
+            position = index + 2
+            if (
+                position + 1 < len(tokens)
+                and tokens[position] == ("word", "FORMAT")
+                and tokens[position + 1][0] == "word"
+            ):
+                position += 2
+            if position >= len(tokens) or tokens[position] not in _ANALYZE_TARGET_STARTS:
+                return False
+            return _is_read_only_tokens(tokens[position:], _QUERY_STARTS)
+        return True
+    if keyword == "SHOW":
+        return True
+    if keyword == "WITH":
+        return _is_read_only_with(tokens, index + 1)
+    # SELECT ... INTO OUTFILE / DUMPFILE / @变量 会写文件或会话状态
+    return ("word", "INTO") not in tokens[index:]
+
+
+def _is_read_only_with(tokens, index: int) -> bool:
+    """逐个解析 CTE：每个定义体必须是只读查询，主语句必须是 SELECT。"""
+    if index < len(tokens) and tokens[index] == ("word", "RECURSIVE"):
+        index += 1
+    while True:
+        # CTE 名称，可带列名列表
+        if index >= len(tokens) or tokens[index][0] not in ("word", "quoted", "string"):
+            return False
+        index += 1
+        if index < len(tokens) and tokens[index] == ("other", "("):
+            index = _skip_parenthesized(tokens, index)
+            if index < 0:
+                return False
+        if index >= len(tokens) or tokens[index] != ("word", "AS"):
+            return False
+        index += 1
+        # PostgreSQL / SQLite 的 [NOT] MATERIALIZED 修饰
+        if index < len(tokens) and tokens[index] == ("word", "NOT"):
+            index += 1
+        if index < len(tokens) and tokens[index] == ("word", "MATERIALIZED"):
+            index += 1
+        if index >= len(tokens) or tokens[index] != ("other", "("):
+            return False
+        body_end = _skip_parenthesized(tokens, index)
+        if body_end < 0 or not _is_read_only_tokens(tokens[index + 1: body_end - 1], _QUERY_STARTS):
+            return False
+        index = body_end
+        if index < len(tokens) and tokens[index] == ("other", ","):
+            index += 1
+            continue
+        break
+    return _is_read_only_tokens(tokens[index:], frozenset({"SELECT"}))
+
+
+def _classify(sql: str) -> bool:
+    tokens = _significant_tokens(sql)
+    if not tokens:
+        return False
+    # 只允许末尾的分号，字符串与注释中的分号不受影响
+    while tokens and tokens[-1] == ("other", ";"):
+        tokens.pop()
+    if ("other", ";") in tokens:
+        return False
+    return _is_read_only_tokens(tokens)
+
+
+class _VerdictCache:
+    """
+    只读判定结果的有界 LRU。短语句直接以文本为键；长语句以摘要为键，避免缓存持有大段 SQL 文本。
+    """
+
+    _DIGEST_THRESHOLD = 4096
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[object, bool]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, sql: str):
+        if len(sql) <= self._DIGEST_THRESHOLD:
+            return sql
+        return (len(sql), hashlib.blake2b(sql.encode("utf-8", "surrogatepass"), digest_size=20).digest())
+
+    def classify(self, sql: str) -> bool:
+        if self.max_entries <= 0:
+            return _classify(sql)
+        key = self._key(sql)
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return verdict
+            self.misses += 1
+        verdict = _classify(sql)
+        with self._lock:
+            self._entries[key] = verdict
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return verdict
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_verdicts = _VerdictCache(SERVER_CONFIG["read_only_cache_size"])
+
+
+def is_read_only_sql(sql: str) -> bool:
+    """
+    以词法分析校验 SQL 是否为安全的只读语句：识别注释、字符串与引号标识符，禁止多语句、写操作与
+    SELECT ... INTO，逐个检查 CTE 定义体。判定结果按语句文本缓存在有界 LRU 中。
+    """
+    return _verdicts.classify(sql)
+
+
+def read_only_cache_stats() -> dict:
+    """返回只读判定缓存的条目数与命中统计。"""
+    return _verdicts.stats()
+
+
+def add_select_hint(sql: str, hint: str) -> str:
+    """
+    在以 SELECT 开头的语句中加入优化器提示 /*+ hint */；紧随 SELECT 已有提示注释时并入其中
+    （MySQL 只识别每个查询块的第一条提示注释）。其它语句，或已含同名提示时原样返回。
+    """
+    tokens = _TOKEN.finditer(sql)
+    for match in tokens:
+        if match.lastgroup not in ("space", "comment"):
+            break
+    else:
+        return sql
+    if match.lastgroup != "word" or match.group().upper() != "SELECT":
+        return sql
+
+    insert_at = match.end()
+    for following in tokens:
+        if following.lastgroup == "space":
+            continue
+        text = following.group()
+        if following.lastgroup == "hint" and text.startswith("/*+"):
+            name = hint.split("(", 1)[0].strip().upper()
+            if name in text.upper():
+                return sql
+            position = following.start() + 3
+            return f"{sql[:position]} {hint}{sql[position:]}"
+        break
+    return f"{sql[:insert_at]} /*+ {hint} */{sql[insert_at:]}"
+
+
+def definition_snippet(definition: str, snippet_length: int) -> str:
+    """将换行压缩为空格并截断为摘要，snippet_length 为 0 时不截断。"""
+    snippet = " ".join((definition or "").split())
+    if snippet_length and len(snippet) > snippet_length:
+        ellipsis = "..." if snippet_length > 3 else ""
+        snippet = snippet[: snippet_length - len(ellipsis)] + ellipsis
+    return snippet
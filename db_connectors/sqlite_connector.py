@@ -1 +1,964 @@
-# SQLite 适配器
\ No newline at end of file
+# SQLite 适配器：以只读（immutable）URI 打开数据库快照，每个线程持有独立连接
+# db_connectors/sqlite_connector.py
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.request import pathname2url
+
+from config.settings import DB_CONFIG, STREAM_CONFIG
+from db_connectors.cursor_registry import CursorRegistry, StreamingCursor
+from db_connectors.execution import current_execution, record_statement
+from db_connectors.results import ResultBudget, check_format, shape_rows
+from db_connectors.sampling import TableSampler
+from db_connectors.schema_diff import compare_by_fingerprint, empty_definition, fingerprint_definitions
+from db_connectors.sql_text import definition_snippet, is_read_only_sql
+
+# 排除 sqlite_ 开头的内部表（sqlite_sequence、sqlite_stat1 等）
+_USER_TABLES = "m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'"
+
+# 从 CREATE TRIGGER 语句中解析触发时机与事件
+_TRIGGER_HEADER = re.compile(
+    r"""^\s*CREATE\s+(?:TEMP(?:ORARY)?\s+)?TRIGGER\s+(?:IF\s+NOT\s+EXISTS\s+)?
+    (?:"[^"]*"|`[^`]*`|\[[^\]]*\]|\S+)\s+
+    (?P<timing>BEFORE|AFTER|INSTEAD\s+OF)?\s*(?P<event>DELETE|INSERT|UPDATE)\b""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# WITHOUT ROWID 表没有 rowid，无法按 rowid 区间抽样
+_WITHOUT_ROWID = re.compile(r"\)[^)]*\bWITHOUT\s+ROWID\b[^)]*$", re.IGNORECASE)
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteConnector:
+    def __init__(self):
+        self.path = DB_CONFIG["sqlite_path"]
+        if not self.path:
+            raise ValueError("DB_PATH (or DB_NAME) must point to a SQLite database file.")
+        # 每个线程复用自己的连接；SQLite 只读连接之间互不阻塞，无需连接池。
+        # 登记各连接的所属线程与快照代次，线程退出后其连接由之后新建连接的线程接手或关闭
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+        # 快照文件被替换时递增，各线程在下次使用时重新打开连接
+        self._generation = 0
+        self._file_identity = self._stat_identity()
+        self._started_at = time.monotonic()
+        self._cursors = CursorRegistry(
+            idle_timeout=STREAM_CONFIG["idle_timeout"],
+            max_open=STREAM_CONFIG["max_open"],
+        )
+
+    def _stat_identity(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _open_connection(self):
+        """
+        以只读 URI 打开数据库；immutable=1 时 SQLite 不再加锁或检查文件变化，适合分发到边缘节点的静态快照。
+        """
+        if not os.path.isfile(self.path):
+            raise FileNotFoundError(f"SQLite database not found: {self.path}")
+        uri = f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro"
+        if DB_CONFIG["sqlite_immutable"]:
+            uri += "&immutable=1"
+        # 连接只在所属线程内使用，关闭 check_same_thread 以便 close() 可以在任意线程回收
+        connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        connection.execute(f"PRAGMA mmap_size = {int(DB_CONFIG['sqlite_mmap_size'])}")
+        # cache_size 为负数时单位为 KiB
+        connection.execute(f"PRAGMA cache_size = {-int(DB_CONFIG['sqlite_cache_size_kib'])}")
+        connection.execute("PRAGMA query_only = 1")
+        return connection
+
+    def _connection(self):
+        """返回当前线程的连接，首次使用或快照文件被替换后重新打开。"""
+        state = getattr(self._local, "state", None)
+        if state is None or state[0] != self._generation:
+            if state is not None:
+                self._discard(state[1])
+            generation = self._generation
+            connection = self._adopt_orphan(generation)
+            if connection is None:
+                connection = self._open_connection()
+                with self._lock:
+                    self._connections[connection] = (threading.current_thread(), generation)
+            state = (generation, connection)
+            self._local.state = state
+        return state[1]
+
+    def _adopt_orphan(self, generation: int):
+        """
+        回收所属线程已退出的连接：取一条同一快照代次的转给当前线程复用，其余关闭，
+        使连接数不超过仍存活且用过连接的线程数。
+        """
+        adopted = None
+        orphans = []
+        with self._lock:
+            for connection, (owner, owner_generation) in list(self._connections.items()):
+                if owner.is_alive():
+                    continue
+                if adopted is None and owner_generation == generation:
+                    adopted = connection
+                    self._connections[connection] = (threading.current_thread(), generation)
+                else:
+                    del self._connections[connection]
+                    orphans.append(connection)
+        for connection in orphans:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+        return adopted
+
+    def _discard(self, connection) -> None:
+        with self._lock:
+            self._connections.pop(connection, None)
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+
+    def connect(self):
+        """
+        打开当前线程的连接，提前暴露文件不存在或无法读取等问题。
+        """
+        self._connection()
+        print(f"[INFO] Opened SQLite database {self.path} (read-only).", file=sys.stderr)
+
+    @staticmethod
+    @contextmanager
+    def _interruptible(connection):
+        """
+        在当前请求的执行上下文中运行语句：超时或被取消时调用 interrupt() 中止，并转换为结构化的超时/取消异常。
+        """
+        execution = current_execution()
+        if execution is None:
+            yield
+            return
+        try:
+            with execution.statement(connection.interrupt):
+                yield
+        except sqlite3.OperationalError as exc:
+            if execution.reason is None:
+                raise
+            raise execution.error() from exc
+
+    def _query(self, sql: str, params=None, dictionary: bool = False, max_rows: Optional[int] = None):
+        """
+        执行单条只读语句并返回 (列名, 结果行)；指定 max_rows 时只读取前 max_rows 行。
+        """
+        connection = self._connection()
+        with self._interruptible(connection):
+            started = time.perf_counter()
+            cursor = connection.execute(sql, params or ())
+            executed = time.perf_counter()
+            try:
+                columns = tuple(item[0] for item in cursor.description) if cursor.description else ()
+                rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+            finally:
+                cursor.close()
+            record_statement(executed - started, time.perf_counter() - executed, len(rows))
+        if dictionary:
+            rows = [dict(zip(columns, row)) for row in rows]
+        return columns, rows
+
+    def _stream(self, sql: str, params, dictionary: bool, consume):
+        """
+        执行查询并把 (列名, 行迭代器) 交给 consume 逐行读取，结果集不在内存中整体缓存；返回 consume 的结果。
+        """
+        connection = self._connection()
+        with self._interruptible(connection):
+            started = time.perf_counter()
+            cursor = connection.execute(sql, params or ())
+            executed = time.perf_counter()
+            fetched = 0
+            try:
+                columns = tuple(item[0] for item in cursor.description) if cursor.description else ()
+
+                def rows():
+                    nonlocal fetched
+                    for row in cursor:
+                        fetched += 1
+                        yield dict(zip(columns, row)) if dictionary else row
+
+                result = consume(columns, rows())
+            finally:
+                cursor.close()
+            record_statement(executed - started, time.perf_counter() - executed, fetched)
+        return result
+
+    def get_pool_stats(self):
+        """
+        SQLite 不使用连接池，返回各线程持有的连接数与打开的流式游标数。
+        """
+        return {
+            "type": "sqlite",
+            "connections": len(self._connections),
+            "openCursors": len(self._cursors),
+        }
+
+    def get_schema_watermark(self):
+        """
+        返回快照文件标识与 schema_version；文件被替换时令各线程重新打开连接。
+        """
+        identity = self._check_file_identity()
+        _, rows = self._query("PRAGMA schema_version")
+        return (identity, rows[0][0] if rows else None)
+
+    def expire_structure_fingerprints(self) -> None:
+        """SQLite 的水位线与表版本直接取自 schema_version 与 sqlite_master，没有需要失效的兜底指纹。"""
+
+    def _check_file_identity(self):
+        # 与各线程登记、接手连接共用同一把锁；stat 也在锁内进行，避免先读到旧标识的线程把代次来回切换
+        with self._lock:
+            identity = self._stat_identity()
+            if identity != self._file_identity:
+                # immutable 连接不会感知文件变化，必须重新打开
+                self._file_identity = identity
+                self._generation += 1
+        return identity
+
+    def get_table_versions(self):
+        """
+        返回 {表名: 版本串}。SQLite 没有建表与修改时间，以该表及其索引、触发器在 sqlite_master 中的定义摘要作为版本。
+        """
+        self._check_file_identity()
+        _, rows = self._query(
+            f"""
+            SELECT m.name, o.type, o.name, o.sql
+            FROM sqlite_master AS m
+            JOIN sqlite_master AS o ON o.tbl_name = m.name
+            WHERE {_USER_TABLES}
+            ORDER BY m.name, o.type, o.name
+            """
+        )
+        digests = {}
+        for table, kind, name, sql in rows:
+            digests.setdefault(table, hashlib.sha1()).update(f"{kind}\0{name}\0{sql or ''}\n".encode("utf-8"))
+        return {table: digest.hexdigest()[:20] for table, digest in digests.items()}
+
+    def _check_database(self, schema: str) -> str:
+        if schema not in set(self.list_databases()):
+            raise ValueError(f"Unknown database: {schema}")
+        return schema
+
+    def _qualifier(self, schema: Optional[str]) -> str:
+        """返回系统表名前的库限定（如 "aux".），schema 为空时为空串，即 main 库。"""
+        if not schema:
+            return ""
+        return f"{_quote_identifier(self._check_database(schema))}."
+
+    def list_tables(self, schema: Optional[str] = None):
+        """
+        返回数据库（或 schema 指定的附加库）中的所有数据表名称列表。
+        """
+        _, rows = self._query(
+            f"SELECT m.name FROM {self._qualifier(schema)}sqlite_master AS m WHERE {_USER_TABLES} ORDER BY m.name"
+        )
+        return [row[0] for row in rows]
+
+    def list_databases(self):
+        """
+        列出当前连接中的数据库（main 以及附加的数据库）。
+        """
+        _, rows = self._query("PRAGMA database_list")
+        return [row[1] for row in rows]
+
+    def list_views(
+        self,
+        snippet_length: int = 160,
+        prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ):
+        """
+        枚举视图名称并截取定义摘要，可按名称前缀（区分大小写）过滤并用 limit/offset 分页。
+        """
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+        if offset < 0:
+            raise ValueError("offset must not be negative.")
+
+        sql = "SELECT name, sql FROM sqlite_master WHERE type = 'view'"
+        params = []
+        if prefix:
+            sql += " AND substr(name, 1, ?) = ?"
+            params.extend([len(prefix), prefix])
+        sql += " ORDER BY name"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit if limit is not None else -1, offset])
+        _, rows = self._query(sql, params)
+        return [
+            {"name": view_name, "definitionSnippet": definition_snippet(definition, snippet_length)}
+            for view_name, definition in rows
+        ]
+
+    def get_table_schema(self, table_name):
+        """
+        返回指定数据表的字段元数据，字段名与 MySQL DESCRIBE 的输出保持一致。
+        """
+        _, rows = self._query("SELECT * FROM pragma_table_info(?) ORDER BY cid", (table_name,), dictionary=True)
+        if not rows:
+            raise ValueError(f"Unknown table: {table_name}")
+        return [
+            {
+                "Field": row["name"],
+                "Type": row["type"],
+                "Null": "NO" if row["notnull"] else "YES",
+                "Key": "PRI" if row["pk"] else "",
+                "Default": row["dflt_value"],
+                "Extra": "",
+            }
+            for row in rows
+        ]
+
+    def get_table_stats(self, result_format: str = "rows", schema: Optional[str] = None):
+        """
+        汇总各表统计信息；行数取自 sqlite_stat1（执行过 ANALYZE 时才有），不逐表 COUNT(*)。
+        """
+        check_format(result_format)
+        qualifier = self._qualifier(schema)
+        _, stat_tables = self._query(f"SELECT 1 FROM {qualifier}sqlite_master WHERE name = 'sqlite_stat1'")
+        row_counts = {}
+        if stat_tables:
+            # stat 列首个整数为表的行数估计
+            _, rows = self._query(
+                f"SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM {qualifier}sqlite_stat1 GROUP BY tbl"
+            )
+            row_counts = dict(rows)
+
+        columns = (
+            "table_name",
+            "engine",
+            "table_rows",
+            "data_length",
+            "index_length",
+            "data_free",
+            "create_time",
+            "update_time",
+        )
+        rows = [
+            (name, "sqlite", row_counts.get(name), None, None, None, None, None)
+            for name in self.list_tables(schema)
+        ]
+        if result_format == "rows":
+            return [dict(zip(columns, row)) for row in rows]
+        return shape_rows(columns, rows, result_format)
+
+    def get_count_indexes(self) -> dict:
+        """
+        返回 {表名: 索引名}：每张表列数最少的完整索引（排除部分索引与 WITHOUT ROWID 表的主键），供 COUNT(*) 使用。
+        """
+        _, rows = self._query(
+            f"""
+            SELECT m.name, il.name, COUNT(*) AS width
+            FROM sqlite_master AS m
+            JOIN pragma_index_list(m.name) AS il
+            JOIN pragma_index_info(il.name) AS ii
+            WHERE {_USER_TABLES} AND il.partial = 0 AND il.origin <> 'pk'
+            GROUP BY m.name, il.name
+            ORDER BY m.name, width, il.name
+            """
+        )
+        indexes = {}
+        for table, index, _ in rows:
+            indexes.setdefault(table, index)
+        return indexes
+
+    def count_rows(self, table_name: str, index: Optional[str] = None) -> int:
+        """
+        精确统计表的行数，index 指定时以 INDEXED BY 扫描该索引；超时或取消时通过 interrupt() 中止。
+        """
+        if not table_name or not table_name.strip():
+            raise ValueError("table_name is required for counting rows.")
+        sql = f"SELECT COUNT(*) FROM {_quote_identifier(table_name)}"
+        if index:
+            sql += f" INDEXED BY {_quote_identifier(index)}"
+        _, rows = self._query(sql)
+        return int(rows[0][0])
+
+    def get_index_info(self, table_name: str):
+        """
+        查询指定表的索引结构，包含索引名、列、顺序以及唯一性等信息。
+        """
+        if not table_name:
+            raise ValueError("table_name is required for index inspection.")
+
+        _, rows = self._query(
+            """
+            SELECT
+                il.name AS index_name,
+                il."unique" AS is_unique,
+                il.origin AS origin,
+                ix.seqno AS seqno,
+                ix.name AS column_name,
+                ix."desc" AS is_desc,
+                ix.coll AS coll
+            FROM pragma_index_list(?) AS il
+            JOIN pragma_index_xinfo(il.name) AS ix
+            WHERE ix.key = 1
+            ORDER BY il.name, ix.seqno
+            """,
+            (table_name,),
+            dictionary=True,
+        )
+        indexes = [
+            {
+                "indexName": row["index_name"],
+                "columnName": row["column_name"],
+                "seqInIndex": row["seqno"] + 1,
+                "isUnique": bool(row["is_unique"]),
+                "indexType": "BTREE",
+                "collation": "D" if row["is_desc"] else "A",
+                "cardinality": None,
+                "subPart": None,
+                "packed": None,
+                "nullAllowed": None,
+                "indexComment": "",
+            }
+            for row in rows
+        ]
+
+        # INTEGER PRIMARY KEY 即 rowid，本身不会出现在索引列表中
+        if not any(row["origin"] == "pk" for row in rows):
+            _, pk_rows = self._query(
+                "SELECT name FROM pragma_table_info(?) WHERE pk > 0 ORDER BY pk", (table_name,)
+            )
+            for seq, (column_name,) in enumerate(pk_rows, start=1):
+                indexes.insert(
+                    seq - 1,
+                    {
+                        "indexName": "PRIMARY",
+                        "columnName": column_name,
+                        "seqInIndex": seq,
+                        "isUnique": True,
+                        "indexType": "ROWID",
+                        "collation": "A",
+                        "cardinality": None,
+                        "subPart": None,
+                        "packed": None,
+                        "nullAllowed": None,
+                        "indexComment": "",
+                    },
+                )
+        return indexes
+
+    def find_foreign_keys(self, table_name: Optional[str] = None, schema: Optional[str] = None):
+        """
+        列出外键约束，可按表名筛选。SQLite 外键没有名称，以 fk_<表名>_<序号> 表示。
+        """
+        if table_name is not None and not table_name.strip():
+            raise ValueError("table_name must not be blank when provided.")
+
+        sql = f"""
+            SELECT
+                m.name AS table_name,
+                fk.id AS fk_id,
+                fk."from" AS column_name,
+                fk."table" AS referenced_table,
+                fk."to" AS referenced_column,
+                fk.on_update AS update_rule,
+                fk.on_delete AS delete_rule
+            FROM {self._qualifier(schema)}sqlite_master AS m
+            JOIN pragma_foreign_key_list(m.name, ?) AS fk
+            WHERE {_USER_TABLES}
+        """
+        params = [schema or "main"]
+        if table_name:
+            sql += " AND m.name = ?"
+            params.append(table_name)
+        sql += " ORDER BY m.name, fk.id, fk.seq"
+
+        _, rows = self._query(sql, params, dictionary=True)
+        return [
+            {
+                "constraintName": f"fk_{row['table_name']}_{row['fk_id']}",
+                "tableName": row["table_name"],
+                "columnName": row["column_name"],
+                "referencedTable": row["referenced_table"],
+                # 为空表示引用被引用表的主键
+                "referencedColumn": row["referenced_column"],
+                "updateRule": row["update_rule"],
+                "deleteRule": row["delete_rule"],
+            }
+            for row in rows
+        ]
+
+    def get_triggers(self, table_name: Optional[str] = None):
+        """
+        返回触发器列表及定义内容，可选按表名过滤。
+        """
+        if table_name is not None and not table_name.strip():
+            raise ValueError("table_name must not be blank when provided.")
+
+        sql = "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'trigger'"
+        params = []
+        if table_name:
+            sql += " AND tbl_name = ?"
+            params.append(table_name)
+        sql += " ORDER BY tbl_name, name"
+
+        _, rows = self._query(sql, params)
+        triggers = []
+        for name, table, definition in rows:
+            match = _TRIGGER_HEADER.match(definition or "")
+            timing = match.group("timing") if match else None
+            triggers.append(
+                {
+                    "trigger_name": name,
+                    "event_manipulation": match.group("event").upper() if match else None,
+                    "event_table": table,
+                    # 省略时机时 SQLite 默认为 BEFORE
+                    "action_timing": " ".join(timing.upper().split()) if timing else "BEFORE",
+                    "action_statement": definition,
+                    "created_at": None,
+                }
+            )
+        return triggers
+
+    def sample_rows(
+        self,
+        table_name: str,
+        limit: int = 5,
+        budget: Optional[ResultBudget] = None,
+        result_format: str = "rows",
+        strategy: Optional[str] = None,
+        seed: Optional[int] = None,
+        scan_limit: Optional[int] = None,
+        block_size: Optional[int] = None,
+    ):
+        """
+        抽样返回指定表的若干行数据，默认限制 5 行；行数与字节数受结果预算约束。
+        pk_range / block 在 rowid 区间上随机定位（视图与 WITHOUT ROWID 表不支持），auto 以 rowid 跨度估计行数；
+        其余策略与 MySQL 相同，结果的 sampling 字段给出所用策略、种子与开销。
+        """
+        if not table_name or not table_name.strip():
+            raise ValueError("table_name is required for sampling rows.")
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+        check_format(result_format)
+
+        budget = budget or ResultBudget.from_request()
+        fetch_limit = min(limit, budget.max_rows + 1) if budget.max_rows else limit
+        dictionary = result_format == "rows"
+        table = _quote_identifier(table_name)
+
+        def first(size: int):
+            return self._query(f"SELECT * FROM {table} LIMIT ?", (size,), dictionary=dictionary)
+
+        def scan(size: int, consume):
+            return self._stream(f"SELECT * FROM {table} LIMIT ?", (size,), dictionary, consume)
+
+        def profile():
+            _, rows = self._query("SELECT type, sql FROM sqlite_master WHERE name = ?", (table_name,))
+            if not rows or rows[0][0] != "table" or _WITHOUT_ROWID.search(rows[0][1] or ""):
+                return None, None
+            return None, "rowid"
+
+        def bounds(key: str):
+            # MIN 与 MAX 写在同一个 SELECT 中时 SQLite 不做索引端点优化，会扫描整表
+            _, rows = self._query(f"SELECT (SELECT MIN({key}) FROM {table}), (SELECT MAX({key}) FROM {table})")
+            low, high = rows[0]
+            return None if low is None else (low, high)
+
+        def seek(key: str, starts: list, run: int):
+            # 复合查询的成员不能直接带 ORDER BY / LIMIT，每个定位包装为子查询
+            probe = f"SELECT * FROM (SELECT {key} FROM {table} WHERE {key} >= ? ORDER BY {key} LIMIT {int(run)})"
+            _, rows = self._query(" UNION ALL ".join([probe] * len(starts)), tuple(starts))
+            return [row[0] for row in rows]
+
+        def fetch(key: str, keys: list):
+            placeholders = ", ".join("?" * len(keys))
+            return self._query(
+                f"SELECT * FROM {table} WHERE {key} IN ({placeholders}) ORDER BY {key}",
+                tuple(keys),
+                dictionary=dictionary,
+            )
+
+        sampler = TableSampler(first, scan, profile, bounds, seek, fetch)
+        columns, rows, report = sampler.sample(
+            strategy, fetch_limit, seed=seed, scan_limit=scan_limit, block_size=block_size
+        )
+        result = budget.apply(columns, rows, limit_injected=fetch_limit < limit, result_format=result_format)
+        result["sampling"] = report
+        return result
+
+    def search_columns(self, keyword: str, schema: Optional[str] = None):
+        """
+        通过关键字搜索列名（SQLite 没有列注释，column_comment 恒为空）。
+        """
+        if not keyword or not keyword.strip():
+            raise ValueError("keyword must not be empty for column search.")
+
+        _, rows = self._query(
+            f"""
+            SELECT
+                m.name AS table_name,
+                p.name AS column_name,
+                p.type AS column_type,
+                CASE WHEN p."notnull" THEN 'NO' ELSE 'YES' END AS is_nullable,
+                p.dflt_value AS column_default,
+                '' AS column_comment
+            FROM {self._qualifier(schema)}sqlite_master AS m
+            JOIN pragma_table_info(m.name, ?) AS p
+            WHERE {_USER_TABLES}
+              AND p.name LIKE ?
+            ORDER BY m.name, p.cid
+            """,
+            (schema or "main", f"%{keyword.strip()}%"),
+            dictionary=True,
+        )
+        return rows
+
+    def describe_column(self, table_name: str, column_name: str):
+        """
+        输出指定字段的类型、默认值与约束等详细信息。
+        """
+        if not table_name or not table_name.strip():
+            raise ValueError("table_name is required for column description.")
+        if not column_name or not column_name.strip():
+            raise ValueError("column_name is required for column description.")
+
+        _, rows = self._query(
+            """
+            SELECT
+                ? AS table_name,
+                name AS column_name,
+                type AS column_type,
+                CASE WHEN "notnull" THEN 'NO' ELSE 'YES' END AS is_nullable,
+                dflt_value AS column_default,
+                CASE WHEN pk > 0 THEN 'PRI' ELSE '' END AS column_key,
+                '' AS extra,
+                '' AS column_comment,
+                NULL AS char_length,
+                NULL AS numeric_precision,
+                NULL AS numeric_scale
+            FROM pragma_table_info(?)
+            WHERE name = ?
+            """,
+            (table_name, table_name, column_name),
+            dictionary=True,
+        )
+        return rows[0] if rows else {}
+
+    def explain_query(self, sql: str, params=None):
+        """
+        对只读 SQL 执行 EXPLAIN QUERY PLAN，返回执行计划信息。
+        """
+        if not self.is_read_only_query(sql):
+            raise ValueError("Only read-only SQL statements can be explained.")
+
+        _, rows = self._query(f"EXPLAIN QUERY PLAN {sql}", params, dictionary=True)
+        return rows
+
+    def list_procedures(self, include_functions: bool = True):
+        """
+        SQLite 没有存储过程与存储函数，返回空列表以保持接口一致。
+        """
+        return []
+
+    def list_users(self):
+        """
+        SQLite 没有用户与权限体系，返回空列表。
+        """
+        return []
+
+    def get_server_status(self):
+        """
+        返回 SQLite 库版本、当前连接数、运行时长与打开参数。
+        """
+        _, rows = self._query("PRAGMA mmap_size")
+        return {
+            "version": sqlite3.sqlite_version,
+            "threadsConnected": len(self._connections),
+            "uptimeSeconds": int(time.monotonic() - self._started_at),
+            "engines": [],
+            "path": self.path,
+            "immutable": DB_CONFIG["sqlite_immutable"],
+            "mmapSize": rows[0][0] if rows else None,
+        }
+
+    def load_table_definitions(self, schema: str, tables: Optional[list] = None) -> dict:
+        """
+        加载指定表（为空时为全部表）的列、索引、外键与触发器定义，schema 为 main 或附加库名。
+        """
+        master = f"{self._qualifier(schema)}sqlite_master"
+        table_filter, table_params = "", []
+        if tables:
+            table_filter = f" AND {{column}} IN ({', '.join('?' * len(tables))})"
+            table_params = list(tables)
+
+        definitions = {}
+
+        def definition(table: str) -> dict:
+            if table not in definitions:
+                definitions[table] = empty_definition()
+            return definitions[table]
+
+        _, rows = self._query(
+            f"""
+            SELECT
+                m.name AS table_name,
+                p.name AS column_name,
+                p.type AS column_type,
+                CASE WHEN p."notnull" THEN 'NO' ELSE 'YES' END AS is_nullable,
+                p.dflt_value AS column_default,
+                CASE WHEN p.pk > 0 THEN 'PRI' ELSE '' END AS column_key,
+                '' AS extra,
+                p.cid + 1 AS ordinal_position
+            FROM {master} AS m
+            JOIN pragma_table_info(m.name, ?) AS p
+            WHERE {_USER_TABLES}{table_filter.format(column="m.name")}
+            ORDER BY m.name, p.cid
+            """,
+            [schema] + table_params,
+            dictionary=True,
+        )
+        for row in rows:
+            definition(row["table_name"])["columns"][row["column_name"]] = row
+
+        _, rows = self._query(
+            f"""
+            SELECT m.name, il.name, ix.name, il."unique", ix."desc"
+            FROM {master} AS m
+            JOIN pragma_index_list(m.name, ?) AS il
+            JOIN pragma_index_xinfo(il.name, ?) AS ix
+            WHERE {_USER_TABLES}{table_filter.format(column="m.name")} AND ix.key = 1
+            ORDER BY m.name, il.name, ix.seqno
+            """,
+            [schema, schema] + table_params,
+        )
+        for table, index_name, column, unique, descending in rows:
+            definition(table)["indexes"].setdefault(index_name, []).append(
+                {"column": column, "unique": bool(unique), "descending": bool(descending)}
+            )
+
+        _, rows = self._query(
+            f"""
+            SELECT m.name, fk.id, fk."from", fk."table", fk."to", fk.on_update, fk.on_delete
+            FROM {master} AS m
+            JOIN pragma_foreign_key_list(m.name, ?) AS fk
+            WHERE {_USER_TABLES}{table_filter.format(column="m.name")}
+            ORDER BY m.name, fk.id, fk.seq
+            """,
+            [schema] + table_params,
+        )
+        for table, fk_id, column, referenced_table, referenced_column, update_rule, delete_rule in rows:
+            definition(table)["foreignKeys"].setdefault(f"fk_{table}_{fk_id}", []).append(
+                {
+                    "column": column,
+                    "referencedTable": referenced_table,
+                    "referencedColumn": referenced_column,
+                    "updateRule": update_rule,
+                    "deleteRule": delete_rule,
+                }
+            )
+
+        _, rows = self._query(
+            f"""
+            SELECT m.tbl_name, m.name, m.sql FROM {master} AS m
+            WHERE m.type = 'trigger'{table_filter.format(column="m.tbl_name")}
+            ORDER BY m.tbl_name, m.name
+            """,
+            table_params,
+        )
+        for table, name, statement in rows:
+            match = _TRIGGER_HEADER.match(statement or "")
+            timing = match.group("timing") if match else None
+            definition(table)["triggers"][name] = {
+                "timing": " ".join(timing.upper().split()) if timing else "BEFORE",
+                "event": match.group("event").upper() if match else None,
+                "statement": statement,
+            }
+        return definitions
+
+    def get_table_fingerprints(self, schema: str, table_name: Optional[str] = None) -> dict:
+        """
+        SQLite 无内置哈希函数，一次加载全部定义后在本地逐表计算指纹；本地文件读取开销很小。
+        """
+        return fingerprint_definitions(self.load_table_definitions(schema, [table_name] if table_name else None))
+
+    def compare_schemas(
+        self, schema_a: str, schema_b: str, table_name: Optional[str] = None
+    ):
+        """
+        比较两个数据库（main 或附加库）或指定表的结构：先比较逐表指纹，再只对指纹不同的表做详细比较。
+        """
+        if not schema_a or not schema_b:
+            raise ValueError("schema_a and schema_b are required for comparison.")
+        if table_name is not None and not table_name.strip():
+            raise ValueError("table_name must not be blank when provided.")
+
+        return compare_by_fingerprint(
+            schema_a,
+            schema_b,
+            self.get_table_fingerprints(schema_a, table_name),
+            self.get_table_fingerprints(schema_b, table_name),
+            self.load_table_definitions,
+        )
+
+    def generate_ddl(self, table_name: str):
+        """
+        返回指定表的 CREATE TABLE 语句及其显式创建的索引。
+        """
+        if not table_name or not table_name.strip():
+            raise ValueError("table_name is required to generate DDL.")
+
+        _, rows = self._query(
+            """
+            SELECT sql FROM sqlite_master
+            WHERE tbl_name = ? AND type IN ('table', 'index') AND sql IS NOT NULL
+            ORDER BY type = 'table' DESC, name
+            """,
+            (table_name,),
+        )
+        if not rows:
+            return {}
+        return {"table": table_name, "createStatement": ";\n".join(row[0] for row in rows)}
+
+    def is_read_only_query(self, sql: str) -> bool:
+        """
+        校验 SQL 是否为安全的只读语句，禁止多语句与写操作。
+        """
+        return is_read_only_sql(sql)
+
+    def run_query(
+        self,
+        sql: str,
+        params=None,
+        page_size: Optional[int] = None,
+        budget: Optional[ResultBudget] = None,
+        result_format: str = "rows",
+    ):
+        """
+        执行已校验为只读的查询，并返回列名与结果行数据；预算、流式分页与结果编码与 MySQL 连接器一致。
+        """
+        if not self.is_read_only_query(sql):
+            raise ValueError("Only read-only SQL statements are allowed.")
+        check_format(result_format)
+        budget = budget or ResultBudget.from_request()
+        if page_size is not None:
+            return self._open_stream(
+                sql, params, self._resolve_page_size(page_size), budget, result_format
+            )
+
+        limited_sql, limit_injected = budget.limit_sql(sql)
+        # 未能注入 LIMIT 时只读取预算内的行再多一行，不把整个结果集载入内存
+        max_rows = budget.max_rows + 1 if budget.max_rows and not limit_injected else None
+        columns, rows = self._query(
+            limited_sql, params, dictionary=result_format == "rows", max_rows=max_rows
+        )
+        return budget.apply(
+            columns, rows, limit_injected=limit_injected or max_rows is not None, result_format=result_format
+        )
+
+    @staticmethod
+    def _resolve_page_size(page_size: Optional[int]) -> int:
+        if page_size is None:
+            return STREAM_CONFIG["default_page_size"]
+        if page_size <= 0:
+            raise ValueError("page_size must be a positive integer.")
+        return min(page_size, STREAM_CONFIG["max_page_size"])
+
+    def _open_stream(
+        self,
+        sql: str,
+        params,
+        page_size: int,
+        budget: ResultBudget,
+        result_format: str = "rows",
+    ):
+        """
+        在独立连接上执行查询并返回第一页；SQLite 游标本身按需逐行读取，结果未读完时登记游标供后续翻页。
+        """
+        if not self._cursors.has_capacity():
+            raise RuntimeError(
+                f"Too many open cursors (limit {self._cursors.max_open}); close or drain existing cursors first."
+            )
+
+        # fetchMore 可能在其它工作线程执行，流式游标不能使用线程私有连接
+        connection = self._open_connection()
+        try:
+            with self._interruptible(connection):
+                started = time.perf_counter()
+                cursor = connection.execute(sql, params or ())
+                record_statement(time.perf_counter() - started, 0.0, 0)
+        except Exception:
+            connection.close()
+            raise
+        columns = tuple(item[0] for item in cursor.description) if cursor.description else ()
+        if result_format == "rows":
+            cursor.row_factory = lambda _cursor, row: dict(zip(columns, row))
+
+        stream = StreamingCursor(
+            cursor,
+            columns,
+            [],
+            lambda discard: connection.close(),
+            budget=budget,
+            result_format=result_format,
+            connection=connection,
+        )
+        with self._interruptible(connection):
+            page = stream.fetch(page_size)
+        token = None
+        if page["hasMore"]:
+            try:
+                token = self._cursors.register(stream)
+            except Exception:
+                stream.close()
+                raise
+        page["cursor"] = token
+        return page
+
+    def fetch_more(self, token: str, page_size: Optional[int] = None):
+        """
+        从流式游标继续读取下一页；读完后游标自动关闭，返回的 cursor 为 None。
+        """
+        stream = self._cursors.get(token)
+        try:
+            with self._interruptible(stream.connection):
+                page = stream.fetch(self._resolve_page_size(page_size))
+        except Exception:
+            self._cursors.forget(token)
+            raise
+        if not page["hasMore"]:
+            self._cursors.forget(token)
+        page["cursor"] = token if page["hasMore"] else None
+        return page
+
+    def close_cursor(self, token: str):
+        """
+        提前关闭流式游标并释放其占用的连接。
+        """
+        return {"cursor": token, "closed": self._cursors.discard(token)}
+
+    def get_procedure_definition(self, procedure_name: str):
+        """
+        SQLite 没有存储过程，返回空结果。
+        """
+        return {}
+
+    def close(self):
+        """
+        关闭所有线程持有的连接。
+        """
+        with self._lock:
+            connections, self._connections = list(self._connections), {}
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
@@ -0,0 +1,245 @@
+# 服务端指标：按 RPC 方法统计各阶段延迟直方图、返回行数与字节数、错误数与在途请求数
+# mcp_protocol/metrics.py
+import bisect
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# 直方图桶上界（秒），与 Prometheus 客户端默认桶相近并补充了 1ms 以下与 30s 的区间
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 相互不重叠的阶段：dispatch 为处理函数中除数据库执行与取数之外的耗时，各阶段之和即总耗时
+PHASES = ("parse", "dispatch", "execute", "fetch", "serialize")
+
+
+class Histogram:
+    """固定桶直方图；分位数按桶内线性插值估算，并以观测到的最大值为上限。"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[index - 1] if index else 0.0
+                # 最后一个桶没有上界，取最大桶边界作为估计值
+                upper = BUCKETS[index] if index < len(BUCKETS) else BUCKETS[-1]
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "totalMs": round(self.total * 1000, 3),
+            "avgMs": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50Ms": round(self.quantile(0.5) * 1000, 3),
+            "p95Ms": round(self.quantile(0.95) * 1000, 3),
+            "p99Ms": round(self.quantile(0.99) * 1000, 3),
+            "maxMs": round(self.max * 1000, 3),
+        }
+
+
+class MethodMetrics:
+    __slots__ = ("calls", "errors", "rows", "bytes", "latency", "phases")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.latency = Histogram()
+        self.phases = {phase: Histogram() for phase in PHASES}
+
+
+class RequestTimer:
+    """
+    记录单个请求各阶段的耗时：mark(phase) 把上一个标记以来的时间计入该阶段。
+    """
+
+    __slots__ = ("started", "phases", "rows", "_last")
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        # 处理期间从数据库读取的行数
+        self.rows = 0
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def attach_database_time(self, execute: float, fetch: float) -> None:
+        """把处理函数中的数据库执行与取数耗时从 dispatch 中拆分出来。"""
+        if not execute and not fetch:
+            return
+        self.phases["execute"] = self.phases.get("execute", 0.0) + execute
+        self.phases["fetch"] = self.phases.get("fetch", 0.0) + fetch
+        if "dispatch" in self.phases:
+            self.phases["dispatch"] = max(self.phases["dispatch"] - execute - fetch, 0.0)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class ServerMetrics:
+    """
+    进程内的指标汇总，供 getServerMetrics 查询或定期导出为 Prometheus 文本格式。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods: Dict[str, MethodMetrics] = {}
+        self._in_flight = 0
+        self._started_at = time.time()
+        self._dumper: Optional[threading.Thread] = None
+
+    def begin(self) -> RequestTimer:
+        with self._lock:
+            self._in_flight += 1
+        return RequestTimer()
+
+    def finish(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def observe(
+        self,
+        method: str,
+        timer: RequestTimer,
+        error: bool = False,
+        rows: int = 0,
+        size: int = 0,
+    ) -> None:
+        """记录一次调用；批量请求中的各调用只记录处理阶段，解析与序列化计入批量请求本身。"""
+        with self._lock:
+            entry = self._methods.get(method)
+            if entry is None:
+                entry = self._methods[method] = MethodMetrics()
+            entry.calls += 1
+            entry.errors += bool(error)
+            entry.rows += rows
+            entry.bytes += size
+            entry.latency.observe(timer.elapsed())
+            for phase, seconds in timer.phases.items():
+                entry.phases[phase].observe(seconds)
+
+    def snapshot(self) -> dict:
+        """返回全局吞吐、在途请求数以及各方法的延迟分位数、分阶段耗时、行数、字节数与错误数。"""
+        uptime = time.time() - self._started_at
+        with self._lock:
+            methods = {
+                name: {
+                    "calls": entry.calls,
+                    "errors": entry.errors,
+                    "rowsFetched": entry.rows,
+                    "bytesReturned": entry.bytes,
+                    "latency": entry.latency.summary(),
+                    "phases": {
+                        phase: histogram.summary()
+                        for phase, histogram in entry.phases.items()
+                        if histogram.count
+                    },
+                }
+                for name, entry in sorted(self._methods.items())
+            }
+            in_flight = self._in_flight
+        calls = sum(item["calls"] for item in methods.values())
+        return {
+            "uptimeSeconds": round(uptime, 3),
+            "inFlight": in_flight,
+            "calls": calls,
+            "errors": sum(item["errors"] for item in methods.values()),
+            "callsPerSecond": round(calls / uptime, 3) if uptime > 0 else 0.0,
+            "methods": methods,
+        }
+
+    def render_prometheus(self) -> str:
+        """按 Prometheus 文本格式输出全部指标。"""
+        lines = [
+            "# HELP mcp_request_duration_seconds Request latency by RPC method and phase.",
+            "# TYPE mcp_request_duration_seconds histogram",
+        ]
+        counters = {
+            "mcp_requests_total": ("Completed requests by RPC method.", "calls"),
+            "mcp_request_errors_total": ("Requests that returned an error.", "errors"),
+            "mcp_rows_fetched_total": ("Rows fetched from the database.", "rows"),
+            "mcp_response_bytes_total": ("Serialized response bytes.", "bytes"),
+        }
+        counter_lines = {name: [] for name in counters}
+        with self._lock:
+            for method, entry in sorted(self._methods.items()):
+                series = [("total", entry.latency)] + [
+                    (phase, histogram) for phase, histogram in entry.phases.items() if histogram.count
+                ]
+                for phase, histogram in series:
+                    labels = f'method="{_escape(method)}",phase="{phase}"'
+                    cumulative = 0
+                    for bound, bucket_count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'mcp_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                    lines.append(f"mcp_request_duration_seconds_sum{{{labels}}} {histogram.total}")
+                    lines.append(f"mcp_request_duration_seconds_count{{{labels}}} {histogram.count}")
+                for name, (_, attribute) in counters.items():
+                    counter_lines[name].append(
+                        f'{name}{{method="{_escape(method)}"}} {getattr(entry, attribute)}'
+                    )
+            in_flight = self._in_flight
+
+        for name, (help_text, _) in counters.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(counter_lines[name])
+        lines.append("# HELP mcp_requests_in_flight Requests currently being processed.")
+        lines.append("# TYPE mcp_requests_in_flight gauge")
+        lines.append(f"mcp_requests_in_flight {in_flight}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """先写临时文件再原子替换，避免 node_exporter 读到写了一半的文件。"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            handle.write(self.render_prometheus())
+        os.replace(temp_path, path)
+
+    def start_textfile_dump(self, path: str, interval: float) -> None:
+        """后台线程每隔 interval 秒把指标写入 path，供 node_exporter 的 textfile collector 采集。"""
+        if self._dumper is not None or not path or interval <= 0:
+            return
+
+        def run() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_textfile(path)
+                except OSError as exc:
+                    print(f"[WARN] Failed to write metrics textfile {path}: {exc}", file=sys.stderr)
+
+        self._dumper = threading.Thread(target=run, name="metrics-textfile", daemon=True)
+        self._dumper.start()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = ServerMetrics()
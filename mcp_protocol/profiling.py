@@ -0,0 +1,204 @@
+# 按需剖析单个请求：请求参数中的 _profile 字段或按比例抽样触发，使用 cProfile / tracemalloc 记录处理过程
+# mcp_protocol/profiling.py
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from config.settings import PROFILE_CONFIG
+
+# cProfile / pstats / tracemalloc 只在实际剖析时导入，未开启剖析的进程启动时不加载
+if TYPE_CHECKING:
+    import cProfile
+
+_MODES = {"cpu": (True, False), "memory": (False, True), "both": (True, True)}
+_SORT_KEYS = {"cumulative": "cumulative", "tottime": "tottime"}
+
+
+class ProfileOptions:
+    __slots__ = ("cpu", "memory", "top", "sort", "requested")
+
+    def __init__(self, mode: str, top: int, sort: str, requested: bool):
+        # 参数来自客户端，类型不符（如 null、数组）也要报告为参数错误，而不是在查表时抛出 TypeError
+        if not isinstance(mode, str) or mode not in _MODES:
+            raise ValueError(f"Unsupported profile mode {mode!r}; expected one of {', '.join(_MODES)}.")
+        if not isinstance(sort, str) or sort not in _SORT_KEYS:
+            raise ValueError(f"Unsupported profile sort {sort!r}; expected one of {', '.join(_SORT_KEYS)}.")
+        if isinstance(top, str) and top.strip().isdigit():
+            top = int(top)
+        if isinstance(top, bool) or not isinstance(top, int) or top <= 0:
+            raise ValueError("Profile top must be a positive integer.")
+        self.cpu, self.memory = _MODES[mode]
+        self.top = top
+        self.sort = sort
+        # 由客户端显式请求（结果中附带摘要），而非按比例抽样
+        self.requested = requested
+
+
+def profile_options(request) -> Optional[ProfileOptions]:
+    """
+    从请求参数中取出 _profile 字段并解析为剖析选项；未请求时按 MCP_PROFILE_SAMPLE_PERCENT 抽样。
+    两者都不满足时返回 None，未开启剖析的请求只多一次字典查找。
+    """
+    flag = request.kwargs.pop("_profile", None) if request.kwargs else None
+    if flag is None or flag is False:
+        percent = PROFILE_CONFIG["sample_percent"]
+        if percent <= 0 or random.random() * 100 >= percent:
+            return None
+        return ProfileOptions(PROFILE_CONFIG["mode"], PROFILE_CONFIG["top_n"], "cumulative", requested=False)
+    if not PROFILE_CONFIG["allow_request"]:
+        raise ValueError("Request-level profiling is disabled on this server.")
+
+    settings = {}
+    if isinstance(flag, str):
+        settings = {"mode": flag}
+    elif isinstance(flag, dict):
+        settings = flag
+    elif flag is not True:
+        raise ValueError("_profile must be true, a mode string, or an object with mode/top/sort.")
+    return ProfileOptions(
+        settings.get("mode", PROFILE_CONFIG["mode"]),
+        settings.get("top", PROFILE_CONFIG["top_n"]),
+        settings.get("sort", "cumulative"),
+        requested=True,
+    )
+
+
+# tracemalloc 为进程级开关：并发的剖析请求共享同一次跟踪，最后一个结束时停止
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _start_tracemalloc() -> None:
+    import tracemalloc
+
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc() -> None:
+    import tracemalloc
+
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+class RequestProfiler:
+    """
+    在当前线程上运行 cProfile，并可同时用 tracemalloc 对比前后快照；退出后生成 top-N 摘要。
+    内存统计为进程级，并发请求的分配也会计入。
+    """
+
+    def __init__(self, options: ProfileOptions):
+        self.options = options
+        self._profile: Optional["cProfile.Profile"] = None
+        self._before = None
+        self._after = None
+        self._peak = 0
+        self._started = 0.0
+        self.wall_time = 0.0
+
+    def __enter__(self):
+        import cProfile
+        import tracemalloc
+
+        if self.options.memory:
+            _start_tracemalloc()
+            tracemalloc.reset_peak()
+            self._before = tracemalloc.take_snapshot()
+        if self.options.cpu:
+            self._profile = cProfile.Profile()
+        self._started = time.perf_counter()
+        if self._profile is not None:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        import tracemalloc
+
+        if self._profile is not None:
+            self._profile.disable()
+        self.wall_time = time.perf_counter() - self._started
+        if self.options.memory:
+            self._after = tracemalloc.take_snapshot()
+            self._peak = tracemalloc.get_traced_memory()[1]
+            _stop_tracemalloc()
+        return False
+
+    def summary(self) -> dict:
+        import pstats
+
+        result: dict = {"wallMs": round(self.wall_time * 1000, 3)}
+        if self._profile is not None:
+            stats = pstats.Stats(self._profile, stream=io.StringIO())
+            stats.sort_stats(_SORT_KEYS[self.options.sort])
+            top = []
+            for func in stats.fcn_list[: self.options.top]:
+                primitive_calls, calls, own_time, cumulative, _ = stats.stats[func]
+                top.append(
+                    {
+                        "function": pstats.func_std_string(func),
+                        "calls": calls,
+                        "ownMs": round(own_time * 1000, 3),
+                        "cumulativeMs": round(cumulative * 1000, 3),
+                    }
+                )
+            result["cpu"] = {"totalCalls": stats.total_calls, "sort": self.options.sort, "top": top}
+        if self._after is not None:
+            differences = self._after.compare_to(self._before, "lineno")
+            result["memory"] = {
+                "peakKiB": round(self._peak / 1024, 1),
+                "top": [
+                    {
+                        "location": str(diff.traceback),
+                        "sizeDiffKiB": round(diff.size_diff / 1024, 1),
+                        "countDiff": diff.count_diff,
+                    }
+                    for diff in differences[: self.options.top]
+                ],
+            }
+        return result
+
+    def save(self, directory: str, method: str, request_id: Any) -> list:
+        """把完整的 .prof（可用 snakeviz / pstats 打开）与内存快照写入目录，返回文件路径。"""
+        os.makedirs(directory, exist_ok=True)
+        # 请求 id 由客户端给出，只保留可安全用于文件名的字符
+        safe_id = re.sub(r"[^\w.-]", "_", str(request_id))
+        stem = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{safe_id}-{os.getpid()}")
+        files = []
+        if self._profile is not None:
+            self._profile.dump_stats(f"{stem}.prof")
+            files.append(f"{stem}.prof")
+        if self._after is not None:
+            self._after.dump(f"{stem}.tracemalloc")
+            files.append(f"{stem}.tracemalloc")
+        return files
+
+
+def report(profiler: RequestProfiler, response, method: str, request_id: Any) -> None:
+    """
+    输出剖析结果：配置了 MCP_PROFILE_DIR 时写出完整文件；客户端显式请求且结果为对象时附加到结果的 _profile 字段，
+    其余情况（抽样请求、非对象结果、错误响应）把摘要写到 stderr。
+    """
+    summary = profiler.summary()
+    if PROFILE_CONFIG["output_dir"]:
+        try:
+            summary["files"] = profiler.save(PROFILE_CONFIG["output_dir"], method, request_id)
+        except OSError as exc:
+            print(f"[WARN] Failed to write profile for {method}: {exc}", file=sys.stderr)
+    result = getattr(response, "result", None)
+    if profiler.options.requested and isinstance(result, dict):
+        response.result = {**result, "_profile": summary}
+        return
+    print(f"[PROFILE] {method} id={request_id!r} {json.dumps(summary, default=str)}", file=sys.stderr)
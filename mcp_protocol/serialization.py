@@ -0,0 +1,110 @@
+# JSON-RPC 响应序列化：优先使用 orjson，未安装时退回标准库 json
+# mcp_protocol/serialization.py
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Callable
+
+from tinyrpc.protocols.jsonrpc import JSONRPCBatchResponse
+
+from config.settings import SERIALIZER_CONFIG
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def _format_timedelta(value: datetime.timedelta) -> str:
+    """MySQL TIME 列返回 timedelta，按 [-]HH:MM:SS[.ffffff] 输出（小时可超过 24）。"""
+    sign = "-" if value < datetime.timedelta(0) else ""
+    value = abs(value)
+    hours, remainder = divmod(value.days * 86400 + value.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    text = f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if value.microseconds:
+        text += f".{value.microseconds:06d}"
+    return text
+
+
+def _encode_bytes_base64(value) -> str:
+    return base64.b64encode(value).decode("ascii")
+
+
+def _encode_bytes_hex(value) -> str:
+    return bytes(value).hex()
+
+
+_BYTES_ENCODERS = {"base64": _encode_bytes_base64, "hex": _encode_bytes_hex}
+
+
+def _make_default(encode_bytes: Callable[[Any], str]) -> Callable[[Any], Any]:
+    def default(value: Any) -> Any:
+        """两种后端共用的类型编码：结果与所选后端无关。"""
+        if isinstance(value, decimal.Decimal):
+            # 以字符串输出，避免转为 float 丢失精度
+            return str(value)
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, datetime.timedelta):
+            return _format_timedelta(value)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return encode_bytes(bytes(value))
+        if isinstance(value, (set, frozenset)):
+            # MySQL SET 列返回 set，排序后输出保证结果稳定
+            try:
+                return sorted(value)
+            except TypeError:
+                return sorted(value, key=repr)
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    return default
+
+
+class JSONSerializer:
+    """
+    将对象编码为 UTF-8 JSON 字节串。backend 为 auto / orjson / json，auto 时在已安装 orjson 的情况下使用 orjson。
+    """
+
+    def __init__(self, backend: str = "auto", bytes_encoding: str = "base64"):
+        if bytes_encoding not in _BYTES_ENCODERS:
+            raise ValueError(f"Unsupported bytes encoding: {bytes_encoding}")
+        if backend == "auto":
+            backend = "orjson" if orjson is not None else "json"
+        if backend == "orjson" and orjson is None:
+            raise ValueError("orjson backend requested but orjson is not installed.")
+        if backend not in ("orjson", "json"):
+            raise ValueError(f"Unsupported JSON backend: {backend}")
+        self.backend = backend
+        self.bytes_encoding = bytes_encoding
+        self._default = _make_default(_BYTES_ENCODERS[bytes_encoding])
+        if backend == "orjson":
+            # orjson 原生处理 datetime / UUID 等类型，其余类型交给 default
+            self.dumps = self._dumps_orjson
+        else:
+            self._encoder = json.JSONEncoder(
+                ensure_ascii=False, separators=(",", ":"), default=self._default
+            )
+            self.dumps = self._dumps_stdlib
+
+    def _dumps_orjson(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=self._default, option=orjson.OPT_NON_STR_KEYS)
+
+    def _dumps_stdlib(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj).encode("utf-8")
+
+    def dumps_response(self, response) -> bytes:
+        """直接编码 tinyrpc 响应对象，跳过 serialize() 与 decode() 的中间字符串。"""
+        if isinstance(response, JSONRPCBatchResponse):
+            return self.dumps([item._to_dict() for item in response if item is not None])
+        return self.dumps(response._to_dict())
+
+
+serializer = JSONSerializer(
+    backend=SERIALIZER_CONFIG["backend"],
+    bytes_encoding=SERIALIZER_CONFIG["bytes_encoding"],
+)
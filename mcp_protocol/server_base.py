@@ -1,11 +1,27 @@
 # 封装 JSON-RPC 协议处理
 # mcp_protocol/server_base.py
 import sys
-import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 from tinyrpc.dispatch import RPCDispatcher
-from tinyrpc.protocols.jsonrpc import JSONRPCProtocol
+from tinyrpc.exc import ServerError
+from tinyrpc.protocols.jsonrpc import (
+    JSONRPCBatchRequest,
+    JSONRPCErrorResponse,
+    JSONRPCInvalidRequestError,
+    JSONRPCProtocol,
+)
 
-from .tool_registry import register_all_tools
+from config.settings import METRICS_CONFIG, SERVER_CONFIG, SNAPSHOT_CONFIG
+from db_connectors.execution import in_flight
+from .metrics import RequestTimer, metrics
+from .profiling import RequestProfiler, profile_options, report
+from .serialization import serializer
+from .tool_registry import load_tool_modules, register_all_tools
 
 # 创建 JSON-RPC 分发器与协议
 dispatcher = RPCDispatcher()
@@ -17,27 +33,245 @@ def ping():
     """测试 MCP Server 是否可用"""
     return "pong"
 
-def start_server():
-    """启动 MCP 服务器 (基于 stdin/stdout 的 JSON-RPC 通信)"""
-    print("[INFO] MCP Python Server started. Waiting for requests...", file=sys.stderr)
 
+# 批内调用使用独立线程池：批请求本身运行在工作线程中，若与其共用线程池，等待子调用时可能互相占满而死锁
+_batch_executor: Optional[ThreadPoolExecutor] = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_executor_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(
+                    max_workers=SERVER_CONFIG["batch_concurrency"], thread_name_prefix="mcp-batch"
+                )
+    return _batch_executor
+
+
+# 各 RPC 方法的分阶段延迟、吞吐、返回行数与字节数、错误数及在途请求数
+dispatcher.add_method(metrics.snapshot, name="getServerMetrics")
+
+
+def _metric_name(method: str) -> str:
+    # 未注册的方法名统一归为 unknown，避免客户端随意传入的名称撑大指标维度
+    return method if method in dispatcher.method_map else "unknown"
+
+
+def _dispatch_tracked(request, timer: RequestTimer):
+    """登记在途请求后执行单个调用，使其受执行超时约束并可被 cancelRequest 按 id 取消；记录数据库耗时。"""
+    with in_flight.track(request.unique_id) as execution:
+        try:
+            return dispatcher.dispatch(request)
+        finally:
+            timer.mark("dispatch")
+            timer.attach_database_time(execution.execute_time, execution.fetch_time)
+            timer.rows = execution.rows_fetched
+
+
+def _dispatch(request, timer: RequestTimer, encode: bool = False):
+    """
+    执行单个调用；请求携带 _profile 或被抽样时在剖析器下运行。
+    encode=True 时剖析范围包含一次响应编码，以便区分数据库、行转换与 JSON 编码的耗时。
+    """
+    try:
+        options = profile_options(request)
+    except ValueError as exc:
+        return request.error_respond(exc)
+    if options is None:
+        return _dispatch_tracked(request, timer)
+    with RequestProfiler(options) as profiler:
+        response = _dispatch_tracked(request, timer)
+        if encode and response:
+            serializer.dumps_response(response)
+    report(profiler, response, _metric_name(request.method), request.unique_id)
+    return response
+
+
+def _dispatch_one(item):
+    """执行批内单个调用；解析失败的条目与意外异常都只影响该条目的响应。"""
+    if isinstance(item, Exception):
+        return item.error_respond() if hasattr(item, "error_respond") else None
+    timer = RequestTimer()
+    try:
+        response = _dispatch(item, timer)
+    except Exception:
+        response = item.error_respond(ServerError())
+    metrics.observe(
+        _metric_name(item.method),
+        timer,
+        error=isinstance(response, JSONRPCErrorResponse),
+        rows=timer.rows,
+    )
+    return response
+
+
+def dispatch_batch(batch: JSONRPCBatchRequest):
+    """
+    并行执行 JSON-RPC 批量请求，按请求顺序汇总为一个批量响应；全部为通知时返回 None。
+    """
+    if len(batch) > SERVER_CONFIG["max_batch_size"] > 0:
+        return JSONRPCInvalidRequestError(
+            data=f"Batch contains {len(batch)} calls, limit is {SERVER_CONFIG['max_batch_size']}."
+        ).error_respond()
+
+    if SERVER_CONFIG["batch_concurrency"] <= 1 or len(batch) == 1:
+        results = [_dispatch_one(item) for item in batch]
+    else:
+        results = list(_get_batch_executor().map(_dispatch_one, batch))
+
+    response = batch.create_batch_response()
+    if response is not None:
+        response.extend(results)
+    return response
+
+
+def handle_request(raw: str) -> Optional[bytes]:
+    """解析并执行单条 JSON-RPC 请求或批量请求，返回待写出的 UTF-8 响应行（通知类请求返回 None）。"""
+    timer = metrics.begin()
+    method = "invalid"
+    line = None
+    error = False
+    try:
+        # 解析 JSON-RPC 请求
+        request = protocol.parse_request(raw)
+        timer.mark("parse")
+        # 分发处理，批量请求中的调用并行执行并各自记录指标
+        if isinstance(request, JSONRPCBatchRequest):
+            method = "batch"
+            response = dispatch_batch(request)
+            timer.mark("dispatch")
+        else:
+            method = _metric_name(request.method)
+            response = _dispatch(request, timer, encode=True)
+            error = isinstance(response, JSONRPCErrorResponse)
+        if response:
+            # 直接编码为 bytes 写入二进制 stdout，Decimal / datetime / bytes 等由序列化器统一处理
+            line = serializer.dumps_response(response)
+            timer.mark("serialize")
+    except Exception as e:
+        error = True
+        line = serializer.dumps({"error": str(e)})
+    finally:
+        metrics.finish()
+    metrics.observe(method, timer, error=error, rows=timer.rows, size=len(line) if line else 0)
+    return line
+
+
+class ResponseWriter:
+    """
+    独立的写线程：工作线程只负责把响应放入队列，由该线程串行写出，避免多线程交错写 stdout。
+    """
+
+    _STOP = object()
+
+    def __init__(self, stream=None):
+        self._stream = stream or sys.stdout.buffer
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="mcp-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def send(self, line: Optional[bytes]) -> None:
+        if line is not None:
+            self._queue.put(line)
+
+    def close(self) -> None:
+        """写出队列中剩余的响应后结束写线程。"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            line = self._queue.get()
+            if line is self._STOP:
+                break
+            # 分两次写入，避免为拼接换行符复制整段大响应
+            self._stream.write(line)
+            self._stream.write(b"\n")
+            self._stream.flush()
+
+
+def _serve_sequential() -> None:
+    """逐条读取、执行并写回响应（MCP_MAX_WORKERS <= 1 时使用）。"""
+    stdout = sys.stdout.buffer
     while True:
         raw = sys.stdin.readline()
         if not raw:
             break  # EOF -> 停止服务
-        try:
-            # 解析 JSON-RPC 请求
-            request = protocol.parse_request(raw)
-            # 分发处理
-            response = dispatcher.dispatch(request)
-            if response:
-                # serialize() 返回 bytes，需要 decode()
-                sys.stdout.write(response.serialize().decode("utf-8") + "\n")
-                sys.stdout.flush()
-        except Exception as e:
-            err = json.dumps({"error": str(e)})
-            sys.stdout.write(err + "\n")
-            sys.stdout.flush()
+        line = handle_request(raw)
+        if line is not None:
+            stdout.write(line)
+            stdout.write(b"\n")
+            stdout.flush()
+
+
+def _serve_concurrent(max_workers: int, max_pending: int) -> None:
+    """
+    读线程持续解析 stdin，工作线程池并行执行请求，写线程按完成顺序写回响应。
+    响应通过 JSON-RPC id 与请求对应，因此不再保证与请求顺序一致。
+    """
+    writer = ResponseWriter()
+    writer.start()
+    # 限制已提交但未完成的请求数量，线程池饱和时读线程阻塞，形成背压
+    slots = threading.BoundedSemaphore(max_workers + max(max_pending, 0))
 
+    def on_done(future) -> None:
+        slots.release()
+        writer.send(future.result())
 
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-worker")
+    try:
+        while True:
+            raw = sys.stdin.readline()
+            if not raw:
+                break  # EOF -> 停止服务
+            slots.acquire()
+            executor.submit(handle_request, raw).add_done_callback(on_done)
+    finally:
+        # 等待在途请求完成并写出，再关闭写线程
+        executor.shutdown(wait=True)
+        writer.close()
+
+
+def _prewarm() -> None:
+    """后台导入工具模块与驱动并建立首批连接；失败只记录日志，首个请求会按正常路径重试。"""
+    started = time.perf_counter()
+    try:
+        load_tool_modules()
+        from tools.schema_tools import get_connector
+
+        if not SNAPSHOT_CONFIG["offline"]:
+            get_connector().connect()
+    except Exception as exc:
+        print(f"[WARN] Prewarm failed: {exc}", file=sys.stderr)
+        return
+    print(f"[INFO] Prewarm finished in {(time.perf_counter() - started) * 1000:.1f} ms.", file=sys.stderr)
+
+
+def _start_snapshot() -> None:
+    """后台加载库结构快照并启动增量刷新，失败时元数据工具照常查询数据库。"""
+    try:
+        from tools.schema_tools import start_snapshot
+
+        start_snapshot()
+    except Exception as exc:
+        print(f"[WARN] Schema snapshot startup failed: {exc}", file=sys.stderr)
+
+
+def start_server():
+    """启动 MCP 服务器 (基于 stdin/stdout 的 JSON-RPC 通信)"""
+    print("[INFO] MCP Python Server started. Waiting for requests...", file=sys.stderr)
+    metrics.start_textfile_dump(METRICS_CONFIG["textfile_path"], METRICS_CONFIG["textfile_interval"])
+    if SERVER_CONFIG["prewarm"]:
+        threading.Thread(target=_prewarm, name="mcp-prewarm", daemon=True).start()
+    if SNAPSHOT_CONFIG["path"]:
+        threading.Thread(target=_start_snapshot, name="mcp-snapshot", daemon=True).start()
 
+    max_workers = SERVER_CONFIG["max_workers"]
+    if max_workers <= 1:
+        _serve_sequential()
+    else:
+        _serve_concurrent(max_workers, SERVER_CONFIG["max_pending"])
@@ -1,35 +1,124 @@
 # 管理可暴露的 MCP 工具
 # mcp_protocol/tool_registry.py
+import importlib
+import inspect
 from typing import Optional
 
 from tinyrpc.dispatch import RPCDispatcher
 
-from tools.schema_tools import (
-    compare_schemas,
-    describe_column,
-    find_foreign_keys,
-    generate_ddl,
-    get_index_info,
-    get_server_status,
-    get_table_schema,
-    get_table_stats,
-    get_triggers,
-    list_databases,
-    list_procedures,
-    list_tables,
-    list_users,
-    list_views,
-    search_columns,
-)
-from tools.query_tools import explain_query, get_procedure_definition, run_query, sample_rows
+
+class LazyTool:
+    """
+    按模块路径与函数名登记的工具函数，首次调用时才导入所在模块，使服务启动时不必加载工具模块与数据库驱动。
+    __name__、__code__ 与 __signature__ 转发到真实函数，tinyrpc 的参数校验（错误参数返回 InvalidParams）与直接注册函数时一致。
+    """
+
+    __slots__ = ("module", "attribute", "_target")
+
+    def __init__(self, module: str, attribute: str):
+        self.module = module
+        self.attribute = attribute
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self.module), self.attribute)
+        return self._target
+
+    @property
+    def __name__(self):
+        return self.attribute
+
+    @property
+    def __code__(self):
+        return self.resolve().__code__
+
+    @property
+    def __signature__(self):
+        return inspect.signature(self.resolve())
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+
+# 工具函数按名称登记，服务启动时只导入本模块与 tinyrpc
+_SCHEMA_TOOLS = "tools.schema_tools"
+_QUERY_TOOLS = "tools.query_tools"
+
+compare_schemas = LazyTool(_SCHEMA_TOOLS, "compare_schemas")
+compare_schemas_to_baseline = LazyTool(_SCHEMA_TOOLS, "compare_schemas_to_baseline")
+describe_column = LazyTool(_SCHEMA_TOOLS, "describe_column")
+find_foreign_keys = LazyTool(_SCHEMA_TOOLS, "find_foreign_keys")
+find_foreign_keys_across = LazyTool(_SCHEMA_TOOLS, "find_foreign_keys_across")
+generate_ddl = LazyTool(_SCHEMA_TOOLS, "generate_ddl")
+get_cache_stats = LazyTool(_SCHEMA_TOOLS, "get_cache_stats")
+get_index_info = LazyTool(_SCHEMA_TOOLS, "get_index_info")
+get_pool_stats = LazyTool(_SCHEMA_TOOLS, "get_pool_stats")
+get_server_status = LazyTool(_SCHEMA_TOOLS, "get_server_status")
+get_table_schema = LazyTool(_SCHEMA_TOOLS, "get_table_schema")
+get_table_stats = LazyTool(_SCHEMA_TOOLS, "get_table_stats")
+get_table_stats_across = LazyTool(_SCHEMA_TOOLS, "get_table_stats_across")
+get_triggers = LazyTool(_SCHEMA_TOOLS, "get_triggers")
+invalidate_cache = LazyTool(_SCHEMA_TOOLS, "invalidate_cache")
+list_databases = LazyTool(_SCHEMA_TOOLS, "list_databases")
+list_procedures = LazyTool(_SCHEMA_TOOLS, "list_procedures")
+list_tables = LazyTool(_SCHEMA_TOOLS, "list_tables")
+list_tables_across = LazyTool(_SCHEMA_TOOLS, "list_tables_across")
+list_users = LazyTool(_SCHEMA_TOOLS, "list_users")
+list_views = LazyTool(_SCHEMA_TOOLS, "list_views")
+refresh_snapshot = LazyTool(_SCHEMA_TOOLS, "refresh_snapshot")
+search_columns = LazyTool(_SCHEMA_TOOLS, "search_columns")
+search_columns_across = LazyTool(_SCHEMA_TOOLS, "search_columns_across")
+cancel_request = LazyTool(_QUERY_TOOLS, "cancel_request")
+close_cursor = LazyTool(_QUERY_TOOLS, "close_cursor")
+explain_query = LazyTool(_QUERY_TOOLS, "explain_query")
+fetch_more = LazyTool(_QUERY_TOOLS, "fetch_more")
+get_procedure_definition = LazyTool(_QUERY_TOOLS, "get_procedure_definition")
+get_query_cache_stats = LazyTool(_QUERY_TOOLS, "get_query_cache_stats")
+get_read_only_cache_stats = LazyTool(_QUERY_TOOLS, "get_read_only_cache_stats")
+invalidate_query_cache = LazyTool(_QUERY_TOOLS, "invalidate_query_cache")
+run_query = LazyTool(_QUERY_TOOLS, "run_query")
+sample_rows = LazyTool(_QUERY_TOOLS, "sample_rows")
+
+# 由查询结果缓存而非元数据缓存负责的工具名
+_QUERY_CACHE_TOOLS = ("runQuery", "explainQuery")
 
 
 def register_schema_tools(dispatcher: RPCDispatcher) -> None:
     dispatcher.add_method(list_databases, name="listDatabases")
-    dispatcher.add_method(list_views, name="listViews")
+
+    def list_views_rpc(
+        prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        snippetLength: int = 160,
+    ):
+        """RPC 包装：按名称前缀过滤并分页列出视图。"""
+        return list_views(snippet_length=snippetLength, prefix=prefix, limit=limit, offset=offset)
+
+    dispatcher.add_method(list_views_rpc, name="listViews")
     dispatcher.add_method(list_tables, name="listTables")
     dispatcher.add_method(get_table_schema, name="getTableSchema")
-    dispatcher.add_method(get_table_stats, name="getTableStats")
+
+    def get_table_stats_rpc(
+        format: str = "rows",
+        counts: str = "estimated",
+        tables: Optional[list] = None,
+        countBudget: Optional[float] = None,
+        parallelism: Optional[int] = None,
+        refreshCounts: bool = False,
+    ):
+        """RPC 包装：format 可选 rows / arrays / columnar，counts 可选 estimated / index / exact。"""
+        return get_table_stats(
+            result_format=format,
+            counts=counts,
+            tables=tables,
+            count_budget=countBudget,
+            parallelism=parallelism,
+            refresh_counts=refreshCounts,
+        )
+
+    dispatcher.add_method(get_table_stats_rpc, name="getTableStats")
     dispatcher.add_method(get_index_info, name="getIndexInfo")
 
     def find_foreign_keys_rpc(tableName: Optional[str] = None):
@@ -38,7 +127,17 @@ def register_schema_tools(dispatcher: RPCDispatcher) -> None:
 
     dispatcher.add_method(find_foreign_keys_rpc, name="findForeignKeys")
     dispatcher.add_method(get_triggers, name="getTriggers")
-    dispatcher.add_method(search_columns, name="searchColumns")
+
+    def search_columns_rpc(
+        keyword: str,
+        mode: Optional[str] = None,
+        limit: Optional[int] = None,
+        maxDistance: Optional[int] = None,
+    ):
+        """RPC 包装：mode 为 substring / prefix / fuzzy 时按相关度排序返回。"""
+        return search_columns(keyword, mode=mode, limit=limit, max_distance=maxDistance)
+
+    dispatcher.add_method(search_columns_rpc, name="searchColumns")
 
     def describe_column_rpc(tableName: str, columnName: str):
         """RPC 包装：描述指定表字段的元数据。"""
@@ -53,6 +152,28 @@ def register_schema_tools(dispatcher: RPCDispatcher) -> None:
     dispatcher.add_method(list_procedures_rpc, name="listProcedures")
     dispatcher.add_method(list_users, name="listUsers")
     dispatcher.add_method(get_server_status, name="getServerStatus")
+    dispatcher.add_method(get_pool_stats, name="getPoolStats")
+
+    def invalidate_cache_rpc(tool: Optional[str] = None):
+        """RPC 包装：tool 为 runQuery / explainQuery 时清除查询结果缓存，为空时两类缓存都清空。"""
+        if tool in _QUERY_CACHE_TOOLS:
+            return {"tool": tool, "invalidated": invalidate_query_cache(tool)}
+        result = invalidate_cache(tool)
+        if tool is None:
+            result["invalidated"] += invalidate_query_cache()
+        return result
+
+    def get_cache_stats_rpc():
+        """RPC 包装：合并元数据缓存、查询结果缓存与只读判定缓存的统计。"""
+        return {
+            **get_cache_stats(),
+            "queryCache": get_query_cache_stats(),
+            "readOnlyVerdicts": get_read_only_cache_stats(),
+        }
+
+    dispatcher.add_method(invalidate_cache_rpc, name="invalidateCache")
+    dispatcher.add_method(get_cache_stats_rpc, name="getCacheStats")
+    dispatcher.add_method(refresh_snapshot, name="refreshSnapshot")
 
     def compare_schemas_rpc(
         schemaA: str,
@@ -64,6 +185,59 @@ def register_schema_tools(dispatcher: RPCDispatcher) -> None:
 
     dispatcher.add_method(compare_schemas_rpc, name="compareSchemas")
 
+    def compare_schemas_to_baseline_rpc(
+        baseline: str,
+        schemas: Optional[list] = None,
+        pattern: Optional[str] = None,
+        tableName: Optional[str] = None,
+        parallelism: Optional[int] = None,
+    ):
+        """RPC 包装：把多个库与同一基准库并行比较结构。"""
+        return compare_schemas_to_baseline(
+            baseline, schemas, table_name=tableName, parallelism=parallelism, pattern=pattern
+        )
+
+    dispatcher.add_method(compare_schemas_to_baseline_rpc, name="compareSchemasToBaseline")
+
+    # 多库版本：schemas 为库名列表，pattern 为与 listDatabases 匹配的通配符，二选一
+    def list_tables_across_rpc(
+        schemas: Optional[list] = None, pattern: Optional[str] = None, parallelism: Optional[int] = None
+    ):
+        """RPC 包装：并行列出多个库中的表。"""
+        return list_tables_across(schemas, pattern, parallelism)
+
+    def get_table_stats_across_rpc(
+        schemas: Optional[list] = None,
+        pattern: Optional[str] = None,
+        parallelism: Optional[int] = None,
+        format: str = "rows",
+    ):
+        """RPC 包装：并行汇总多个库的表统计信息。"""
+        return get_table_stats_across(schemas, pattern, parallelism, result_format=format)
+
+    def search_columns_across_rpc(
+        keyword: str,
+        schemas: Optional[list] = None,
+        pattern: Optional[str] = None,
+        parallelism: Optional[int] = None,
+    ):
+        """RPC 包装：在多个库中并行搜索列。"""
+        return search_columns_across(keyword, schemas, pattern, parallelism)
+
+    def find_foreign_keys_across_rpc(
+        tableName: Optional[str] = None,
+        schemas: Optional[list] = None,
+        pattern: Optional[str] = None,
+        parallelism: Optional[int] = None,
+    ):
+        """RPC 包装：并行列出多个库中的外键约束。"""
+        return find_foreign_keys_across(tableName, schemas, pattern, parallelism)
+
+    dispatcher.add_method(list_tables_across_rpc, name="listTablesAcrossSchemas")
+    dispatcher.add_method(get_table_stats_across_rpc, name="getTableStatsAcrossSchemas")
+    dispatcher.add_method(search_columns_across_rpc, name="searchColumnsAcrossSchemas")
+    dispatcher.add_method(find_foreign_keys_across_rpc, name="findForeignKeysAcrossSchemas")
+
     def generate_ddl_rpc(tableName: str):
         """RPC 包装：输出指定表的 CREATE TABLE 语句。"""
         return generate_ddl(table_name=tableName)
@@ -72,27 +246,100 @@ def register_schema_tools(dispatcher: RPCDispatcher) -> None:
 
 
 def register_query_tools(dispatcher: RPCDispatcher) -> None:
-    def run_query_rpc(sql: str, params=None):
-        return run_query(sql, params=params)
+    def run_query_rpc(
+        sql: str,
+        params=None,
+        pageSize: Optional[int] = None,
+        maxRows: Optional[int] = None,
+        maxBytes: Optional[int] = None,
+        maxCellBytes: Optional[int] = None,
+        cacheTtl: Optional[float] = None,
+        bypassCache: bool = False,
+        format: str = "rows",
+        timeout: Optional[float] = None,
+    ):
+        return run_query(
+            sql,
+            params=params,
+            page_size=pageSize,
+            max_rows=maxRows,
+            max_bytes=maxBytes,
+            max_cell_bytes=maxCellBytes,
+            cache_ttl=cacheTtl,
+            bypass_cache=bypassCache,
+            result_format=format,
+            timeout=timeout,
+        )
+
+    def fetch_more_rpc(cursor: str, pageSize: Optional[int] = None, timeout: Optional[float] = None):
+        """RPC 包装：读取流式查询的下一页。"""
+        return fetch_more(cursor, page_size=pageSize, timeout=timeout)
+
+    def close_cursor_rpc(cursor: str):
+        """RPC 包装：关闭流式查询游标。"""
+        return close_cursor(cursor)
 
     def get_procedure_definition_rpc(procedureName: str):
         return get_procedure_definition(procedureName)
 
-    def sample_rows_rpc(tableName: str, limit: int = 5):
+    def sample_rows_rpc(
+        tableName: str,
+        limit: int = 5,
+        maxBytes: Optional[int] = None,
+        maxCellBytes: Optional[int] = None,
+        format: str = "rows",
+        timeout: Optional[float] = None,
+        strategy: Optional[str] = None,
+        seed: Optional[int] = None,
+        scanLimit: Optional[int] = None,
+        blockSize: Optional[int] = None,
+    ):
         """RPC 包装：抽样指定表数据行。"""
-        return sample_rows(table_name=tableName, limit=limit)
+        return sample_rows(
+            table_name=tableName,
+            limit=limit,
+            max_bytes=maxBytes,
+            max_cell_bytes=maxCellBytes,
+            result_format=format,
+            timeout=timeout,
+            strategy=strategy,
+            seed=seed,
+            scan_limit=scanLimit,
+            block_size=blockSize,
+        )
 
-    def explain_query_rpc(sql: str, params=None):
+    def explain_query_rpc(
+        sql: str,
+        params=None,
+        cacheTtl: Optional[float] = None,
+        bypassCache: bool = False,
+        timeout: Optional[float] = None,
+    ):
         """RPC 包装：执行 EXPLAIN 并返回计划。"""
-        return explain_query(sql, params=params)
+        return explain_query(
+            sql, params=params, cache_ttl=cacheTtl, bypass_cache=bypassCache, timeout=timeout
+        )
+
+    def cancel_request_rpc(id):
+        """RPC 包装：按 JSON-RPC id 取消在途请求。"""
+        return cancel_request(id)
 
     dispatcher.add_method(run_query_rpc, name="runQuery")
+    dispatcher.add_method(fetch_more_rpc, name="fetchMore")
+    dispatcher.add_method(close_cursor_rpc, name="closeCursor")
     dispatcher.add_method(get_procedure_definition_rpc, name="getProcedureDefinition")
     dispatcher.add_method(sample_rows_rpc, name="sampleRows")
     dispatcher.add_method(explain_query_rpc, name="explainQuery")
+    dispatcher.add_method(cancel_request_rpc, name="cancelRequest")
 
 
 def register_all_tools(dispatcher: RPCDispatcher) -> None:
     """Register every available tool against the shared dispatcher."""
     register_schema_tools(dispatcher)
     register_query_tools(dispatcher)
+
+
+def load_tool_modules() -> None:
+    """导入全部工具模块（预热时在后台调用），之后的首个请求不再承担模块导入开销。"""
+    for module in (_SCHEMA_TOOLS, _QUERY_TOOLS):
+        importlib.import_module(module)
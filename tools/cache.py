@@ -0,0 +1,252 @@
+# 工具层缓存：LRU + TTL 的通用缓存、元数据缓存与查询结果缓存
+# tools/cache.py
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    线程安全的 LRU 缓存，条目带过期时间；超出 max_entries 或 max_bytes（需提供 sizer）时淘汰最久未使用的条目。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        default_ttl: float = 300.0,
+        max_bytes: int = 0,
+        sizer: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._sizer = sizer
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """返回未过期的缓存值，不存在或已过期时返回 default。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.total_bytes -= size
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        size = self._sizer(value) if self._sizer is not None else 0
+        if self.max_bytes and size > self.max_bytes:
+            return  # 单个条目超出总预算时不缓存，避免清空整个缓存
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[2]
+            self._entries[key] = (time.monotonic() + ttl, value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes and self.total_bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """删除满足 predicate 的条目（为空时清空全部），返回删除数量。"""
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self.total_bytes = 0
+                return removed
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self.total_bytes -= self._entries.pop(key)[2]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MetadataCache:
+    """
+    元数据工具的结果缓存：按工具名设置 TTL，并周期性比较库结构水位线，水位变化时整体失效。
+    watermark 为返回可比较值的回调（如表的 CREATE_TIME 最大值与表数量），为空时仅依赖 TTL。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        default_ttl: float = 300.0,
+        tool_ttls: Optional[Dict[str, float]] = None,
+        watermark: Optional[Callable[[], Any]] = None,
+        watermark_interval: float = 5.0,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.tool_ttls = dict(tool_ttls or {})
+        self.watermark_interval = watermark_interval
+        self._watermark = watermark
+        self._cache = LRUCache(max_entries=max_entries, default_ttl=default_ttl)
+        self._lock = threading.Lock()
+        self._watermark_lock = threading.Lock()
+        self._last_watermark: Any = _MISSING
+        self._next_check = 0.0
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._watermark_invalidations = 0
+
+    def get_or_load(self, tool: str, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """命中时直接返回缓存结果，否则调用 loader 加载并写入缓存。"""
+        if not self.enabled:
+            return loader()
+
+        self._check_watermark()
+        cache_key = (tool,) + tuple(key)
+        value = self._cache.get(cache_key, _MISSING)
+        if value is not _MISSING:
+            self._count(self._hits, tool)
+            return value
+
+        self._count(self._misses, tool)
+        value = loader()
+        self._cache.set(cache_key, value, ttl=self.tool_ttls.get(tool))
+        return value
+
+    def invalidate(self, tool: Optional[str] = None) -> int:
+        """使指定工具（为空时为全部工具）的缓存失效，返回删除的条目数。"""
+        if tool is None:
+            return self._cache.invalidate()
+        return self._cache.invalidate(lambda cache_key: cache_key[0] == tool)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tools = sorted(set(self._hits) | set(self._misses))
+            per_tool = {
+                name: {"hits": self._hits.get(name, 0), "misses": self._misses.get(name, 0)}
+                for name in tools
+            }
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._cache),
+            "maxEntries": self._cache.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hitRatio": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": self._cache.evictions,
+            "watermarkInvalidations": self._watermark_invalidations,
+            "tools": per_tool,
+        }
+
+    def _count(self, counter: Dict[str, int], tool: str) -> None:
+        with self._lock:
+            counter[tool] = counter.get(tool, 0) + 1
+
+    def _check_watermark(self) -> None:
+        """
+        每隔 watermark_interval 秒最多查询一次水位线；同一时刻只有一个线程执行检查，其余线程直接使用缓存。
+        """
+        if self._watermark is None or time.monotonic() < self._next_check:
+            return
+        if not self._watermark_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() < self._next_check:
+                return
+            try:
+                current = self._watermark()
+            except Exception as exc:
+                print(f"[WARN] Failed to read schema watermark: {exc}", file=sys.stderr)
+                return
+            finally:
+                self._next_check = time.monotonic() + self.watermark_interval
+            if self._last_watermark is not _MISSING and current != self._last_watermark:
+                self._cache.invalidate()
+                self._watermark_invalidations += 1
+            self._last_watermark = current
+        finally:
+            self._watermark_lock.release()
+
+
+class QueryResultCache:
+    """
+    只读查询结果缓存：按规范化语句与参数作为键，在总字节预算内按 LRU 淘汰，支持逐次调用指定 TTL。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 4096,
+        default_ttl: float = 60.0,
+        sizer: Optional[Callable[[Any], int]] = None,
+        enabled: bool = False,
+    ):
+        self.enabled = enabled
+        self._cache = LRUCache(
+            max_entries=max_entries, default_ttl=default_ttl, max_bytes=max_bytes, sizer=sizer
+        )
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bypasses = 0
+
+    def get_or_load(
+        self,
+        key: Tuple,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        bypass: bool = False,
+    ) -> Tuple[Any, str]:
+        """返回 (结果, 缓存状态)，状态为 hit / miss / bypass；bypass 时既不读取也不写入缓存。"""
+        if not self.enabled or bypass:
+            with self._lock:
+                self._bypasses += 1
+            return loader(), "bypass"
+
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            with self._lock:
+                self._hits += 1
+            return value, "hit"
+
+        with self._lock:
+            self._misses += 1
+        value = loader()
+        self._cache.set(key, value, ttl=ttl)
+        return value, "miss"
+
+    def invalidate(self, kind: Optional[str] = None) -> int:
+        """清空缓存；kind 不为空时只删除键首元素等于 kind 的条目（如 runQuery / explainQuery）。"""
+        if kind is None:
+            return self._cache.invalidate()
+        return self._cache.invalidate(lambda key: key[0] == kind)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses, bypasses = self._hits, self._misses, self._bypasses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._cache),
+            "bytes": self._cache.total_bytes,
+            "maxBytes": self._cache.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "bypasses": bypasses,
+            "hitRatio": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": self._cache.evictions,
+        }
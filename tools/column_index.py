@@ -0,0 +1,260 @@
+# 列搜索索引：在进程内为表名、列名与列注释建立三元组倒排索引，支持 LIKE 兼容、子串、前缀与模糊（编辑距离）匹配
+# tools/column_index.py
+import heapq
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+SEARCH_MODES = ("substring", "prefix", "fuzzy")
+# 参与索引的字段与排序权重：列名命中优先于表名，表名优先于注释
+_FIELDS = ("table_name", "column_name", "column_comment")
+_FIELD_LABELS = ("table", "column", "comment")
+_FIELD_WEIGHTS = (0.8, 1.0, 0.6)
+_TABLE, _COLUMN, _COMMENT = range(3)
+# 词项首尾的填充字符，使前缀与整词匹配也能由三元组过滤
+_START, _END = "\x02", "\x03"
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+_MAX_DISTANCE = 3
+
+
+def like_matcher(keyword: str) -> Callable[[Optional[str]], bool]:
+    """按 SQL LIKE '%keyword%' 的语义匹配（% 与 _ 为通配符，不区分大小写），与连接器的 searchColumns 一致。"""
+    pattern = "".join(
+        ".*" if char == "%" else "." if char == "_" else re.escape(char) for char in keyword.strip()
+    )
+    regex = re.compile(f".*{pattern}.*", re.IGNORECASE | re.DOTALL)
+    return lambda text: bool(text) and regex.fullmatch(text) is not None
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein 距离，超过 limit 时提前返回 limit + 1。"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _substring_score(term: str, keyword: str) -> float:
+    """子串命中的相关度：完全相等 > 整体前缀 > 词首（下划线、空格之后） > 其它位置。"""
+    if term == keyword:
+        return 1.0
+    if term.startswith(keyword):
+        return 0.9
+    position = term.find(keyword)
+    while position > 0:
+        if not term[position - 1].isalnum():
+            return 0.8
+        position = term.find(keyword, position + 1)
+    return 0.6
+
+
+class ColumnIndex:
+    """
+    由 searchColumns 形状的列元数据行（按表名、列序排列）构建的只读索引。词项为各字段小写后的整体值，
+    以及按非字母数字字符切分出的单词（只用于模糊匹配）；三元组倒排表从词项指向词项编号，
+    查询先用三元组缩小候选词项，再逐个校验并展开到所在的行，耗时与命中数而不是列总数相关。
+    """
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+        self._terms: List[str] = []
+        self._term_ids: Dict[str, int] = {}
+        # 词项编号 -> [(行号, 字段)]：whole 为字段整体值，tokens 为切分出的单词
+        self._whole: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        self._tokens: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        grams: Dict[str, List[int]] = defaultdict(list)
+        # 表名与常见列名在目录中大量重复，每个不同的字段值只切分一次
+        decomposed: Dict[str, Tuple[int, Tuple[int, ...]]] = {}
+
+        def term(text: str) -> int:
+            term_id = self._term_ids.get(text)
+            if term_id is None:
+                term_id = self._term_ids[text] = len(self._terms)
+                self._terms.append(text)
+                for trigram in _trigrams(_START + text + _END):
+                    grams[trigram].append(term_id)
+            return term_id
+
+        for row_id, row in enumerate(rows):
+            for field, key in enumerate(_FIELDS):
+                value = row.get(key)
+                if not value:
+                    continue
+                entry = decomposed.get(value)
+                if entry is None:
+                    lowered = value.lower()
+                    tokens = {token for token in _TOKEN_SPLIT.split(lowered) if token and token != lowered}
+                    entry = decomposed[value] = (term(lowered), tuple(term(token) for token in tokens))
+                whole_id, token_ids = entry
+                self._whole[whole_id].append((row_id, field))
+                for token_id in token_ids:
+                    self._tokens[token_id].append((row_id, field))
+        # 构建时按列表追加，最后整体转为集合，比逐个插入集合快得多
+        self._trigrams: Dict[str, Set[int]] = {trigram: set(ids) for trigram, ids in grams.items()}
+        self._whole = dict(self._whole)
+        self._tokens = dict(self._tokens)
+
+    def stats(self) -> dict:
+        return {"rows": len(self.rows), "terms": len(self._terms), "trigrams": len(self._trigrams)}
+
+    def _containing(self, fragment: str) -> Set[int]:
+        """
+        可能包含 fragment 的候选词项（含单词），不会漏掉真正包含的词项，调用方需再校验。
+        长度不小于 3 时取各三元组倒排表的交集，更短的片段取所有含有该片段的三元组的并集，都不需要逐个扫描词项。
+        """
+        if len(fragment) >= 3:
+            postings = sorted((self._trigrams.get(trigram, set()) for trigram in _trigrams(fragment)), key=len)
+            return set(postings[0]).intersection(*postings[1:])
+        return set().union(*(ids for trigram, ids in self._trigrams.items() if fragment in trigram))
+
+    def like(self, keyword: str) -> List[dict]:
+        """
+        与连接器 search_columns 相同的结果：列名或注释满足 LIKE '%keyword%' 的行，按表名、列序排列。
+        通配符之间的字面片段用于缩小候选词项，命中的词项再用 LIKE 语义校验。
+        """
+        keyword = keyword.strip()
+        matches = like_matcher(keyword)
+        literals = [literal for literal in re.split(r"[%_]", keyword.lower()) if literal]
+        if literals:
+            candidates = set.intersection(*(self._containing(literal) for literal in literals))
+        else:
+            candidates = self._whole.keys()
+        row_ids = set()
+        for term_id in candidates:
+            postings = self._whole.get(term_id)
+            if postings and matches(self._terms[term_id]):
+                row_ids.update(row_id for row_id, field in postings if field != _TABLE)
+        return [self.rows[row_id] for row_id in sorted(row_ids)]
+
+    def search(
+        self, keyword: str, mode: str = "substring", limit: int = 50, max_distance: Optional[int] = None
+    ) -> List[dict]:
+        """
+        按相关度排序的搜索，同时匹配表名、列名与注释：substring 为子串，prefix 要求字段以关键字开头，
+        fuzzy 在子串之外再接受与整体值或其中单词的编辑距离不超过 max_distance（默认按关键字长度取 1 或 2）的词项。
+        每行附带 score 与 matchedOn（table / column / comment），按得分降序、匹配词项长度升序返回前 limit 行。
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode '{mode}'; expected one of {', '.join(SEARCH_MODES)}.")
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+        if max_distance is not None and not 0 <= max_distance <= _MAX_DISTANCE:
+            raise ValueError(f"max_distance must be between 0 and {_MAX_DISTANCE}.")
+        keyword = keyword.strip().lower()
+        if max_distance is None:
+            max_distance = 1 if len(keyword) <= 4 else 2
+
+        # 按档次从高到低展开词项，行得分为词项相关度乘以字段权重（不超过 1）；
+        # 已有 limit 行的得分严格高于下一档的相关度时，后面的档次不可能进入结果，不再计算
+        best: Dict[int, Tuple[float, int, int]] = {}
+        seen: Set[int] = set()
+        for score, load, sources in self._tiers(keyword, mode, max_distance):
+            if len(best) >= limit and heapq.nlargest(limit, (entry[0] for entry in best.values()))[-1] > score:
+                break
+            for term_id in sorted(set(load()) - seen, key=lambda term_id: len(self._terms[term_id])):
+                seen.add(term_id)
+                length = len(self._terms[term_id])
+                for postings in (source.get(term_id, ()) for source in sources):
+                    for row_id, field in postings:
+                        weighted = score * _FIELD_WEIGHTS[field]
+                        current = best.get(row_id)
+                        if current is None or weighted > current[0]:
+                            best[row_id] = (weighted, length, field)
+        ranked = heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1][0], item[1][1], item[0]))
+        return [
+            {**self.rows[row_id], "score": round(score, 4), "matchedOn": _FIELD_LABELS[field]}
+            for row_id, (score, _, field) in ranked
+        ]
+
+    def _tiers(self, keyword: str, mode: str, max_distance: int) -> list:
+        """
+        返回按相关度降序排列的 (相关度, 惰性取词项函数, 展开用的倒排表)：完全相等 1.0、整体前缀 0.9；
+        substring 与 fuzzy 另有词首（下划线、空格之后）子串 0.8、其它位置子串 0.6；fuzzy 再按编辑距离 d
+        给出 0.5 * (1 - d / (len + 1))，始终低于子串命中。子串档次只展开字段整体值，模糊档次同时展开切分出的单词
+        （单词包含关键字时整体值也包含，已由子串档次以更高得分覆盖）。
+        """
+        containing: Dict[str, Set[int]] = {}
+
+        def whole_containing() -> Set[int]:
+            if "terms" not in containing:
+                containing["terms"] = {
+                    term_id
+                    for term_id in self._containing(keyword)
+                    if term_id in self._whole and keyword in self._terms[term_id]
+                }
+            return containing["terms"]
+
+        def exact() -> List[int]:
+            term_id = self._term_ids.get(keyword)
+            return [term_id] if term_id in self._whole else []
+
+        def prefix() -> List[int]:
+            # 带起始填充的片段只出现在以关键字开头的词项中
+            return [
+                term_id
+                for term_id in self._containing(_START + keyword)
+                if term_id in self._whole and self._terms[term_id].startswith(keyword)
+            ]
+
+        def word_start() -> List[int]:
+            terms = self._terms
+            return [term_id for term_id in whole_containing() if _substring_score(terms[term_id], keyword) == 0.8]
+
+        def elsewhere() -> List[int]:
+            terms = self._terms
+            return [term_id for term_id in whole_containing() if _substring_score(terms[term_id], keyword) == 0.6]
+
+        whole = (self._whole,)
+        tiers = [(1.0, exact, whole), (0.9, prefix, whole)]
+        if mode != "prefix":
+            tiers += [(0.8, word_start, whole), (0.6, elsewhere, whole)]
+        if mode == "fuzzy":
+            fuzzy: Dict[int, List[int]] = {}
+
+            def within(distance: int) -> List[int]:
+                if not fuzzy:
+                    for term_id, found in self._fuzzy(keyword, max_distance):
+                        fuzzy.setdefault(found, []).append(term_id)
+                return fuzzy.get(distance, [])
+
+            tiers += [
+                (
+                    0.5 * (1 - distance / (len(keyword) + 1)),
+                    lambda distance=distance: within(distance),
+                    (self._whole, self._tokens),
+                )
+                for distance in range(1, max_distance + 1)
+            ]
+        return tiers
+
+    def _fuzzy(self, keyword: str, distance: int) -> List[Tuple[int, int]]:
+        """
+        返回 (词项编号, 编辑距离)。每次编辑最多破坏 3 个三元组，因此距离不超过 distance 的词项
+        至少共享 len(keyword) - 3 * distance 个带填充的三元组；阈值不为正时按长度过滤全部词项。
+        """
+        grams = _trigrams(f"{_START}{keyword}{_END}")
+        threshold = len(grams) - 3 * distance
+        if threshold > 0:
+            shared = Counter()
+            for trigram in grams:
+                shared.update(self._trigrams.get(trigram, ()))
+            candidates = [term_id for term_id, count in shared.items() if count >= threshold]
+        else:
+            candidates = range(len(self._terms))
+        matches = []
+        for term_id in candidates:
+            found = _edit_distance(keyword, self._terms[term_id], distance)
+            if found <= distance:
+                matches.append((term_id, found))
+        return matches
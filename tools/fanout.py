@@ -0,0 +1,103 @@
+# 并行执行：按并发上限把每个库（或每张表）的调用分发到线程池，单项失败不影响其它项
+# tools/fanout.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import DB_CONFIG, FANOUT_CONFIG, SERVER_CONFIG
+from db_connectors.execution import current_execution, in_flight, record_statement
+
+
+# 待领取项已取尽的标记
+_DONE = object()
+
+
+def _parallelism(requested: Optional[int]) -> int:
+    if requested is not None and requested <= 0:
+        raise ValueError("parallelism must be a positive integer.")
+    limit = max(FANOUT_CONFIG["parallelism"], 1)
+    if requested is not None:
+        limit = min(limit, requested)
+    # 每个并发调用占用一条池连接，超过池上限只会在借出连接时排队
+    return min(limit, max(DB_CONFIG["pool_max_size"], 1))
+
+
+# 所有并行调用共用一个常驻线程池，每次调用最多提交 parallelism 个取数任务。线程数按同时可能发起并行调用的
+# 请求数（工作线程与批内调用线程）乘以单次并发上限计算，任何一个请求（如数百个库的基准比较）都只占用自己的份额，
+# 其它请求的并行调用无需在它之后排队；线程按需创建，空闲时不会额外占用连接
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                callers = max(SERVER_CONFIG["max_workers"], 1) + max(SERVER_CONFIG["batch_concurrency"], 1)
+                _executor = ThreadPoolExecutor(
+                    max_workers=_parallelism(None) * callers, thread_name_prefix="mcp-fanout"
+                )
+    return _executor
+
+
+def fan_out(
+    schemas: List[str],
+    call: Callable[[str], Any],
+    parallelism: Optional[int] = None,
+    limit_schemas: bool = True,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    对每个库并发执行 call(schema)，返回按输入顺序排列的 (结果, 错误信息)。
+    各调用以当前请求的 JSON-RPC id 登记并继承剩余超时，cancelRequest 会一并中止；
+    请求本身被取消或超时时抛出对应异常，而不是把中断记录为各库的错误。
+    按表并行（如精确计数）时传入表名并令 limit_schemas 为假，不受 MCP_FANOUT_MAX_SCHEMAS 限制。
+    """
+    schemas = list(dict.fromkeys(schemas))
+    if limit_schemas and len(schemas) > FANOUT_CONFIG["max_schemas"] > 0:
+        raise ValueError(f"{len(schemas)} schemas requested, limit is {FANOUT_CONFIG['max_schemas']}.")
+    parent = current_execution()
+    request_id = parent.request_id if parent is not None else None
+
+    def run(schema: str):
+        if parent is not None:
+            parent.check()
+        with in_flight.track(request_id) as context:
+            if parent is not None and parent.deadline is not None:
+                context.tighten(parent.deadline - context.started_at)
+            try:
+                return call(schema)
+            finally:
+                # 子调用的数据库耗时在返回后由请求线程汇总，避免多线程同时累加
+                timings[schema] = (context.execute_time, context.fetch_time, context.rows_fetched)
+
+    timings: Dict[str, tuple] = {}
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    if schemas:
+        pending = iter(schemas)
+        pending_lock = threading.Lock()
+
+        def drain() -> None:
+            # 每个任务依次领取下一项，同时运行的任务数即本次调用的并发度
+            while True:
+                with pending_lock:
+                    schema = next(pending, _DONE)
+                if schema is _DONE:
+                    return
+                try:
+                    results[schema] = run(schema)
+                except Exception as exc:
+                    errors[schema] = str(exc)
+
+        executor = _get_executor()
+        workers = [executor.submit(drain) for _ in range(min(_parallelism(parallelism), len(schemas)))]
+        for worker in workers:
+            worker.result()
+        results = {schema: results[schema] for schema in schemas if schema in results}
+        errors = {schema: errors[schema] for schema in schemas if schema in errors}
+    for execute_time, fetch_time, rows in timings.values():
+        record_statement(execute_time, fetch_time, rows)
+    if parent is not None:
+        parent.check()
+    return results, errors
@@ -1,12 +1,91 @@
-# runQuery、getProcedureDefinition
+# runQuery、getProcedureDefinition、cancelRequest
 # tools/query_tools.py
+import json
+from typing import Optional
+
+from config.settings import QUERY_CACHE_CONFIG
+from db_connectors.execution import execution_timeout, in_flight
+from db_connectors.results import ResultBudget, estimate_row_bytes
+from db_connectors.sql_text import is_deterministic, normalize_sql, read_only_cache_stats
+from tools.cache import QueryResultCache
 from tools.schema_tools import get_connector
 
 
-def run_query(sql: str, params=None) -> dict:
-    """Execute a read-only SQL query."""
+def _estimate_result_bytes(result) -> int:
+    if isinstance(result, dict):
+        # columnar 编码按列数组估算，与按行估算的量级一致
+        rows = result["values"] if "values" in result else result.get("rows", [])
+    else:
+        rows = result
+    return sum(estimate_row_bytes(row) for row in rows)
+
+
+# 只读查询结果缓存：键为规范化后的语句与参数，按总字节预算 LRU 淘汰
+_query_cache = QueryResultCache(
+    max_bytes=QUERY_CACHE_CONFIG["max_bytes"],
+    max_entries=QUERY_CACHE_CONFIG["max_entries"],
+    default_ttl=QUERY_CACHE_CONFIG["default_ttl"],
+    sizer=_estimate_result_bytes,
+    enabled=QUERY_CACHE_CONFIG["enabled"],
+)
+
+
+def _query_cache_key(kind: str, sql: str, params, *extra) -> tuple:
+    return (kind, normalize_sql(sql), json.dumps(params, sort_keys=True, default=str)) + extra
+
+
+def run_query(
+    sql: str,
+    params=None,
+    page_size: Optional[int] = None,
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    max_cell_bytes: Optional[int] = None,
+    cache_ttl: Optional[float] = None,
+    bypass_cache: bool = False,
+    result_format: str = "rows",
+    timeout: Optional[float] = None,
+) -> dict:
+    """Execute a read-only SQL query; page_size switches to paginated streaming."""
+    with execution_timeout(timeout):
+        connector = get_connector()
+        budget = ResultBudget.from_request(max_rows, max_bytes, max_cell_bytes)
+        if page_size is not None or not _query_cache.enabled:
+            return connector.run_query(
+                sql, params=params, page_size=page_size, budget=budget, result_format=result_format
+            )
+
+        # 含时间、随机数等非确定性函数的语句每次都直接查询
+        bypass = bypass_cache or not is_deterministic(sql)
+        key = _query_cache_key(
+            "runQuery",
+            sql,
+            params,
+            budget.max_rows,
+            budget.max_bytes,
+            budget.max_cell_bytes,
+            result_format,
+        )
+        result, status = _query_cache.get_or_load(
+            key,
+            lambda: connector.run_query(sql, params=params, budget=budget, result_format=result_format),
+            ttl=cache_ttl,
+            bypass=bypass,
+        )
+        return {**result, "cache": status}
+
+
+def fetch_more(token: str, page_size: Optional[int] = None, timeout: Optional[float] = None) -> dict:
+    """读取流式查询游标的下一页数据。"""
     connector = get_connector()
-    return connector.run_query(sql, params=params)
+    with execution_timeout(timeout):
+        return connector.fetch_more(token, page_size=page_size)
+
+
+def close_cursor(token: str) -> dict:
+    """提前关闭流式查询游标。"""
+    connector = get_connector()
+    return connector.close_cursor(token)
 
 
 def get_procedure_definition(name: str) -> dict:
@@ -15,13 +94,71 @@ def get_procedure_definition(name: str) -> dict:
     return connector.get_procedure_definition(name)
 
 
-def sample_rows(table_name: str, limit: int = 5) -> dict:
-    """抽样返回指定数据表的若干行数据。"""
+def sample_rows(
+    table_name: str,
+    limit: int = 5,
+    max_bytes: Optional[int] = None,
+    max_cell_bytes: Optional[int] = None,
+    result_format: str = "rows",
+    timeout: Optional[float] = None,
+    strategy: Optional[str] = None,
+    seed: Optional[int] = None,
+    scan_limit: Optional[int] = None,
+    block_size: Optional[int] = None,
+) -> dict:
+    """抽样返回指定数据表的若干行数据；strategy 为空时使用 MCP_SAMPLE_STRATEGY，指定 seed 可复现抽样结果。"""
     connector = get_connector()
-    return connector.sample_rows(table_name, limit=limit)
+    budget = ResultBudget.from_request(max_bytes=max_bytes, max_cell_bytes=max_cell_bytes)
+    with execution_timeout(timeout):
+        return connector.sample_rows(
+            table_name,
+            limit=limit,
+            budget=budget,
+            result_format=result_format,
+            strategy=strategy,
+            seed=seed,
+            scan_limit=scan_limit,
+            block_size=block_size,
+        )
 
 
-def explain_query(sql: str, params=None) -> list:
+def explain_query(
+    sql: str,
+    params=None,
+    cache_ttl: Optional[float] = None,
+    bypass_cache: bool = False,
+    timeout: Optional[float] = None,
+) -> list:
     """对只读 SQL 执行 EXPLAIN，返回执行计划。"""
     connector = get_connector()
-    return connector.explain_query(sql, params=params)
+    with execution_timeout(timeout):
+        if not _query_cache.enabled:
+            return connector.explain_query(sql, params=params)
+        # 执行计划保持列表结构，命中情况通过 getCacheStats 的 queryCache 查看
+        plan, _ = _query_cache.get_or_load(
+            _query_cache_key("explainQuery", sql, params),
+            lambda: connector.explain_query(sql, params=params),
+            ttl=cache_ttl,
+            bypass=bypass_cache,
+        )
+        return plan
+
+
+def cancel_request(request_id) -> dict:
+    """按 JSON-RPC id 取消在途请求：正在执行的语句被中止，请求以 cancelled 错误结束。"""
+    return {"requestId": request_id, "cancelled": in_flight.cancel(request_id) > 0}
+
+
+def invalidate_query_cache(kind: Optional[str] = None) -> int:
+    """清空查询结果缓存，kind 为 runQuery / explainQuery 时只清除对应条目，返回删除数量。"""
+    return _query_cache.invalidate(kind)
+
+
+def get_query_cache_stats() -> dict:
+    """返回查询结果缓存的条目数、占用字节与命中统计。"""
+    return _query_cache.stats()
+
+
+def get_read_only_cache_stats() -> dict:
+    """返回只读 SQL 判定缓存的条目数与命中统计。"""
+    return read_only_cache_stats()
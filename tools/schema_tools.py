@@ -1,35 +1,158 @@
 # listTables、getTableSchema 等实现
 # tools/schema_tools.py
-from typing import Optional
-
-from config.settings import DB_CONFIG
-from db_connectors.mysql_connector import MySQLConnector
-
-_connector: Optional[MySQLConnector] = None
-
-
-def get_connector() -> MySQLConnector:
-    """Return a singleton connector instance based on DB configuration."""
+import datetime
+import fnmatch
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from config.settings import CACHE_CONFIG, DB_CONFIG, ROW_COUNT_CONFIG, SNAPSHOT_CONFIG
+from db_connectors.execution import current_execution
+from db_connectors.results import check_format, shape_rows
+from db_connectors.schema_diff import compare_by_fingerprint, empty_definition
+from tools.cache import LRUCache, MetadataCache
+from tools.column_index import SEARCH_MODES, ColumnIndex
+from tools.fanout import fan_out
+from tools.snapshot import SchemaSnapshot
+
+if TYPE_CHECKING:
+    from db_connectors.mysql_connector import MySQLConnector
+    from db_connectors.sqlite_connector import SQLiteConnector
+
+_connector: Optional[Union["MySQLConnector", "SQLiteConnector"]] = None
+_connector_lock = threading.Lock()
+
+
+def get_connector() -> Union["MySQLConnector", "SQLiteConnector"]:
+    """
+    Return a singleton connector instance based on DB configuration.
+    驱动模块在首次创建连接器时才导入，未访问数据库的请求（如 ping）不承担 mysql.connector 的导入开销。
+    """
     global _connector
     if _connector is None:
-        db_type = DB_CONFIG["type"].lower()
-        if db_type == "mysql":
-            _connector = MySQLConnector()
-        else:
-            raise NotImplementedError(f"Unsupported DB type: {db_type}")
+        if SNAPSHOT_CONFIG["offline"]:
+            raise RuntimeError(
+                "Offline mode: the database is not reachable; only snapshot-backed metadata tools are available."
+            )
+        # 并发请求可能同时触发首次创建，加锁保证只实例化一次
+        with _connector_lock:
+            if _connector is None:
+                db_type = DB_CONFIG["type"].lower()
+                if db_type == "mysql":
+                    from db_connectors.mysql_connector import MySQLConnector
+
+                    _connector = MySQLConnector()
+                elif db_type == "sqlite":
+                    from db_connectors.sqlite_connector import SQLiteConnector
+
+                    _connector = SQLiteConnector()
+                else:
+                    raise NotImplementedError(f"Unsupported DB type: {db_type}")
     return _connector
 
 
+# 元数据缓存：库结构水位变化时整体失效，水位查询本身按 watermark_interval 节流
+_metadata_cache = MetadataCache(
+    max_entries=CACHE_CONFIG["max_entries"],
+    default_ttl=CACHE_CONFIG["default_ttl"],
+    tool_ttls=CACHE_CONFIG["tool_ttls"],
+    watermark=lambda: get_connector().get_schema_watermark(),
+    watermark_interval=CACHE_CONFIG["watermark_interval"],
+    enabled=CACHE_CONFIG["enabled"],
+)
+
+
+def _snapshot_identity() -> str:
+    """快照的数据源标识：数据源不同的快照文件不会被加载。"""
+    if DB_CONFIG["type"].lower() == "sqlite":
+        return f"sqlite:{os.path.abspath(DB_CONFIG['sqlite_path'])}"
+    return f"{DB_CONFIG['type'].lower()}://{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+
+
+# 库结构快照：MCP_SNAPSHOT_PATH 为空时不启用
+_snapshot = (
+    SchemaSnapshot(SNAPSHOT_CONFIG["path"], _snapshot_identity(), build_index=CACHE_CONFIG["column_index"])
+    if SNAPSHOT_CONFIG["path"]
+    else None
+)
+
+
+def start_snapshot() -> None:
+    """加载快照文件并（非离线模式下）启动后台刷新；由服务启动时在后台线程调用。"""
+    if _snapshot is None:
+        return
+    loaded = _snapshot.load()
+    if SNAPSHOT_CONFIG["offline"]:
+        if not loaded:
+            print(f"[WARN] Offline mode without a usable snapshot at {_snapshot.path}.", file=sys.stderr)
+        return
+    _snapshot.start_refresh(get_connector, SNAPSHOT_CONFIG["refresh_interval"])
+
+
+def _load_metadata(tool: str, key: tuple, loader, cached: bool = True):
+    """
+    元数据工具的统一读取路径：快照已加载时直接由快照回答；快照中没有该对象时在线模式回退到元数据缓存
+    （cached 为假时直接查询数据库），离线模式报错。
+    """
+    if _snapshot is not None:
+        _snapshot.load()
+        value = _snapshot.serve(tool, *key)
+        if value is not None:
+            return value
+        if SNAPSHOT_CONFIG["offline"]:
+            target = f" for {key[0]!r}" if key and key[0] else ""
+            raise ValueError(f"{tool} is not available from the offline schema snapshot{target}.")
+    if not cached:
+        return loader()
+    return _metadata_cache.get_or_load(tool, key, loader)
+
+
+def refresh_snapshot(full: bool = False) -> dict:
+    """立即刷新库结构快照（full 为真时完整重新采集），返回变化的表数量与耗时。"""
+    if _snapshot is None:
+        raise ValueError("Schema snapshot is disabled; set MCP_SNAPSHOT_PATH to enable it.")
+    _snapshot.load()
+    connector = get_connector()
+    # 显式刷新时重新计算结构指纹，不等待兜底间隔
+    connector.expire_structure_fingerprints()
+    return _snapshot.refresh(connector, full=full)
+
+
+def invalidate_cache(tool: Optional[str] = None) -> dict:
+    """使元数据缓存失效，tool 为 RPC 方法名（如 listTables），为空时清空全部；getTableStats 对应行数统计的缓存。"""
+    removed = _metadata_cache.invalidate(tool)
+    if tool is None and _connector is not None:
+        # 结构指纹按较长间隔缓存，显式清空时令下一次水位检查重新计算
+        _connector.expire_structure_fingerprints()
+    if tool is None or tool == "getTableStats":
+        removed += _row_counts.invalidate()
+    return {"tool": tool, "invalidated": removed}
+
+
+def get_cache_stats() -> dict:
+    """返回元数据缓存的条目数与各工具命中/未命中次数，以及库结构快照的状态。"""
+    return {
+        **_metadata_cache.stats(),
+        "columnIndex": _column_index_stats(),
+        "rowCounts": {"entries": len(_row_counts), "ttl": _row_counts.default_ttl},
+        "snapshot": (
+            {**_snapshot.stats(), "offline": SNAPSHOT_CONFIG["offline"]}
+            if _snapshot is not None
+            else {"enabled": False}
+        ),
+    }
+
+
 def list_tables() -> list:
     """列出数据库中的所有表。"""
-    connector = get_connector()
-    return connector.list_tables()
+    return _load_metadata("listTables", (), lambda: get_connector().list_tables())
 
 
 def get_table_schema(table_name: str) -> list:
     """获取指定表的字段结构。"""
-    connector = get_connector()
-    return connector.get_table_schema(table_name)
+    return _load_metadata("getTableSchema", (table_name,), lambda: get_connector().get_table_schema(table_name))
 
 
 def list_databases() -> list:
@@ -38,40 +161,208 @@ def list_databases() -> list:
     return connector.list_databases()
 
 
-def list_views(snippet_length: int = 160) -> list:
-    """列出视图名称并返回定义摘要，snippet_length 控制截断长度。"""
-    connector = get_connector()
-    return connector.list_views(snippet_length=snippet_length)
-
-
-def get_table_stats() -> list:
-    """汇总当前数据库下各表的统计信息（行数、数据大小等）。"""
+def list_views(
+    snippet_length: int = 160,
+    prefix: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> list:
+    """列出视图名称并返回定义摘要，snippet_length 控制截断长度，prefix（区分大小写）/limit/offset 用于过滤与分页。"""
+    return _load_metadata(
+        "listViews",
+        (snippet_length, prefix, limit, offset),
+        lambda: get_connector().list_views(snippet_length=snippet_length, prefix=prefix, limit=limit, offset=offset),
+        cached=False,
+    )
+
+
+# getTableStats 的行数统计方式：estimated 为 TABLE_ROWS 估计值，index 以最窄的二级索引执行 COUNT(*)，exact 直接 COUNT(*)
+COUNT_MODES = ("estimated", "index", "exact")
+_COUNT_COLUMNS = (
+    "row_count",
+    "row_count_method",
+    "count_index",
+    "counted_at",
+    "count_ms",
+    "count_cached",
+    "count_error",
+)
+
+# 计数结果缓存：键为表名（index 与 exact 的结果同样精确，互相复用），表的 UPDATE_TIME 变化或超过 TTL 后重新统计；
+# UPDATE_TIME 为空（InnoDB 未记录或重启后丢失、SQLite）时无法判断数据是否变化，此类表每次都重新统计
+_row_counts = LRUCache(max_entries=ROW_COUNT_CONFIG["max_entries"], default_ttl=ROW_COUNT_CONFIG["ttl"])
+
+
+def _count_budget(count_budget: Optional[float]) -> Optional[float]:
+    """每张表的计数时间预算：单次调用只能收紧 MCP_ROW_COUNT_BUDGET，两者都未设置时为 None（只受请求超时约束）。"""
+    if count_budget is not None and count_budget <= 0:
+        raise ValueError("countBudget must be a positive number of seconds.")
+    ceiling = ROW_COUNT_CONFIG["budget"] if ROW_COUNT_CONFIG["budget"] > 0 else None
+    if count_budget is None or ceiling is None:
+        return count_budget or ceiling
+    return min(count_budget, ceiling)
+
+
+def _count_table(connector, table: str, index: Optional[str], budget: Optional[float]) -> dict:
+    """在 fan_out 的子执行上下文中统计一张表，预算到期时语句被中止并记为该表的错误。"""
+    execution = current_execution()
+    if execution is not None:
+        execution.tighten(budget)
+    started = time.perf_counter()
+    row_count = connector.count_rows(table, index=index)
+    return {
+        "row_count": row_count,
+        "row_count_method": "index" if index else "exact",
+        "count_index": index,
+        "counted_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "count_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def get_table_stats(
+    result_format: str = "rows",
+    counts: str = "estimated",
+    tables: Optional[List[str]] = None,
+    count_budget: Optional[float] = None,
+    parallelism: Optional[int] = None,
+    refresh_counts: bool = False,
+):
+    """
+    汇总当前数据库下各表的统计信息（行数、数据大小等），result_format 控制结果编码。
+    counts 为 index / exact 时为各表（tables 为空时为全部数据表，不含视图）并行执行 COUNT(*)，每张表受 count_budget 秒约束，
+    结果附加 row_count 等字段；超出预算的表保留 TABLE_ROWS 估计值并在 count_error 中注明。
+    计数结果带时间戳缓存，表的 UPDATE_TIME 未变且未过期时直接复用（UPDATE_TIME 为空的表不缓存），refresh_counts 为真时重新统计。
+    """
+    if counts not in COUNT_MODES:
+        raise ValueError(f"counts must be one of {', '.join(COUNT_MODES)}.")
     connector = get_connector()
-    return connector.get_table_stats()
+    if counts == "estimated":
+        return connector.get_table_stats(result_format=result_format)
+
+    check_format(result_format)
+    budget = _count_budget(count_budget)
+    stats = connector.get_table_stats(result_format="rows")
+    selected = set(tables) if tables is not None else None
+    if selected is not None:
+        unknown = selected - {row["table_name"] for row in stats}
+        if unknown:
+            raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+    # 视图（ENGINE 为空）不参与计数
+    targets = [
+        row for row in stats
+        if row["engine"] is not None and (selected is None or row["table_name"] in selected)
+    ]
+
+    counted = {}
+    pending = []
+    for row in targets:
+        cacheable = not refresh_counts and row["update_time"] is not None
+        entry = _row_counts.get(row["table_name"]) if cacheable else None
+        if entry is not None and entry[0] == row["update_time"]:
+            counted[row["table_name"]] = {**entry[1], "count_cached": True}
+        else:
+            pending.append(row["table_name"])
+    if pending:
+        indexes = connector.get_count_indexes() if counts == "index" else {}
+        results, errors = fan_out(
+            pending,
+            lambda table: _count_table(connector, table, indexes.get(table), budget),
+            parallelism,
+            limit_schemas=False,
+        )
+        update_times = {row["table_name"]: row["update_time"] for row in targets}
+        for table, result in results.items():
+            if update_times[table] is not None:
+                _row_counts.set(table, (update_times[table], result))
+            counted[table] = {**result, "count_cached": False}
+        for table, message in errors.items():
+            counted[table] = {"count_error": message}
+
+    # 未参与计数的表（视图、未选中的表）附加字段均为 None
+    for row in stats:
+        result = counted.get(row["table_name"], {})
+        if "count_error" in result:
+            result = {"row_count": row["table_rows"], "row_count_method": "estimated", **result}
+        row.update({column: result.get(column) for column in _COUNT_COLUMNS})
+    if result_format == "rows":
+        return stats
+    columns = tuple(stats[0]) if stats else ()
+    return shape_rows(columns, [tuple(row.values()) for row in stats], result_format)
 
 
 def get_index_info(table_name: str) -> list:
     """查看指定数据表的索引详情，包括列、顺序、唯一性等。"""
-    connector = get_connector()
-    return connector.get_index_info(table_name)
+    return _load_metadata("getIndexInfo", (table_name,), lambda: get_connector().get_index_info(table_name))
 
 
 def find_foreign_keys(table_name: Optional[str] = None) -> list:
     """列出数据库中的外键约束，可按表名筛选具体关联。"""
-    connector = get_connector()
-    return connector.find_foreign_keys(table_name)
+    return _load_metadata("findForeignKeys", (table_name,), lambda: get_connector().find_foreign_keys(table_name))
 
 
 def get_triggers(table_name: Optional[str] = None) -> list:
     """返回触发器名称、作用表、触发时机及 SQL 定义，可按表过滤。"""
-    connector = get_connector()
-    return connector.get_triggers(table_name)
-
-
-def search_columns(keyword: str) -> list:
-    """按关键字模糊搜索列名或注释，便于定位字段。"""
-    connector = get_connector()
-    return connector.search_columns(keyword)
+    return _load_metadata("getTriggers", (table_name,), lambda: get_connector().get_triggers(table_name))
+
+
+_column_index_lock = threading.Lock()
+# 最近一次搜索使用的列索引，仅用于 getCacheStats 展示规模
+_last_column_index: Optional[ColumnIndex] = None
+
+
+def _column_index() -> Optional[ColumnIndex]:
+    """
+    searchColumns 使用的列索引：快照已加载时由快照的列构建，否则从数据库读取全部列构建并放入元数据缓存，
+    随库结构水位变化失效后在下次搜索时重建。未开启索引或元数据缓存时返回 None，搜索走 SQL。
+    """
+    global _last_column_index
+    if not CACHE_CONFIG["column_index"]:
+        return None
+    if _snapshot is not None and _snapshot.load():
+        index = _snapshot.column_index()
+    elif not _metadata_cache.enabled or SNAPSHOT_CONFIG["offline"]:
+        return None
+    else:
+        # 构建需要扫描全部列，加锁避免并发的首次搜索重复构建
+        with _column_index_lock:
+            index = _metadata_cache.get_or_load(
+                "columnIndex", (), lambda: ColumnIndex(get_connector().search_columns("%"))
+            )
+    _last_column_index = index
+    return index
+
+
+def _column_index_stats() -> dict:
+    index = _last_column_index
+    return {"enabled": CACHE_CONFIG["column_index"], **(index.stats() if index is not None else {})}
+
+
+def search_columns(
+    keyword: str,
+    mode: Optional[str] = None,
+    limit: Optional[int] = None,
+    max_distance: Optional[int] = None,
+) -> list:
+    """
+    按关键字模糊搜索列名或注释，便于定位字段。mode 为空时结果与 LIKE '%keyword%' 一致并按表、列顺序排列；
+    mode 为 substring / prefix / fuzzy 时同时匹配表名，按相关度排序返回前 limit（默认 50）行。
+    """
+    if not keyword or not keyword.strip():
+        raise ValueError("keyword must not be empty for column search.")
+    index = _column_index()
+    if mode is None:
+        if limit is not None or max_distance is not None:
+            raise ValueError("limit and max_distance require a search mode.")
+        if index is not None:
+            return index.like(keyword)
+        return _load_metadata(
+            "searchColumns", (keyword,), lambda: get_connector().search_columns(keyword), cached=False
+        )
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported search mode '{mode}'; expected one of {', '.join(SEARCH_MODES)}.")
+    if index is None:
+        raise ValueError("Ranked column search requires the column index (MCP_COLUMN_INDEX and the metadata cache).")
+    return index.search(keyword, mode=mode, limit=50 if limit is None else limit, max_distance=max_distance)
 
 
 def describe_column(table_name: str, column_name: str) -> dict:
@@ -82,8 +373,11 @@ def describe_column(table_name: str, column_name: str) -> dict:
 
 def list_procedures(include_functions: bool = True) -> list:
     """罗列当前库的存储过程及（可选）函数。"""
-    connector = get_connector()
-    return connector.list_procedures(include_functions=include_functions)
+    return _load_metadata(
+        "listProcedures",
+        (include_functions,),
+        lambda: get_connector().list_procedures(include_functions=include_functions),
+    )
 
 
 def list_users() -> list:
@@ -98,12 +392,168 @@ def get_server_status() -> dict:
     return connector.get_server_status()
 
 
+def get_pool_stats() -> dict:
+    """返回连接池容量、借出等待时间与饱和度等统计数据。"""
+    connector = get_connector()
+    return connector.get_pool_stats()
+
+
 def compare_schemas(schema_a: str, schema_b: str, table_name: Optional[str] = None) -> dict:
     """比较两个数据库（或指定表）的结构差异。"""
     connector = get_connector()
     return connector.compare_schemas(schema_a, schema_b, table_name=table_name)
 
 
+# MySQL 自带的系统库，按模式匹配时默认排除（显式列出时仍可访问）
+_SYSTEM_SCHEMAS = ("information_schema", "mysql", "performance_schema", "sys")
+
+
+def resolve_schemas(schemas: Optional[List[str]] = None, pattern: Optional[str] = None) -> List[str]:
+    """
+    确定多库调用涉及的库：schemas 为显式库名列表；pattern 为通配符（如 tenant_*），与 listDatabases 的结果匹配。
+    """
+    if (schemas is None) == (pattern is None):
+        raise ValueError("Provide exactly one of schemas or pattern.")
+    if schemas is not None:
+        if not isinstance(schemas, list) or not all(isinstance(schema, str) and schema for schema in schemas):
+            raise ValueError("schemas must be a list of database names.")
+        return list(dict.fromkeys(schemas))
+    if not pattern or not pattern.strip():
+        raise ValueError("pattern must not be blank.")
+    return [
+        schema
+        for schema in get_connector().list_databases()
+        if fnmatch.fnmatchcase(schema, pattern) and schema.lower() not in _SYSTEM_SCHEMAS
+    ]
+
+
+def _across_schemas(
+    call, schemas: Optional[List[str]], pattern: Optional[str], parallelism: Optional[int]
+) -> dict:
+    """
+    在每个库上并行执行 call(schema)，结果按库名归并；单个库失败只记录在 errors 中。
+    各库元数据不经过元数据缓存：缓存的失效水位只跟踪当前库。
+    """
+    targets = resolve_schemas(schemas, pattern)
+    results, errors = fan_out(targets, call, parallelism)
+    return {"schemas": targets, "results": results, "errors": errors}
+
+
+def list_tables_across(
+    schemas: Optional[List[str]] = None, pattern: Optional[str] = None, parallelism: Optional[int] = None
+) -> dict:
+    """并行列出多个库中的表。"""
+    connector = get_connector()
+    return _across_schemas(connector.list_tables, schemas, pattern, parallelism)
+
+
+def get_table_stats_across(
+    schemas: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+    parallelism: Optional[int] = None,
+    result_format: str = "rows",
+) -> dict:
+    """并行汇总多个库中各表的统计信息。"""
+    connector = get_connector()
+    return _across_schemas(
+        lambda schema: connector.get_table_stats(result_format=result_format, schema=schema),
+        schemas,
+        pattern,
+        parallelism,
+    )
+
+
+def search_columns_across(
+    keyword: str,
+    schemas: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+    parallelism: Optional[int] = None,
+) -> dict:
+    """在多个库中并行按关键字搜索列。"""
+    if not keyword or not keyword.strip():
+        raise ValueError("keyword must not be empty for column search.")
+    connector = get_connector()
+    return _across_schemas(
+        lambda schema: connector.search_columns(keyword, schema=schema), schemas, pattern, parallelism
+    )
+
+
+def find_foreign_keys_across(
+    table_name: Optional[str] = None,
+    schemas: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+    parallelism: Optional[int] = None,
+) -> dict:
+    """并行列出多个库中的外键约束，可按表名筛选。"""
+    connector = get_connector()
+    return _across_schemas(
+        lambda schema: connector.find_foreign_keys(table_name, schema=schema), schemas, pattern, parallelism
+    )
+
+
+def compare_schemas_to_baseline(
+    baseline: str,
+    schemas: Optional[List[str]] = None,
+    table_name: Optional[str] = None,
+    parallelism: Optional[int] = None,
+    pattern: Optional[str] = None,
+) -> dict:
+    """
+    把多个库（schemas 列表或 pattern 通配符）与同一基准库比较：基准库指纹只计算一次，各库并行比较指纹，只对指纹不同的表加载定义；
+    基准库的表定义在各库之间共享，单个库失败记录在 errors 中。
+    """
+    if not baseline:
+        raise ValueError("baseline is required for comparison.")
+    if table_name is not None and not table_name.strip():
+        raise ValueError("table_name must not be blank when provided.")
+
+    targets = [schema for schema in resolve_schemas(schemas, pattern) if schema != baseline]
+    connector = get_connector()
+    baseline_fingerprints = connector.get_table_fingerprints(baseline, table_name)
+    baseline_definitions: dict = {}
+    baseline_lock = threading.Lock()
+
+    def load_definitions(schema: str, tables: List[str]) -> dict:
+        if schema != baseline:
+            return connector.load_table_definitions(schema, tables)
+        with baseline_lock:
+            missing = [table for table in tables if table not in baseline_definitions]
+        if missing:
+            loaded = connector.load_table_definitions(baseline, missing)
+            with baseline_lock:
+                for table in missing:
+                    baseline_definitions[table] = loaded.get(table, empty_definition())
+        return {table: baseline_definitions[table] for table in tables}
+
+    def compare(schema: str) -> dict:
+        return compare_by_fingerprint(
+            baseline,
+            schema,
+            baseline_fingerprints,
+            connector.get_table_fingerprints(schema, table_name),
+            load_definitions,
+        )
+
+    results, errors = fan_out(targets, compare, parallelism)
+    identical, different = [], {}
+    for schema, result in results.items():
+        if result["onlyInA"] or result["onlyInB"] or result["tableDiffs"]:
+            # onlyInA 为仅存在于基准库的表，onlyInB 为仅存在于该库的表
+            different[schema] = {
+                key: result[key] for key in ("onlyInA", "onlyInB", "identicalTables", "tableDiffs")
+            }
+        else:
+            identical.append(schema)
+    return {
+        "baseline": baseline,
+        "compared": len(results) + len(errors),
+        "baselineTables": len(baseline_fingerprints),
+        "identical": identical,
+        "different": different,
+        "errors": errors,
+    }
+
+
 def generate_ddl(table_name: str) -> dict:
     """输出指定表的 CREATE TABLE 语句。"""
     connector = get_connector()
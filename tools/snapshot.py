@@ -0,0 +1,363 @@
+# 库结构快照：把元数据持久化到本地 SQLite 文件，启动时直接加载并由内存回答元数据工具，后台按表版本增量刷新
+# tools/snapshot.py
+import datetime
+import decimal
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from db_connectors.sql_text import definition_snippet
+from tools.column_index import ColumnIndex
+
+# 文件格式版本：结构不兼容的旧快照直接忽略并重新采集
+FORMAT_VERSION = "1"
+# 目录级对象，每类一次查询整体读取：tables 为 listTables 的原始结果，views 保存不截断的定义
+CATALOG_KINDS = ("tables", "foreignKeys", "triggers", "columns", "views", "procedures")
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS objects (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+"""
+
+
+def _json_default(value: Any) -> Any:
+    """与响应序列化一致：Decimal 输出字符串，时间类型输出 ISO 格式，从快照返回的结果与直接查询时相同。"""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def _plain(value: Any) -> Any:
+    """经 JSON 往返转为与从文件加载时相同的表示，比较与返回结果都不再依赖驱动返回的类型。"""
+    return json.loads(_dumps(value))
+
+
+def _group_by(rows: List[dict], key: str) -> Dict[str, List[dict]]:
+    grouped: Dict[str, List[dict]] = {}
+    for row in rows:
+        grouped.setdefault(row.get(key), []).append(row)
+    return grouped
+
+
+class SchemaSnapshot:
+    """
+    当前库的元数据快照：每张表的字段结构与索引按表版本（CREATE_TIME / UPDATE_TIME 等）逐表采集，
+    外键、触发器、列、视图与存储过程作为目录级对象整体采集。内存中的状态整体替换，读取无需加锁。
+    identity 标识数据源（类型、地址与库名），与文件中记录的不一致时视为无快照；
+    build_index 为真时在加载与每次刷新后立即构建列搜索索引，首个 searchColumns 不必等待构建。
+    """
+
+    def __init__(self, path: str, identity: str, build_index: bool = False):
+        self.path = path
+        self.identity = identity
+        self.build_index = build_index
+        self._state: Optional[dict] = None
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._attempted_load = False
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.served = 0
+        self.fallbacks = 0
+        self.refreshes = 0
+        self.last_refresh: Optional[dict] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._state is not None
+
+    # ---- 持久化 ----
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.executescript(_DDL)
+        return connection
+
+    def load(self) -> bool:
+        """从文件加载快照，只在进程内执行一次；文件不存在、格式或数据源不匹配时返回 False。"""
+        if self._attempted_load:
+            return self.loaded
+        with self._load_lock:
+            if not self._attempted_load:
+                try:
+                    self._read_file()
+                finally:
+                    self._attempted_load = True
+            return self.loaded
+
+    def _read_file(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        started = time.perf_counter()
+        try:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                meta = dict(connection.execute("SELECT key, value FROM meta"))
+                if meta.get("format") != FORMAT_VERSION or meta.get("identity") != self.identity:
+                    print(
+                        f"[WARN] Ignoring schema snapshot {self.path}: written for another source or format.",
+                        file=sys.stderr,
+                    )
+                    return
+                tables: Dict[str, dict] = {}
+                catalog: Dict[str, Any] = {}
+                for kind, name, version, payload in connection.execute(
+                    "SELECT kind, name, version, payload FROM objects"
+                ):
+                    if kind == "table":
+                        tables[name] = {"version": version, **json.loads(payload)}
+                    elif kind == "catalog":
+                        catalog[name] = json.loads(payload)
+            finally:
+                connection.close()
+        except (sqlite3.Error, ValueError) as exc:
+            print(f"[WARN] Failed to load schema snapshot {self.path}: {exc}", file=sys.stderr)
+            return
+        if any(kind not in catalog for kind in CATALOG_KINDS):
+            return
+        self._install(tables, catalog, float(meta.get("captured_at", 0)))
+        print(
+            f"[INFO] Loaded schema snapshot ({len(tables)} tables) in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms.",
+            file=sys.stderr,
+        )
+
+    def _write(
+        self,
+        tables: Dict[str, dict],
+        changed: List[str],
+        removed: List[str],
+        catalog: Dict[str, Any],
+        full: bool,
+        captured_at: float,
+    ) -> None:
+        """在一个事务内写入变化的表与全部目录级对象，写入中断时文件保持上一次的完整内容。"""
+        connection = self._open()
+        try:
+            with connection:
+                if full:
+                    connection.execute("DELETE FROM objects")
+                connection.executemany(
+                    "DELETE FROM objects WHERE kind = 'table' AND name = ?", [(name,) for name in removed]
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO objects (kind, name, version, payload) VALUES ('table', ?, ?, ?)",
+                    [
+                        (
+                            name,
+                            tables[name]["version"],
+                            _dumps({"schema": tables[name]["schema"], "indexes": tables[name]["indexes"]}),
+                        )
+                        for name in changed
+                    ],
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO objects (kind, name, version, payload) VALUES ('catalog', ?, NULL, ?)",
+                    [(kind, _dumps(catalog[kind])) for kind in CATALOG_KINDS],
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("format", FORMAT_VERSION), ("identity", self.identity), ("captured_at", repr(captured_at))],
+                )
+        finally:
+            connection.close()
+
+    # ---- 采集与刷新 ----
+
+    def _install(self, tables: Dict[str, dict], catalog: Dict[str, Any], captured_at: float) -> None:
+        """构建按表分组的索引后整体替换内存状态，正在读取旧状态的请求不受影响。"""
+        self._state = {
+            "tables": tables,
+            "catalog": catalog,
+            "foreignKeysByTable": _group_by(catalog["foreignKeys"], "tableName"),
+            "triggersByTable": _group_by(catalog["triggers"], "event_table"),
+            "capturedAt": captured_at,
+        }
+        if self.build_index:
+            self.column_index()
+
+    def refresh(self, connector, full: bool = False) -> dict:
+        """
+        按表版本增量刷新：只重新读取版本变化或新增表的字段结构与索引，删除已不存在的表；
+        有表变化（或首次采集）时再各用一次查询重新读取外键、触发器与列，视图与存储过程每次整体比较。
+        full 为真时忽略已有快照完整采集。
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            state = None if full else self._state
+            previous = state["tables"] if state else {}
+            versions = connector.get_table_versions()
+            changed = sorted(
+                name for name, version in versions.items() if previous.get(name, {}).get("version") != version
+            )
+            removed = sorted(name for name in previous if name not in versions)
+
+            tables = {name: entry for name, entry in previous.items() if name in versions}
+            for name in changed:
+                tables[name] = {
+                    "version": versions[name],
+                    "schema": _plain(connector.get_table_schema(name)),
+                    "indexes": _plain(connector.get_index_info(name)),
+                }
+
+            catalog = dict(state["catalog"]) if state else {}
+            if state is None or changed or removed:
+                catalog["tables"] = _plain(connector.list_tables())
+                catalog["foreignKeys"] = _plain(connector.find_foreign_keys())
+                catalog["triggers"] = _plain(connector.get_triggers())
+                catalog["columns"] = _plain(connector.search_columns("%"))
+            # 视图与存储过程不在表版本中体现，每次各用一次查询读取并与快照比较
+            views = _plain(connector.list_views(snippet_length=0))
+            procedures = _plain(connector.list_procedures(include_functions=True))
+            views_changed = views != catalog.get("views")
+            routines_changed = procedures != catalog.get("procedures")
+            catalog["views"] = views
+            catalog["procedures"] = procedures
+
+            captured_at = state["capturedAt"] if state else 0.0
+            if state is None or changed or removed or views_changed or routines_changed:
+                captured_at = time.time()
+                self._write(tables, changed, removed, catalog, full=state is None, captured_at=captured_at)
+                self._install(tables, catalog, captured_at)
+
+            result = {
+                "full": state is None,
+                "tables": len(tables),
+                "changedTables": len(changed),
+                "removedTables": len(removed),
+                "viewsChanged": bool(views_changed),
+                "routinesChanged": bool(routines_changed),
+                "elapsedMs": round((time.perf_counter() - started) * 1000, 3),
+            }
+            with self._stats_lock:
+                self.refreshes += 1
+                self.last_refresh = {**result, "at": time.time()}
+                self.last_error = None
+            return result
+
+    def start_refresh(self, connector_factory: Callable[[], Any], interval: float) -> None:
+        """
+        启动后台刷新线程：立即刷新一次（无快照时即首次完整采集），之后每 interval 秒刷新；interval 不大于 0 时只刷新一次。
+        刷新失败只记录日志，已加载的快照继续提供服务。
+        """
+        if self._refresh_thread is not None:
+            return
+
+        def loop() -> None:
+            while True:
+                try:
+                    self.refresh(connector_factory())
+                except Exception as exc:
+                    with self._stats_lock:
+                        self.last_error = str(exc)
+                    print(f"[WARN] Schema snapshot refresh failed: {exc}", file=sys.stderr)
+                if interval <= 0:
+                    return
+                time.sleep(interval)
+
+        self._refresh_thread = threading.Thread(target=loop, name="mcp-snapshot-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    # ---- 读取 ----
+
+    def _hit(self, value: Any) -> Any:
+        with self._stats_lock:
+            if value is None:
+                self.fallbacks += 1
+            else:
+                self.served += 1
+        return value
+
+    def serve(self, tool: str, *args) -> Any:
+        """
+        由快照回答元数据工具，返回值与连接器的同名方法一致；快照未加载或没有该对象（如刷新后新建的表）时返回 None。
+        """
+        state = self._state
+        if state is None:
+            return self._hit(None)
+        catalog = state["catalog"]
+        if tool == "listTables":
+            value = list(catalog["tables"])
+        elif tool in ("getTableSchema", "getIndexInfo"):
+            entry = state["tables"].get(args[0])
+            value = None if entry is None else list(entry["schema" if tool == "getTableSchema" else "indexes"])
+        elif tool == "findForeignKeys":
+            value = list(state["foreignKeysByTable"].get(args[0], [])) if args[0] else list(catalog["foreignKeys"])
+        elif tool == "getTriggers":
+            value = list(state["triggersByTable"].get(args[0], [])) if args[0] else list(catalog["triggers"])
+        elif tool == "listProcedures":
+            include_functions = args[0]
+            value = [
+                row for row in catalog["procedures"] if include_functions or row.get("routine_type") == "PROCEDURE"
+            ]
+        elif tool == "listViews":
+            value = self._views(catalog["views"], *args)
+        elif tool == "searchColumns":
+            value = self.column_index().like(args[0])
+        else:
+            value = None
+        return self._hit(value)
+
+    def column_index(self) -> Optional[ColumnIndex]:
+        """当前快照中各列的搜索索引，每个快照版本首次使用时构建一次；快照未加载时返回 None。"""
+        state = self._state
+        if state is None:
+            return None
+        if "columnIndex" not in state:
+            with self._index_lock:
+                if "columnIndex" not in state:
+                    state["columnIndex"] = ColumnIndex(state["catalog"]["columns"])
+        return state["columnIndex"]
+
+    @staticmethod
+    def _views(
+        views: List[dict], snippet_length: int, prefix: Optional[str], limit: Optional[int], offset: int
+    ) -> list:
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+        if offset < 0:
+            raise ValueError("offset must not be negative.")
+        selected = [view for view in views if not prefix or view["name"].startswith(prefix)]
+        selected = selected[offset : None if limit is None else offset + limit]
+        return [
+            {"name": view["name"], "definitionSnippet": definition_snippet(view["definitionSnippet"], snippet_length)}
+            for view in selected
+        ]
+
+    def stats(self) -> dict:
+        state = self._state
+        with self._stats_lock:
+            return {
+                "enabled": True,
+                "path": self.path,
+                "loaded": state is not None,
+                "tables": len(state["tables"]) if state else 0,
+                "capturedAt": state["capturedAt"] if state else None,
+                "served": self.served,
+                "fallbacks": self.fallbacks,
+                "refreshes": self.refreshes,
+                "lastRefresh": self.last_refresh,
+                "lastError": self.last_error,
+            }